@@ -0,0 +1,214 @@
+"""
+本地模拟的 i.mooc.ucas.edu.cn、getNoticeList 与 Microsoft Graph To Do 接口，供离线基准测试使用
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+def make_notices(count: int, homework_ratio: float = 0.3, seed: int = 0) -> list:
+    """
+    生成按时间倒序排列的合成通知
+    """
+    rng = random.Random(seed)
+    notices = []
+    for i in range(count):
+        day = 1 + i % 28
+        if rng.random() < homework_ratio:
+            content = (f"课程名称：课程{i % 40}\r作业名称：作业{i}\r"
+                       f"开始时间：2030-01-{day:02d} 08:00\r结束时间：2030-02-{day:02d} 23:59")
+            title = f"作业:作业{i}"
+        else:
+            content = f"第{i}条课程通知：期中考试安排" + "。" * rng.randint(10, 200)
+            title = f"通知{i}"
+        notices.append({
+            "uuid": f"uuid-{count - i:08d}",
+            "title": title,
+            "content": content,
+            "createrName": f"教师{i % 25}",
+            "completeTime": f"2030-01-{day:02d} 08:{i % 60:02d}:00",
+        })
+    return notices
+
+
+class FakeServer:
+    """
+    模拟服务器：按路径分发请求，支持固定延迟和按概率注入 429
+    """
+    def __init__(self, latency: float = 0.0, throttle_rate: float = 0.0, page_size: int = 100,
+                 notices: list = None, remote_tasks: int = 0, seed: int = 0, etag: bool = False):
+        """
+        :param latency: 每个请求的附加延迟 (s)
+        :param throttle_rate: Graph 请求返回 429 的概率
+        :param page_size: Graph 分页大小
+        :param notices: getNoticeList 返回的通知
+        :param remote_tasks: Graph 作业列表中预置的任务数
+        :param etag: getNoticeList 是否返回 ETag 并支持 If-None-Match
+        """
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.page_size = page_size
+        self.notices = notices or []
+        self.etag = etag
+        self.rng = random.Random(seed)
+        self.requests = Counter()   # (endpoint, status) -> 次数
+        self.lock = threading.Lock()
+        self.list_id = "homeworks"
+        self.tasks = {}             # 任务 ID -> 任务
+        self.versions = {}          # 任务 ID -> 修改版本号
+        self.version = 0
+        for i in range(remote_tasks):
+            self.create_task({"title": f"远程任务{i}"})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> 'FakeServer':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def graph_url(self) -> str:
+        return f"{self.base_url}/v1.0"
+
+    @property
+    def request_count(self) -> int:
+        return sum(self.requests.values())
+
+    def create_task(self, body: dict) -> dict:
+        with self.lock:
+            self.version += 1
+            task_id = f"task-{self.version}"
+            task = {"id": task_id, "status": "notStarted", **body}
+            self.tasks[task_id] = task
+            self.versions[task_id] = self.version
+            return task
+
+    def update_task(self, task_id: str, changes: dict):
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return None
+            self.version += 1
+            task.update(changes)
+            self.versions[task_id] = self.version
+            return task
+
+    # ---- 路由 ----
+
+    def route(self, method: str, path: str, query: dict, body, headers=None) -> tuple:
+        """
+        :return: (endpoint 标签, 状态码, 响应头, 响应体)
+        """
+        if path == "/":
+            link = f"{self.base_url}/notice/entry"
+            page = ("<html><body>" + "<div>padding</div>" * 200 +
+                    f"<a id=\"zne_tz_icon\" href=\"javascript:openUrl('{link}')\">通知</a>" +
+                    "<div>footer</div>" * 2000 + "</body></html>")
+            return "myspace", 200, {"Content-Type": "text/html; charset=utf-8"}, page
+        if path == "/notice/entry":
+            return "notice_entry", 200, {"Set-Cookie": "notice_session=1; Path=/"}, "ok"
+        if path == "/pc/notice/getNoticeList":
+            if self.etag:
+                etag = f'"{len(self.notices)}-{self.notices[0]["uuid"] if self.notices else ""}"'
+                if (headers or {}).get("If-None-Match") == etag:
+                    return "getNoticeList", 304, {"ETag": etag}, ""
+                return ("getNoticeList", 200, {"Content-Type": "application/json", "ETag": etag},
+                        {"notices": {"list": self.notices}})
+            return "getNoticeList", 200, {"Content-Type": "application/json"}, {"notices": {"list": self.notices}}
+
+        if not path.startswith("/v1.0/"):
+            return "unknown", 404, {}, {"error": "not found"}
+        if self.throttle_rate and self.rng.random() < self.throttle_rate:
+            return "graph_throttled", 429, {"Retry-After": "0"}, {"error": {"code": "TooManyRequests"}}
+
+        graph_path = path[len("/v1.0"):]
+        if graph_path == "/me/todo/lists":
+            return "lists", 200, {}, {"value": [{"id": self.list_id, "displayName": "Homeworks"}]}
+        if graph_path == "/$batch":
+            responses = []
+            for sub in body.get("requests", []):
+                _, status, headers, sub_body = self.route(sub["method"], "/v1.0" + sub["url"], {}, sub.get("body"))
+                responses.append({"id": sub["id"], "status": status, "headers": headers, "body": sub_body})
+            return "batch", 200, {}, {"responses": responses}
+
+        match = re.fullmatch(r"/me/todo/lists/([^/]+)/tasks/([^/]+)", graph_path)
+        if match and match.group(2) != "delta" and method == "PATCH":
+            task = self.update_task(match.group(2), body or {})
+            if task is None:
+                return "tasks_update", 404, {}, {"error": {"code": "ItemNotFound"}}
+            return "tasks_update", 200, {}, task
+
+        match = re.fullmatch(r"/me/todo/lists/([^/]+)/tasks(/delta)?", graph_path)
+        if not match:
+            return "unknown", 404, {}, {"error": "not found"}
+        if method == "POST":
+            return "tasks_create", 201, {}, self.create_task(body)
+        if match.group(2):
+            return ("tasks_delta", 200, {}, self._page(graph_path, query, delta=True))
+        return "tasks_list", 200, {}, self._page(graph_path, query, delta=False)
+
+    def _page(self, graph_path: str, query: dict, delta: bool) -> dict:
+        since = int(query.get("deltatoken", ["0"])[0])
+        skip = int(query.get("skip", ["0"])[0])
+        with self.lock:
+            ids = [task_id for task_id, version in self.versions.items() if version > since]
+            version = self.version
+            items = [self.tasks[task_id] for task_id in ids[skip:skip + self.page_size]]
+        page = {"value": items}
+        base = f"{self.graph_url}{graph_path}"
+        if skip + self.page_size < len(ids):
+            page["@odata.nextLink"] = f"{base}?deltatoken={since}&skip={skip + self.page_size}"
+        elif delta:
+            page["@odata.deltaLink"] = f"{base}?deltatoken={version}"
+        return page
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _serve(self, method: str) -> None:
+                url = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                if fake.latency:
+                    time.sleep(fake.latency)
+                endpoint, status, headers, payload = fake.route(method, url.path, parse_qs(url.query), body,
+                                                             self.headers)
+                with fake.lock:
+                    fake.requests[f"{endpoint} {status}"] += 1
+                data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+                data = data.encode()
+                self.send_response(status)
+                headers.setdefault("Content-Type", "application/json")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self) -> None:
+                self._serve("GET")
+
+            def do_POST(self) -> None:
+                self._serve("POST")
+
+            def do_PATCH(self) -> None:
+                self._serve("PATCH")
+
+        return Handler
@@ -0,0 +1,266 @@
+"""
+离线基准测试：用本地模拟服务器驱动 Crawler、Sparser、TaskManager 与 PollingEngine，
+输出各阶段延迟分位数、请求数和峰值内存，并保存为 JSON 以便在不同提交间比较
+
+用法: python -m bench.run [--notices 10000] [--remote-tasks 2000] [--accounts 100] [--compare 旧结果.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import httpx
+
+from mooc.async_crawler import AsyncCrawler, PollingEngine
+from mooc.crawler import Crawler
+from mooc.metrics import REGISTRY
+from mooc.sparser import Sparser
+from mooc.task_manager import TaskManager
+from ms_todo.client import MicrosoftTodoClient
+from ms_todo.transport import GraphTransport
+from .fake_servers import FakeServer, make_notices
+
+
+class BenchTodoClient(MicrosoftTodoClient):
+    """
+    指向模拟 Graph 的客户端，使用固定令牌，不经过 MSAL
+    """
+    def __init__(self, graph_url: str, transport: GraphTransport):
+        super().__init__("bench", "bench", "https://login.invalid/common", ["Tasks.ReadWrite"], transport=transport)
+        self.GRAPH_URL = graph_url
+
+    def create_msal_app(self):
+        return None
+
+    def refresh_token(self, force=False):
+        self.access_token = "bench-token"
+        self.token_expires_at = time.time() + 3600
+        return self.access_token
+
+    def load_token_cache(self, file_path, acquire=True):
+        return self.refresh_token() if acquire else None
+
+    def save_token_cache(self, file_path, force=False):
+        pass
+
+
+def percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": pick(0.50) * 1000,
+        "p90_ms": pick(0.90) * 1000,
+        "p99_ms": pick(0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+class StageRecorder:
+    """
+    记录每个阶段的耗时、请求数和峰值内存
+    """
+    def __init__(self, server: FakeServer) -> None:
+        self.server = server
+        self.samples = {}
+        self.requests = {}
+        self.peak_memory = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        before = self.server.request_count
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            self.samples.setdefault(name, []).append(elapsed)
+            self.requests[name] = self.requests.get(name, 0) + self.server.request_count - before
+            self.peak_memory[name] = max(self.peak_memory.get(name, 0), peak)
+
+    def report(self) -> dict:
+        return {
+            name: {
+                **percentiles(samples),
+                "requests_per_run": self.requests[name] / len(samples),
+                "peak_memory_kb": self.peak_memory[name] / 1024,
+            }
+            for name, samples in self.samples.items()
+        }
+
+
+def bench_crawl_parse(server: FakeServer, recorder: StageRecorder, workdir: str, iterations: int) -> None:
+    async_crawler = AsyncCrawler(httpx.AsyncClient(follow_redirects=True), os.path.join(workdir, "cookies.json"))
+    async_crawler.myspace_url = f"{server.base_url}/"
+    async_crawler.request_notice_url = f"{server.base_url}/pc/notice/getNoticeList"
+    crawler = Crawler(async_crawler)
+    try:
+        with recorder.stage("crawl_cold"):
+            notices = crawler.get_notice_list()
+        for _ in range(iterations):
+            with recorder.stage("crawl_warm_full"):
+                crawler.get_notice_list()
+
+        sparser = Sparser(os.path.join(workdir, "seen.db"), os.path.join(workdir, "uuids.json"))
+        with recorder.stage("filter_first_poll"):
+            sparser.filter_new_notices(notices, stop_after_seen=0)
+        for _ in range(iterations):
+            with recorder.stage("poll_steady_stream"):
+                for _ in sparser.sparse_notices(crawler.iter_notices()):
+                    pass
+        for _ in range(iterations):
+            with recorder.stage("parse_batch"):
+                sparser.parse_batch(notices)
+        for _ in range(max(1, iterations // 5)):
+            with recorder.stage("parse_objects"):
+                for notice in notices:
+                    sparser.sparse_notice(notice)
+    finally:
+        crawler.close()
+
+
+def bench_sync(server: FakeServer, recorder: StageRecorder, workdir: str, new_tasks: int, iterations: int) -> None:
+    transport = GraphTransport(rate=1000, burst=1000, backoff_base=0.01, backoff_cap=0.1)
+    client = BenchTodoClient(server.graph_url, transport)
+    with recorder.stage("task_manager_init"):
+        task_manager = TaskManager(None, os.path.join(workdir, "token_cache.json"),
+                                   os.path.join(workdir, "homeworks.json"),
+                                   mirror_file=os.path.join(workdir, "todo_mirror.json"), todo_client=client,
+                                   list_cache_file=os.path.join(workdir, "todo_lists.json"))
+    for i in range(new_tasks):
+        title = f"课程{i % 40}: 作业{i}"
+        task_manager.local_tasks[title] = {"title": title, "due_date": "2030-02-01",
+                                           "reminder_time": "2030-01-31 20:00", "end": "2030-02-01 23:59"}
+    with recorder.stage("save_local_tasks"):
+        task_manager.save_local_tasks()
+    with recorder.stage("sync_initial"):
+        task_manager.sync_tasks()
+    for _ in range(iterations):
+        with recorder.stage("sync_steady"):
+            task_manager.sync_tasks()
+    for i in range(iterations):
+        # 每轮修改约 5% 任务的截止时间，只有这些任务应产生 PATCH
+        for title in list(task_manager.local_tasks.keys())[i::20]:
+            task = dict(task_manager.local_tasks[title])
+            task["due_date"] = f"2030-03-{i + 1:02d}"
+            task_manager.local_tasks[title] = task
+        with recorder.stage("sync_changed"):
+            task_manager.sync_tasks()
+
+
+def bench_accounts(server: FakeServer, recorder: StageRecorder, workdir: str, accounts: int, rounds: int) -> None:
+    async def run() -> None:
+        engine = PollingEngine(max_per_host=8)
+        for i in range(accounts):
+            cookie_file = os.path.join(workdir, f"cookies{i}.json")
+            with open(cookie_file, 'w') as f:
+                json.dump({"session": f"account-{i}"}, f)
+            state = engine.add_account(f"account{i}", cookie_file)
+            state.crawler.myspace_url = f"{server.base_url}/"
+            state.crawler.request_notice_url = f"{server.base_url}/pc/notice/getNoticeList"
+        try:
+            for _ in range(rounds):
+                with recorder.stage("poll_accounts"):
+                    results = await engine.poll_once()
+                failures = [name for name, result in results.items() if isinstance(result, Exception)]
+                if failures:
+                    logging.warning(f"{len(failures)} accounts failed to poll.")
+        finally:
+            await engine.aclose()
+
+    asyncio.run(run())
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, previous_file: str) -> None:
+    with open(previous_file, 'r') as f:
+        previous = json.load(f)
+    print(f"\nComparison with {previous['meta']['commit']} ({previous_file}):")
+    for name, stats in current["stages"].items():
+        old = previous["stages"].get(name)
+        if not old or not old.get("p50_ms"):
+            continue
+        ratio = stats["p50_ms"] / old["p50_ms"]
+        print(f"  {name:<22} p50 {old['p50_ms']:>10.2f} -> {stats['p50_ms']:>10.2f} ms  (x{ratio:.2f})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmark for the MOOC watcher.")
+    parser.add_argument("--notices", type=int, default=10000)
+    parser.add_argument("--remote-tasks", type=int, default=2000)
+    parser.add_argument("--new-tasks", type=int, default=50)
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="per-request latency in seconds")
+    parser.add_argument("--page-size", type=int, default=100, help="Graph page size")
+    parser.add_argument("--etag", action="store_true", help="serve ETags on the notice list")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="probability of a Graph 429")
+    parser.add_argument("--output", default=None, help="result JSON path")
+    parser.add_argument("--compare", default=None, help="previous result JSON to compare against")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    tracemalloc.start()
+    result = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "args": vars(args),
+        },
+        "stages": {},
+        "requests": {},
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        with FakeServer(latency=args.latency, throttle_rate=args.throttle_rate, page_size=args.page_size,
+                        notices=make_notices(args.notices), remote_tasks=args.remote_tasks, etag=args.etag) as server:
+            recorder = StageRecorder(server)
+            bench_crawl_parse(server, recorder, workdir, args.iterations)
+            bench_sync(server, recorder, workdir, args.new_tasks, args.iterations)
+            bench_accounts(server, recorder, workdir, args.accounts, max(1, args.iterations // 2))
+            result["stages"] = recorder.report()
+            result["requests"] = dict(server.requests)
+    result["peak_memory_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+    result["metrics"] = REGISTRY.to_dict()
+
+    for name, stats in result["stages"].items():
+        print(f"{name:<22} p50 {stats['p50_ms']:>10.2f} ms  p99 {stats['p99_ms']:>10.2f} ms  "
+              f"req/run {stats['requests_per_run']:>7.1f}  peak {stats['peak_memory_kb']:>10.1f} KiB")
+
+    output = args.output or os.path.join("bench_results", f"{result['meta']['timestamp'].replace(':', '')}"
+                                                          f"-{result['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,35 +1,110 @@
 # File: complete.py
+"""
+批量回填：一次性爬取全部历史通知，解析出尚未截止的作业，
+与 Microsoft To Do 作业列表的一次快照在内存中对账，缺失的任务通过 $batch 批量创建。
+历史通知同时记为已读并写入归档，之后运行 main.py 不会重复提醒。
 
+    python complete.py              回填尚未截止的作业
+    python complete.py --dry-run    只显示需要创建的任务
+"""
+
+import argparse
 import logging
-from datetime import datetime
+import time
+from mooc.archive import NoticeArchive
+from mooc.crawler import Crawler
+from mooc.reconcile import Reconciler
 from mooc.sparser import Sparser
 from mooc.task_manager import TaskManager
 
 # 配置文件路径
 MS_GRAPH_CONFIG = "config/ms_graph.json"
 TOKEN_CACHE_FILE = "config/token_cache.json"
-LOCAL_TASK_FILE = "data/tasks.json"
+LOCAL_TASK_FILE = "data/homeworks.json"
+NOTICE_ARCHIVE_FILE = "data/notices.db"
 COOKIE_FILE = "config/cookies.json"
 
+
+def rate(count, seconds) -> str:
+    return f"{count / seconds:.0f}/s" if seconds > 0 else "-"
+
+
+def backfill(crawler: Crawler, sparser: Sparser, task_manager: TaskManager,
+             include_expired: bool = False, dry_run: bool = False):
+    """
+    :param include_expired: 是否也回填已截止的作业
+    :param dry_run: 只计算并打印需要的变更，不写本地任务也不请求 To Do
+    :return: SyncPlan
+    """
+    started = time.perf_counter()
+    notices = crawler.get_notice_list()
+    elapsed = time.perf_counter() - started
+    logging.info(f"Crawled {len(notices)} notices in {elapsed:.2f}s ({rate(len(notices), elapsed)}).")
+
+    started = time.perf_counter()
+    batch = sparser.parse_batch(notices)
+    homeworks = batch.homeworks
+    indexes = range(len(homeworks)) if include_expired else homeworks.active()
+    elapsed = time.perf_counter() - started
+    logging.info(f"Parsed {len(batch)} notices in {elapsed:.2f}s ({rate(len(batch), elapsed)}): "
+                 f"{len(homeworks)} homeworks, {len(indexes)} to backfill, {len(batch.failed)} failed.")
+
+    local_tasks = {}
+    for index in indexes:
+        homework = homeworks[index]
+        local_tasks[homework.local_task_title] = homework.to_local_task()
+
+    started = time.perf_counter()
+    remote = task_manager.get_homework_tasks()
+    logging.info(f"Loaded a snapshot of {len(remote)} remote tasks in {time.perf_counter() - started:.2f}s.")
+
+    if dry_run:
+        with task_manager.lock:
+            local_tasks = {**dict(task_manager.local_tasks.items()), **local_tasks}
+        plan = Reconciler(task_manager.todo_client, task_manager.mirror).plan(local_tasks)
+        for _, task_data in plan.creates:
+            print(f"+ {task_data['title']}  (due {task_data.get('due_date')})")
+        for key, _, changes, _ in plan.updates:
+            print(f"~ {key}  ({', '.join(changes)})")
+        logging.info(f"Dry run: {plan}.")
+        return plan
+
+    # 历史通知记为已读并写入归档
+    sparser.filter_new_notices(notices, stop_after_seen=0)
+    with task_manager.lock:
+        for title, task_data in local_tasks.items():
+            task_manager.local_tasks[title] = task_data
+    task_manager.save_local_tasks()
+
+    started = time.perf_counter()
+    last_report = [0.0]
+
+    def progress(stage, done, total):
+        now = time.perf_counter()
+        if done == total or now - last_report[0] >= 1:
+            last_report[0] = now
+            logging.info(f"{stage}: {done}/{total} ({rate(done, now - started)})")
+
+    plan = task_manager.sync_tasks(progress)
+    elapsed = time.perf_counter() - started
+    changed = len(plan.creates) + len(plan.updates)
+    logging.info(f"Backfill finished: {plan} in {elapsed:.2f}s ({rate(changed, elapsed)}).")
+    return plan
+
+
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Backfill Microsoft To Do with homework from the notice history.")
+    parser.add_argument("--include-expired", action="store_true", help="also backfill homework past its deadline")
+    parser.add_argument("--dry-run", action="store_true", help="only print the tasks that would be created")
+    args = parser.parse_args()
 
-    # 初始化 TaskManager
+    crawler = Crawler.create_from_cookies(COOKIE_FILE)
+    sparser = Sparser(archive=NoticeArchive(NOTICE_ARCHIVE_FILE))
     task_manager = TaskManager(MS_GRAPH_CONFIG, TOKEN_CACHE_FILE, LOCAL_TASK_FILE)
-    
-    # 初始化 Sparser
-    sparser = Sparser()
-
-    # 检查作业状态
-    for homework in sparser.homeworks:
-        if homework.end < datetime.now():
-            logging.info(f"作业已过期: {homework.name}")
-            continue
-
-        # 检查是否需要添加作业到 Microsoft To Do
-        task_title = f"{homework.course}: {homework.name}"
-        if not task_manager.find_task_by_title(task_title):
-            task_manager.add_homework_task(task_title, homework.task.due_date, homework.task.reminder_time)
-
-    # 保存本地任务状态
-    task_manager._save_local_tasks()
\ No newline at end of file
+    try:
+        backfill(crawler, sparser, task_manager, args.include_expired, args.dry_run)
+    finally:
+        crawler.close()
+        if sparser.archive:
+            sparser.archive.close()
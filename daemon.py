@@ -0,0 +1,162 @@
+# File: daemon.py
+"""
+多账号守护进程：按一致性哈希把 accounts/ 下的账号分配到与 CPU 核数相同的工作进程，
+工作进程崩溃时只影响其分片，并会按退避间隔自动重启
+
+每个账号一个子目录：
+    accounts/<账号名>/cookies.json       MOOC cookies
+    accounts/<账号名>/ms_graph.json      Microsoft Graph 配置
+    accounts/<账号名>/token_cache.json   可选，首次启动时导入共享数据库
+    accounts/<账号名>/homeworks.json     可选，旧版本地任务，首次启动时导入
+    accounts/<账号名>/uuids.json         可选，旧版已读通知，首次启动时导入
+已读通知、本地任务和令牌缓存保存在共享数据库 data/state.db 中，
+过期作业移入 accounts/<账号名>/homeworks.archive.jsonl
+"""
+
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from mooc.sharding import HashRing
+from mooc.shard_worker import run_shard
+from mooc.state_db import StateDB
+
+ACCOUNTS_DIR = "accounts"
+STATE_DB_FILE = "data/state.db"
+POLL_INTERVAL = 60  # (s)
+RESCAN_INTERVAL = 60  # 重新扫描账号目录的间隔 (s)
+RESTART_BASE_DELAY = 5  # (s)
+RESTART_MAX_DELAY = 300  # (s)
+STABLE_AFTER = 600  # 运行超过该时长后崩溃不再累计退避 (s)
+
+
+class ShardProcess:
+    """
+    一个分片的工作进程及其重启状态
+    """
+    def __init__(self, shard: int):
+        self.shard = shard
+        self.accounts = ()
+        self.process = None
+        self.started_at = 0.0
+        self.failures = 0
+        self.restart_at = 0.0
+
+
+class Supervisor:
+    def __init__(self, accounts_dir: str = ACCOUNTS_DIR, state_db_file: str = STATE_DB_FILE,
+                 workers: int = None, interval: float = POLL_INTERVAL):
+        """
+        :param accounts_dir: 账号目录
+        :param state_db_file: 共享状态数据库路径
+        :param workers: 工作进程数，默认为 CPU 核数
+        :param interval: 轮询间隔 (s)
+        """
+        self.accounts_dir = accounts_dir
+        self.state_db_file = state_db_file
+        self.interval = interval
+        self.workers = workers or os.cpu_count() or 1
+        self.ring = HashRing(range(self.workers))
+        self.shards = {shard: ShardProcess(shard) for shard in range(self.workers)}
+        self.stopping = False
+
+    def scan_accounts(self) -> list:
+        """
+        返回账号目录中包含 cookies.json 的子目录名
+        """
+        try:
+            names = os.listdir(self.accounts_dir)
+        except FileNotFoundError:
+            logging.error(f"Accounts directory '{self.accounts_dir}' not found.")
+            return []
+        return sorted(name for name in names
+                      if os.path.isfile(os.path.join(self.accounts_dir, name, "cookies.json")))
+
+    def _start(self, shard: ShardProcess) -> None:
+        shard.process = multiprocessing.Process(
+            target=run_shard, name=f"shard-{shard.shard}",
+            args=(shard.shard, list(shard.accounts), self.accounts_dir, self.state_db_file, self.interval))
+        shard.process.start()
+        shard.started_at = time.monotonic()
+        logging.info(f"Started shard {shard.shard} (pid {shard.process.pid}) with {len(shard.accounts)} accounts.")
+
+    @staticmethod
+    def _stop(shard: ShardProcess, timeout: float = 30) -> None:
+        if shard.process is None:
+            return
+        if shard.process.is_alive():
+            shard.process.terminate()
+            shard.process.join(timeout)
+            if shard.process.is_alive():
+                logging.warning(f"Shard {shard.shard} did not exit in {timeout}s, killing it.")
+                shard.process.kill()
+                shard.process.join()
+        shard.process = None
+
+    def rebalance(self) -> None:
+        """
+        重新分配账号；只有账号集合发生变化的分片会被重启
+        """
+        assignment = self.ring.assign(self.scan_accounts())
+        for shard_id, accounts in assignment.items():
+            shard = self.shards[shard_id]
+            accounts = tuple(accounts)
+            if accounts == shard.accounts:
+                continue
+            logging.info(f"Shard {shard_id} now owns {len(accounts)} accounts.")
+            self._stop(shard)
+            shard.accounts = accounts
+            shard.failures = 0
+            shard.restart_at = 0.0
+
+    def check(self) -> None:
+        """
+        启动需要运行但尚未运行的分片，崩溃的分片按指数退避重启
+        """
+        now = time.monotonic()
+        for shard in self.shards.values():
+            if shard.process is not None and not shard.process.is_alive():
+                exitcode = shard.process.exitcode
+                shard.process = None
+                if now - shard.started_at >= STABLE_AFTER:
+                    shard.failures = 0
+                shard.failures += 1
+                delay = min(RESTART_MAX_DELAY, RESTART_BASE_DELAY * 2 ** (shard.failures - 1))
+                shard.restart_at = now + delay
+                logging.error(f"Shard {shard.shard} exited with code {exitcode}; restarting in {delay}s.")
+            if shard.process is None and shard.accounts and now >= shard.restart_at:
+                self._start(shard)
+
+    def run(self) -> None:
+        # 在启动工作进程前建好数据库并切换到 WAL 模式
+        StateDB(self.state_db_file).close()
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+        logging.info(f"Supervising {self.workers} shards.")
+        next_scan = 0.0
+        try:
+            while not self.stopping:
+                if time.monotonic() >= next_scan:
+                    self.rebalance()
+                    next_scan = time.monotonic() + RESCAN_INTERVAL
+                self.check()
+                time.sleep(1)
+        finally:
+            self.shutdown()
+
+    def _handle_signal(self, signum, frame) -> None:
+        self.stopping = True
+
+    def shutdown(self) -> None:
+        logging.info("Stopping all shards...")
+        for shard in self.shards.values():
+            if shard.process is not None and shard.process.is_alive():
+                shard.process.terminate()
+        for shard in self.shards.values():
+            self._stop(shard)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(processName)s - %(levelname)s - %(message)s')
+    Supervisor().run()
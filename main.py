@@ -1,10 +1,19 @@
 # File: main.py
 
-import time
+import argparse
 import logging
-from datetime import datetime
+import signal
+from datetime import timedelta
+from mooc.archive import NoticeArchive
 from mooc.crawler import Crawler
-from mooc.sparser import Sparser, Homework
+from mooc.metrics import MetricsDumper, MetricsServer
+from mooc.notify import NotificationDispatcher, PushbulletSink, StdoutSink
+from mooc.pipeline import Pipeline
+from mooc.profiling import CycleProfiler
+from mooc.reminders import ReminderEngine
+from mooc.retention import Retention
+from mooc.sparser import Sparser
+from mooc.scheduler import PollScheduler
 from mooc.task_manager import TaskManager
 
 # 配置文件路径
@@ -13,45 +22,69 @@ API_KEY_FILE = "config/api_key.txt"
 MS_GRAPH_CONFIG = "config/ms_graph.json"
 TOKEN_CACHE_FILE = "config/token_cache.json"
 LOCAL_TASK_FILE = "data/homeworks.json"
+NOTICE_ARCHIVE_FILE = "data/notices.db"
+EXPIRED_TASK_ARCHIVE_FILE = "data/homeworks.archive.jsonl"
+RETENTION_GRACE = timedelta(days=1)  # 作业截止后在本地任务中保留的时长
+COMPLETE_EXPIRED_TASKS = False  # 是否将过期作业在 Microsoft To Do 中标记为已完成
+REMINDER_OFFSETS = (timedelta(days=3), timedelta(days=1), timedelta(hours=2))  # 截止前多久推送本地提醒，为空时不提醒
 UPDATE_INTERVAL = 60  # (s)
+METRICS_PORT = None  # 设置为端口号（如 9108）以开启本地 /metrics
+METRICS_DUMP_FILE = "data/metrics.json"
+METRICS_DUMP_INTERVAL = 300  # (s)
+PROFILE_DIR = "data/profiles"
+PROFILE_KEEP = 10  # 保留最近多少个周期的剖析结果
+SLOW_CYCLE_THRESHOLD = 20  # 周期忙碌时间超过该值时记录慢周期报告 (s)
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Watch MOOC notices and sync homework to Microsoft To Do.")
+    parser.add_argument("--profile", type=int, default=0, metavar="N",
+                        help=f"profile the first N poll cycles into {PROFILE_DIR} "
+                             f"(send SIGUSR1 to profile the next cycles at any time)")
+    parser.add_argument("--stdout-notifications", action="store_true",
+                        help="also print notifications and reminders to stdout (for debugging)")
+    args = parser.parse_args()
 
     # 初始化爬虫、解析器和 TaskManager
     crawler = Crawler.create_from_cookies(COOKIE_FILE)
-    sparser = Sparser()
-    task_manager = TaskManager(MS_GRAPH_CONFIG, TOKEN_CACHE_FILE, LOCAL_TASK_FILE)
+    sparser = Sparser(archive=NoticeArchive(NOTICE_ARCHIVE_FILE))
+    task_manager = TaskManager(MS_GRAPH_CONFIG, TOKEN_CACHE_FILE, LOCAL_TASK_FILE,
+                               retention=Retention(EXPIRED_TASK_ARCHIVE_FILE, RETENTION_GRACE, COMPLETE_EXPIRED_TASKS))
+    scheduler = PollScheduler(base_interval=UPDATE_INTERVAL)
+    # 没有配置推送时只记录日志；StdoutSink 仅在显式开启时使用
+    sinks = [sink for sink in (PushbulletSink.from_key_file(API_KEY_FILE),
+                               StdoutSink() if args.stdout_notifications else None) if sink is not None]
+    if not sinks:
+        logging.info(f"No API key in '{API_KEY_FILE}'; notifications are only logged.")
+    notifier = NotificationDispatcher(sinks)
+    MetricsDumper(METRICS_DUMP_FILE, METRICS_DUMP_INTERVAL).start()
+    if METRICS_PORT:
+        MetricsServer(METRICS_PORT).start()
 
-    while True:
-        try:
-            logging.info("Checking for new notices...")
-            notice_list = crawler.get_notice_list()
-            new_notices = sparser.filter_new_notices(notice_list)
-            
-            for ntc in new_notices:
-                n = sparser.sparse_notice(ntc)
-                if isinstance(n, Homework):
-                    logging.info(f"New homework found: \n{n}")
-                    if n.end < datetime.now():
-                        logging.info(f"Homework has already expired: {n}")
-                        continue
-                    
-                    # 更新本地缓存的作业任务
-                    task_title = f"{n.course}: {n.name}"
-                    task_manager.local_tasks[task_title] = {
-                        "title": task_title,
-                        "due_date": n.task.due_date,
-                        "reminder_time": n.task.reminder_time
-                    }
-            task_manager.save_local_tasks()
+    profiler = CycleProfiler(PROFILE_DIR, PROFILE_KEEP, SLOW_CYCLE_THRESHOLD)
+    if args.profile:
+        profiler.request(args.profile)
+    if hasattr(signal, "SIGUSR1"):
+        profiler.install_signal(cycles=max(1, args.profile or 3))
 
-            # 同步 Microsoft To Do 与本地任务
-            logging.info("Synchronizing tasks with Microsoft To Do.")
-            task_manager.sync_tasks()
+    reminders = None
+    if REMINDER_OFFSETS:
+        reminders = ReminderEngine(notifier, REMINDER_OFFSETS)
+        with task_manager.lock:
+            reminders.sync(dict(task_manager.local_tasks.items()))
+        reminders.start()
 
-            time.sleep(UPDATE_INTERVAL)
-
-        except Exception as e:
-            logging.error(f"An error occurred: {e}")
-            time.sleep(UPDATE_INTERVAL)
\ No newline at end of file
+    # 爬取、解析与同步在各自的线程中进行，Microsoft To Do 变慢不会推迟轮询
+    pipeline = Pipeline(crawler, sparser, task_manager, scheduler, notifier, sync_interval=UPDATE_INTERVAL,
+                        profiler=profiler, reminders=reminders)
+    pipeline.start()
+    try:
+        pipeline.wait()
+    except KeyboardInterrupt:
+        logging.info("Shutting down...")
+    finally:
+        pipeline.stop()
+        if reminders is not None:
+            reminders.stop(timeout=5)
+        notifier.close(timeout=10)
+        crawler.close()
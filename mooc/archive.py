@@ -0,0 +1,216 @@
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import lz4.frame
+from .sparser import parse_timestamp, from_timestamp, format_seconds
+
+
+def tokenize(text: str) -> set:
+    """
+    建立倒排索引用的词项：英文和数字按单词切分，中文按单字和相邻双字切分
+    """
+    terms = set()
+    if not text:
+        return terms
+    text = text.lower()
+    terms.update(re.findall(r"[a-z0-9]+", text))
+    for run in re.findall(r"[㐀-鿿豈-﫿]+", text):
+        terms.update(run)
+        terms.update(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def query_terms(text: str) -> set:
+    """
+    查询词项：中文片段用双字（单字片段用单字），避免单字带来大量候选
+    """
+    terms = set(re.findall(r"[a-z0-9]+", text.lower()))
+    for run in re.findall(r"[㐀-鿿豈-﫿]+", text):
+        terms.update([run] if len(run) == 1 else (run[i:i + 2] for i in range(len(run) - 1)))
+    return terms
+
+
+class NoticeArchive:
+    """
+    通知归档：通知的内容字段（标题、内容、发布者、发布时间）按内容哈希去重并以 lz4 压缩存储，
+    标题、内容、课程和发布者建立倒排索引，无需重新爬取即可检索历史通知
+    """
+    COURSE_PREFIX = "课程名称："
+    CONTENT_FIELDS = ("title", "content", "createrName", "completeTime")
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)  # 创建后可交由轮询线程使用
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY, data BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS notices (
+                id INTEGER PRIMARY KEY, uuid TEXT UNIQUE NOT NULL, hash TEXT NOT NULL,
+                title TEXT, course TEXT, creator TEXT, time INTEGER);
+            CREATE INDEX IF NOT EXISTS notices_course ON notices (course, time);
+            CREATE INDEX IF NOT EXISTS notices_time ON notices (time);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL, notice_id INTEGER NOT NULL, PRIMARY KEY (term, notice_id)) WITHOUT ROWID;
+        """)
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM notices").fetchone()[0]
+
+    @classmethod
+    def course_of(cls, notice: dict) -> str:
+        """
+        从通知内容中取出课程名称（作业等通知的第一行），没有时为空字符串。
+        只有作业、考试等模板带有 "课程名称：" 行，普通公告的课程为空，检索时改按标题匹配课程
+        """
+        for line in notice.get("content", "").split('\r'):
+            line = line.strip()
+            if line.startswith(cls.COURSE_PREFIX):
+                return line[len(cls.COURSE_PREFIX):]
+        return ""
+
+    @classmethod
+    def content_of(cls, notice: dict) -> dict:
+        """
+        通知的内容字段，不含 UUID，内容相同的通知（如重复发布）共用一份存储
+        """
+        return {field: notice.get(field, "") for field in cls.CONTENT_FIELDS}
+
+    @classmethod
+    def content_hash(cls, notice: dict) -> str:
+        canonical = json.dumps(cls.content_of(notice), ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def add(self, notice: dict) -> bool:
+        """
+        归档一条原始通知
+        :return: 是否为新归档的通知
+        """
+        return self.add_many([notice]) == 1
+
+    def add_many(self, notices) -> int:
+        """
+        在一个事务中归档多条原始通知，已归档的 UUID 会被跳过
+        :return: 新归档的通知数
+        """
+        added = 0
+        with self.conn:
+            for notice in notices:
+                uuid = notice.get("uuid")
+                if uuid is None or self.conn.execute("SELECT 1 FROM notices WHERE uuid = ?", (uuid,)).fetchone():
+                    continue
+                digest = self.content_hash(notice)
+                data = json.dumps(self.content_of(notice), ensure_ascii=False).encode()
+                self.conn.execute("INSERT OR IGNORE INTO blobs VALUES (?, ?)", (digest, lz4.frame.compress(data)))
+
+                course, creator, title = self.course_of(notice), notice.get("createrName", ""), notice.get("title", "")
+                try:
+                    timestamp = parse_timestamp(notice.get("completeTime", ""))
+                except ValueError:
+                    timestamp = None
+                notice_id = self.conn.execute(
+                    "INSERT INTO notices (uuid, hash, title, course, creator, time) VALUES (?, ?, ?, ?, ?, ?)",
+                    (uuid, digest, title, course, creator, timestamp)).lastrowid
+                terms = tokenize(title) | tokenize(notice.get("content", "")) | tokenize(course) | tokenize(creator)
+                self.conn.executemany("INSERT OR IGNORE INTO postings VALUES (?, ?)",
+                                      ((term, notice_id) for term in terms))
+                added += 1
+        return added
+
+    def _load(self, digest: str, uuid: str) -> dict:
+        row = self.conn.execute("SELECT data FROM blobs WHERE hash = ?", (digest,)).fetchone()
+        return {**json.loads(lz4.frame.decompress(row[0])), "uuid": uuid} if row else None
+
+    def get(self, uuid: str) -> dict:
+        row = self.conn.execute("SELECT hash FROM notices WHERE uuid = ?", (uuid,)).fetchone()
+        return self._load(row[0], uuid) if row else None
+
+    SEARCH_PAGE = 200  # 需要用原文确认的检索每次从数据库读取的行数
+
+    def search(self, text: str = None, course: str = None, creator: str = None,
+               since: str = None, until: str = None, limit: int = 50, offset: int = 0) -> list:
+        """
+        检索归档的通知，按时间倒序返回通知（UUID 与内容字段）
+        :param text: 在标题、内容、课程和发布者中出现的文本（所有词都须命中）
+        :param course: 课程名称（精确匹配）；没有课程字段的普通公告按标题是否包含课程名称匹配
+        :param creator: 发布者（精确匹配）
+        :param since: 起始时间，格式 "%Y-%m-%d %H:%M[:%S]"
+        :param until: 截止时间，格式 "%Y-%m-%d %H:%M[:%S]"
+        :param limit: 最多返回条数
+        :param offset: 跳过前多少条结果，用于翻页
+        """
+        conditions, params = [], []
+        terms = query_terms(text) if text else set()
+        for term in terms:
+            conditions.append("id IN (SELECT notice_id FROM postings WHERE term = ?)")
+            params.append(term)
+        if course is not None:
+            conditions.append("(course = ? OR (course = '' AND title LIKE ? ESCAPE '\\'))")
+            escaped = course.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.extend((course, f"%{escaped}%"))
+        if creator is not None:
+            conditions.append("creator = ?")
+            params.append(creator)
+        if since:
+            conditions.append("time >= ?")
+            params.append(parse_timestamp(since))
+        if until:
+            conditions.append("time <= ?")
+            params.append(parse_timestamp(until))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT uuid, hash FROM notices {where} ORDER BY time DESC, id DESC LIMIT ? OFFSET ?"
+
+        if not text:
+            rows = self.conn.execute(query, params + [limit, offset])
+            return [self._load(digest, uuid) for uuid, digest in rows]
+
+        # 双字索引可能产生误命中，须用原文确认，因此分页读取直到凑满 offset + limit 条确认的结果
+        results, skip, start = [], offset, 0
+        while len(results) < limit:
+            rows = self.conn.execute(query, params + [self.SEARCH_PAGE, start]).fetchall()
+            for uuid, digest in rows:
+                notice = self._load(digest, uuid)
+                if not self._matches(notice, text):
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                results.append(notice)
+                if len(results) >= limit:
+                    break
+            if len(rows) < self.SEARCH_PAGE:
+                break
+            start += self.SEARCH_PAGE
+        return results
+
+    def _matches(self, notice: dict, text: str) -> bool:
+        haystack = " ".join((notice.get("title", ""), notice.get("content", ""),
+                             self.course_of(notice), notice.get("createrName", ""))).lower()
+        return all(word in haystack for word in text.lower().split())
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Search the notice archive.")
+    parser.add_argument("text", nargs="?", default=None)
+    parser.add_argument("--db", default="data/notices.db")
+    parser.add_argument("--course")
+    parser.add_argument("--creator")
+    parser.add_argument("--since")
+    parser.add_argument("--until")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--offset", type=int, default=0)
+    args = parser.parse_args()
+
+    archive = NoticeArchive(args.db)
+    for notice in archive.search(args.text, args.course, args.creator, args.since, args.until, args.limit,
+                                 args.offset):
+        try:
+            time = format_seconds(from_timestamp(parse_timestamp(notice.get("completeTime", ""))))
+        except ValueError:
+            time = notice.get("completeTime", "")
+        print(f"[{time}] {notice.get('title')} ({notice.get('createrName')})")
@@ -0,0 +1,430 @@
+import re
+import glob
+import html
+import json
+import time
+import codecs
+import asyncio
+import hashlib
+import logging
+import os
+from contextlib import aclosing
+from urllib.parse import urlsplit
+import httpx
+from .json_stream import JsonArrayStream
+from .metrics import HTTP_REQUESTS, HTTP_SECONDS
+
+
+class NoticeSessionExpired(ConnectionError):
+    """
+    通知域会话失效（被重定向到登录页或返回错误），需要重新握手
+    """
+
+
+class NoticeLinkExtractor:
+    """
+    增量查找个人空间页面中的 zne_tz_icon 链接，找到后即可停止读取
+    """
+    _ANCHOR = re.compile(r"<a\b[^>]*?\bid\s*=\s*[\"']zne_tz_icon[\"'][^>]*>", re.I | re.S)
+    _HREF = re.compile(r"\bhref\s*=\s*(?:\"([^\"]*)\"|'([^']*)')", re.I | re.S)
+    OVERLAP = 1024
+
+    def __init__(self) -> None:
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._buffer = ""
+        self.found = False
+
+    def feed(self, chunk: bytes) -> str:
+        """
+        输入一个字节块
+        :return: 找到锚点时返回通知链接（锚点没有 href 时为空字符串），否则返回 None
+        """
+        # 保留上一块末尾的一段，防止标签被切断在两个块之间
+        self._buffer = self._buffer[-self.OVERLAP:] + self._decoder.decode(chunk)
+        anchor = self._ANCHOR.search(self._buffer)
+        if not anchor:
+            return None
+        self.found = True
+        href = self._HREF.search(anchor.group(0))
+        if not href:
+            return ""
+        value = html.unescape(href.group(1) if href.group(1) is not None else href.group(2))
+        # 形如 javascript:openUrl('https://...')，取引号内的地址
+        return value.split('\'')[-2] if '\'' in value else value
+
+    @classmethod
+    def extract(cls, chunks) -> str:
+        """
+        从字节块的可迭代对象中查找通知链接，未找到时返回 None
+        """
+        extractor = cls()
+        for chunk in chunks:
+            link = extractor.feed(chunk)
+            if link is not None:
+                return link or None
+        return None
+
+
+class HostLimiter:
+    """
+    按主机名限制并发请求数
+    """
+    def __init__(self, max_per_host: int = 4) -> None:
+        self.max_per_host = max_per_host
+        self._semaphores = {}
+
+    def __call__(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).hostname or ""
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return self._semaphores[host]
+
+
+class AsyncCrawler:
+    myspace_url = "https://i.mooc.ucas.edu.cn"
+    request_notice_url = "https://notice.mooc.ucas.edu.cn/pc/notice/getNoticeList"
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
+    }
+    NOTICE_LINK_TTL = 30 * 60  # (s)
+    CHUNK_SIZE = 8192
+    REDIRECT_STATUS = (301, 302, 303, 307, 308)
+    NOTICE_PATH = ("notices", "list")
+
+    def __init__(self, client: httpx.AsyncClient, cookie_file: str,
+                 limiter: HostLimiter = None, notice_link_ttl: float = NOTICE_LINK_TTL,
+                 notice_params: dict = None):
+        """
+        :param client: 账号独享的 AsyncClient（可与其他账号共享底层连接池）
+        :param cookie_file: cookies 文件路径
+        :param limiter: 按主机的并发限制器，多个账号共享同一个
+        :param notice_link_ttl: 通知链接与通知域会话的缓存时长（秒）
+        :param notice_params: 通知列表请求的查询参数（如分页大小），接口支持时用于限制返回条数
+        """
+        self.client = client
+        self.cookie_file = cookie_file
+        self.limiter = limiter or HostLimiter()
+        self.notice_link = None
+        self.notice_link_ttl = notice_link_ttl
+        self.notice_params = notice_params
+        self._warm_until = 0.0  # 通知链接与通知域会话的有效期（monotonic）
+        self.validators = {}  # 上次完整读取的通知列表的 ETag / Last-Modified
+        self.body_hash = None  # 服务器不提供校验字段时，上次通知列表响应体的哈希
+        self.unchanged = False  # 上一次轮询时通知列表是否未变化
+        self._caught_up = False  # 调用方是否因遇到已读通知而主动停止读取
+
+    @staticmethod
+    def load_cookies(cookie_file: str) -> dict:
+        with open(cookie_file, 'r') as f:
+            return json.load(f)
+
+    @staticmethod
+    def create_from_cookies(cookie_file: str, transport: httpx.AsyncBaseTransport = None,
+                            limiter: HostLimiter = None) -> 'AsyncCrawler':
+        """
+        从 cookies 文件创建爬虫；传入 transport 时与其他账号共享连接池
+        """
+        client = httpx.AsyncClient(cookies=AsyncCrawler.load_cookies(cookie_file),
+                                   transport=transport, follow_redirects=True)
+        return AsyncCrawler(client, cookie_file, limiter)
+
+    def save_cookies(self) -> None:
+        cookies = {cookie.name: cookie.value for cookie in self.client.cookies.jar}
+        with open(self.cookie_file, 'w') as f:
+            json.dump(cookies, f, indent=4)
+
+    @property
+    def is_warm(self) -> bool:
+        """
+        通知链接与通知域会话是否仍在缓存有效期内
+        """
+        return self.notice_link is not None and time.monotonic() < self._warm_until
+
+    def invalidate(self) -> None:
+        """
+        丢弃缓存的通知链接，下次轮询时重新握手
+        """
+        self.notice_link = None
+        self._warm_until = 0.0
+
+    async def get_notice_link(self) -> str:
+        """
+        从个人空间页面获取通知链接
+        """
+        try:
+            async with self.limiter(self.myspace_url):
+                with HTTP_SECONDS.time(endpoint="myspace"):
+                    async with self.client.stream("GET", self.myspace_url, headers=self.headers) as response:
+                        HTTP_REQUESTS.inc(endpoint="myspace", status=response.status_code)
+                        response.raise_for_status()
+                        extractor = NoticeLinkExtractor()
+                        notice_link = None
+                        async for chunk in response.aiter_bytes(self.CHUNK_SIZE):
+                            notice_link = extractor.feed(chunk)
+                            if notice_link is not None:
+                                break
+        except httpx.HTTPError as e:
+            if not isinstance(e, httpx.HTTPStatusError):
+                HTTP_REQUESTS.inc(endpoint="myspace", status="error")
+            logging.error(f"请求错误: {e}")
+            raise ConnectionError(f"请求错误: {e}")
+        except Exception as e:
+            logging.error(f"解析错误: {e}")
+            raise Exception(f"解析错误: {e}")
+
+        if not notice_link:
+            logging.error("未找到通知链接")
+            raise ValueError("未找到通知链接")
+        self.notice_link = notice_link
+        return self.notice_link
+
+    async def _warm_up(self) -> None:
+        """
+        获取通知链接并访问一次，以建立通知域的会话
+        """
+        await self.get_notice_link()
+        try:
+            async with self.limiter(self.notice_link):
+                with HTTP_SECONDS.time(endpoint="notice_entry"):
+                    response = await self.client.get(self.notice_link, headers=self.headers)
+            HTTP_REQUESTS.inc(endpoint="notice_entry", status=response.status_code)
+        except httpx.HTTPError as e:
+            HTTP_REQUESTS.inc(endpoint="notice_entry", status="error")
+            self.invalidate()
+            raise ConnectionError(f"网络请求失败: {e}")
+        self._warm_until = time.monotonic() + self.notice_link_ttl
+
+    def _conditional_headers(self) -> dict:
+        headers = dict(self.headers)
+        if 'etag' in self.validators:
+            headers['If-None-Match'] = self.validators['etag']
+        if 'last-modified' in self.validators:
+            headers['If-Modified-Since'] = self.validators['last-modified']
+        return headers
+
+    def _remember(self, validators: dict, body_hash: str) -> None:
+        """
+        通知列表读完，或调用方因遇到已读通知而主动停止读取后，才记下校验字段与哈希；
+        读取中途出错或调用方因自身异常中止时不记录，下次轮询会重新下载
+        """
+        self.validators = validators
+        self.body_hash = body_hash
+
+    def mark_caught_up(self) -> None:
+        """
+        调用方遇到已读通知、不再需要剩余的通知时调用，随后关闭迭代器。
+        只有这样提前停止时才记下本次的校验字段与哈希
+        """
+        self._caught_up = True
+
+    def _finish(self, validators: dict, digest) -> None:
+        body_hash = digest.hexdigest() if digest is not None else None
+        if body_hash is not None and body_hash == self.body_hash:
+            self.unchanged = True
+        self._remember(validators, body_hash)
+
+    async def _stream_notice_list(self, conditional: bool = True):
+        """
+        流式请求通知列表，边下载边产出通知；会话失效时抛出 NoticeSessionExpired
+        :param conditional: 为 True 时发送条件请求（If-None-Match / If-Modified-Since），
+            服务器返回 304 时不产出任何通知，并将 unchanged 置为 True。
+            服务器不提供 ETag / Last-Modified 时边解码边计算响应体哈希，与上次相同时同样将 unchanged 置为 True
+        """
+        self.unchanged = False
+        self._caught_up = False
+        headers = self._conditional_headers() if conditional else self.headers
+        try:
+            async with self.limiter(self.request_notice_url):
+                start = time.perf_counter()
+                async with self.client.stream("GET", self.request_notice_url, headers=headers,
+                                              params=self.notice_params, follow_redirects=False) as response:
+                    # 响应体边读边交给调用方处理，只计到收到响应头为止
+                    HTTP_SECONDS.observe(time.perf_counter() - start, endpoint="notice_list")
+                    HTTP_REQUESTS.inc(endpoint="notice_list", status=response.status_code)
+                    if response.status_code == 304:
+                        self.unchanged = True
+                        return
+                    if response.status_code in self.REDIRECT_STATUS or response.status_code >= 400:
+                        raise NoticeSessionExpired(f"通知会话失效，状态码: {response.status_code}")
+
+                    validators = {name: response.headers[name] for name in ('etag', 'last-modified')
+                                  if name in response.headers}
+                    # 没有校验字段时用响应体哈希判断是否变化，哈希与解码在同一遍读取中完成
+                    digest = hashlib.blake2b(digest_size=16) if not validators else None
+                    stream = JsonArrayStream(self.NOTICE_PATH)
+                    chunks = response.aiter_bytes(self.CHUNK_SIZE)
+                    try:
+                        async for chunk in chunks:
+                            if digest is not None:
+                                digest.update(chunk)
+                            if stream.done:
+                                continue  # 数组之后的内容只用于计算哈希
+                            for notice in self._feed(stream, chunk):
+                                yield notice
+                            if stream.done and digest is None:
+                                break
+                    except GeneratorExit:
+                        if self._caught_up:
+                            await self._drain(chunks, digest, validators)
+                        raise
+                    if not stream.done:
+                        try:
+                            stream.close()
+                        except ValueError as e:
+                            raise TypeError(f"解析JSON失败: {e}")
+                    self._finish(validators, digest)
+        except httpx.HTTPError as e:
+            HTTP_REQUESTS.inc(endpoint="notice_list", status="error")
+            raise NoticeSessionExpired(f"网络请求失败: {e}")
+
+    async def _drain(self, chunks, digest, validators: dict) -> None:
+        """
+        调用方主动停止后读完剩余的响应体（不再解码）以得到完整的哈希；读取失败时不记录
+        """
+        try:
+            if digest is not None:
+                async for chunk in chunks:
+                    digest.update(chunk)
+        except httpx.HTTPError as e:
+            logging.debug(f"Failed to read the rest of the notice list for hashing: {e}")
+            return
+        self._finish(validators, digest)
+
+    @staticmethod
+    def _feed(stream: JsonArrayStream, chunk: bytes) -> list:
+        try:
+            return stream.feed(chunk)
+        except ValueError as e:
+            if stream.in_array:
+                raise TypeError(f"解析JSON失败: {e}")
+            # 登录页等 HTML 响应说明会话已失效
+            raise NoticeSessionExpired(f"通知会话失效，响应不是 JSON: {e}")
+
+    async def iter_notices(self, conditional: bool = True):
+        """
+        按时间顺序逐条产出通知，调用方可以随时停止迭代；因遇到已读通知而停止时应先调用 mark_caught_up
+        会话有效时只发送一次请求；仅当通知接口返回重定向或错误时才重新读取个人空间页面
+        :param conditional: 为 True 时发送条件请求，通知列表未变化（304）则不产出任何通知（见 unchanged）
+        """
+        if not self.is_warm:
+            await self._warm_up()
+            async with aclosing(self._stream_notice_list(conditional)) as notices:
+                async for notice in notices:
+                    yield notice
+            return
+
+        yielded = False
+        try:
+            async with aclosing(self._stream_notice_list(conditional)) as notices:
+                async for notice in notices:
+                    yielded = True
+                    yield notice
+        except NoticeSessionExpired as e:
+            if yielded:
+                raise
+            logging.info(f"Notice session expired ({e}), redoing handshake.")
+            self.invalidate()
+            await self._warm_up()
+            async with aclosing(self._stream_notice_list(conditional)) as notices:
+                async for notice in notices:
+                    yield notice
+
+    async def get_notice_list(self, conditional: bool = False) -> list:
+        """
+        获取通知列表的JSON数据
+        :param conditional: 为 True 时通知列表未变化则返回空列表
+        """
+        notices = [notice async for notice in self.iter_notices(conditional)]
+        return [] if conditional and self.unchanged else notices
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class AccountState:
+    """
+    单个账号的轮询状态
+    """
+    def __init__(self, name: str, crawler: AsyncCrawler) -> None:
+        self.name = name
+        self.crawler = crawler
+        self.last_poll = None
+        self.last_error = None
+        self.consecutive_failures = 0
+
+    def __repr__(self) -> str:
+        return f"AccountState({self.name!r}, failures={self.consecutive_failures})"
+
+
+class PollingEngine:
+    """
+    在一个事件循环中并发轮询多个账号，所有账号共享同一个连接池和按主机的并发限制
+    """
+    def __init__(self, max_per_host: int = 4, max_connections: int = 50, timeout: float = 20.0):
+        self.transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        self.timeout = timeout
+        self.limiter = HostLimiter(max_per_host)
+        self.accounts = {}
+
+    def add_account(self, name: str, cookie_file: str) -> AccountState:
+        """
+        添加一个账号，返回其状态对象
+        """
+        client = httpx.AsyncClient(cookies=AsyncCrawler.load_cookies(cookie_file), transport=self.transport,
+                                   follow_redirects=True, timeout=self.timeout)
+        state = AccountState(name, AsyncCrawler(client, cookie_file, self.limiter))
+        self.accounts[name] = state
+        return state
+
+    @staticmethod
+    def from_cookie_files(pattern: str = os.path.join("config", "cookies*.json"), **kwargs) -> 'PollingEngine':
+        """
+        为匹配 pattern 的每个 cookies 文件创建一个账号，账号名取文件名
+        """
+        engine = PollingEngine(**kwargs)
+        for cookie_file in sorted(glob.glob(pattern)):
+            name = os.path.splitext(os.path.basename(cookie_file))[0]
+            engine.add_account(name, cookie_file)
+        return engine
+
+    async def _poll_account(self, state: AccountState) -> list:
+        try:
+            notices = await state.crawler.get_notice_list(conditional=True)
+        except Exception as e:
+            state.last_error = e
+            state.consecutive_failures += 1
+            raise
+        state.last_poll = time.time()
+        state.last_error = None
+        state.consecutive_failures = 0
+        return notices
+
+    async def poll_once(self) -> dict:
+        """
+        并发轮询所有账号
+        :return: 账号名 -> 通知列表（通知列表未变化时为空列表，失败时为异常对象）
+        """
+        names = list(self.accounts)
+        results = await asyncio.gather(*(self._poll_account(self.accounts[name]) for name in names),
+                                       return_exceptions=True)
+        return dict(zip(names, results))
+
+    async def run(self, interval: float, on_result) -> None:
+        """
+        持续轮询，每轮结束后对每个账号调用 on_result(name, notices_or_exception)
+        """
+        while True:
+            for name, result in (await self.poll_once()).items():
+                if isinstance(result, Exception):
+                    logging.error(f"[{name}] Polling failed: {result}")
+                try:
+                    on_result(name, result)
+                except Exception as e:
+                    logging.error(f"[{name}] Result handler failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def aclose(self) -> None:
+        # 各账号的 AsyncClient 共享 transport，只需关闭一次
+        await self.transport.aclose()
@@ -1,64 +1,96 @@
-import requests
-from bs4 import BeautifulSoup as bs
-import json
+import asyncio
+from .async_crawler import AsyncCrawler, NoticeSessionExpired  # noqa: F401
+
 
 class Crawler:
-    myspace_url = "https://i.mooc.ucas.edu.cn"
-    request_notice_url = "https://notice.mooc.ucas.edu.cn/pc/notice/getNoticeList"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
-    }
-
-    def __init__(self, session: requests.Session, cookie_file: str):
-        self.session = session
-        self.cookie_file = cookie_file
-        
+    """
+    AsyncCrawler 的同步封装，供单账号的脚本使用
+    """
+    def __init__(self, crawler: AsyncCrawler, loop: asyncio.AbstractEventLoop = None):
+        self._crawler = crawler
+        self._loop = loop or asyncio.new_event_loop()
+
     @staticmethod
     def create_from_cookies(cookie_file: str) -> 'Crawler':
-        with open(cookie_file, 'r') as f:
-            cookies = json.load(f)
-        session = requests.Session()
-        session.cookies.update(cookies)
-        return Crawler(session, cookie_file)
-    
+        return Crawler(AsyncCrawler.create_from_cookies(cookie_file))
+
+    def _run(self, coro):
+        return self._loop.run_until_complete(coro)
+
+    @property
+    def cookie_file(self) -> str:
+        return self._crawler.cookie_file
+
+    @property
+    def notice_link(self) -> str:
+        return self._crawler.notice_link
+
+    @property
+    def is_warm(self) -> bool:
+        return self._crawler.is_warm
+
+    @property
+    def unchanged(self) -> bool:
+        return self._crawler.unchanged
+
+    def invalidate(self) -> None:
+        self._crawler.invalidate()
+
     def save_cookies(self) -> None:
-        with open(self.cookie_file, 'w') as f:
-            json.dump(requests.utils.dict_from_cookiejar(self.session.cookies), f, indent=4)
+        self._crawler.save_cookies()
 
     def get_notice_link(self) -> str:
         """
         从个人空间页面获取通知链接
         """
-        try:
-            response = self.session.get(self.myspace_url, headers=self.headers)
-            response.raise_for_status()
-            soup = bs(response.text, 'lxml')
-            notice_link_tag = soup.find('a', id='zne_tz_icon')
-            if notice_link_tag:
-                self.notice_link = notice_link_tag['href'].split('\'')[-2]
-                return self.notice_link
-            else:
-                print("未找到通知链接")
-                raise ValueError("未找到通知链接")
-        except requests.RequestException as e:
-            print(f"请求错误: {e}")
-            raise ConnectionError(f"请求错误: {e}")
-        except Exception as e:
-            print(f"解析错误: {e}")
-            raise Exception(f"解析错误: {e}")
-
-    def get_notice_list(self) -> list:
+        return self._run(self._crawler.get_notice_link())
+
+    def get_notice_list(self, conditional: bool = False) -> list:
         """
         获取通知列表的JSON数据
         """
-        self.get_notice_link()
+        return self._run(self._crawler.get_notice_list(conditional))
+
+    def mark_caught_up(self) -> None:
+        self._crawler.mark_caught_up()
+
+    def iter_notices(self, conditional: bool = True) -> 'NoticeIterator':
+        """
+        逐条产出通知；提前停止迭代时关闭响应
+        通知列表未变化（304）时不产出任何通知，此时 unchanged 为 True
+        """
+        return NoticeIterator(self, self._crawler.iter_notices(conditional))
+
+    def close(self) -> None:
+        self._run(self._crawler.aclose())
+        self._loop.close()
+
+
+class NoticeIterator:
+    """
+    Crawler.iter_notices 返回的同步迭代器；消费方因遇到已读通知而停止时先调用 mark_caught_up 再 close
+    """
+    def __init__(self, crawler: Crawler, notices):
+        self._crawler = crawler
+        self._notices = notices
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._closed:
+            raise StopIteration
         try:
-            self.session.get(self.notice_link, headers=self.headers)
-            response = self.session.get(self.request_notice_url, headers=self.headers)
-            response.raise_for_status()
-            notice_data = response.json()
-            return notice_data["notices"]["list"]
-        except requests.RequestException as e:
-            raise ConnectionError(f"网络请求失败: {e}")
-        except (KeyError, json.JSONDecodeError) as e:
-            raise TypeError(f"解析JSON失败: {e}")
\ No newline at end of file
+            return self._crawler._run(self._notices.__anext__())
+        except StopAsyncIteration:
+            self.close()
+            raise StopIteration
+
+    def mark_caught_up(self) -> None:
+        self._crawler.mark_caught_up()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._crawler._run(self._notices.aclose())
@@ -0,0 +1,124 @@
+import json
+import codecs
+
+
+class JsonArrayStream:
+    """
+    增量解析 JSON 文档中指定路径下的数组，每收到一块数据就产出已完整的元素，
+    无需等待整个响应下载完毕
+    """
+    WHITESPACE = " \t\r\n"
+
+    def __init__(self, path: tuple):
+        """
+        :param path: 数组所在的键路径，例如 ("notices", "list")
+        """
+        self.path = tuple(path)
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='strict')
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._stack = []         # 每层: [类型, 路径, 当前键, 是否期待键]
+        self._string_start = None
+        self._escape = False
+        self.in_array = False    # 已进入目标数组
+        self.done = False        # 目标数组已结束
+
+    def feed(self, chunk: bytes) -> list:
+        """
+        输入一块原始字节
+        :return: 本块新解析出的数组元素
+        """
+        if self.done:
+            return []
+        self._buffer += self._decoder.decode(chunk)
+        if not self.in_array:
+            self._seek_array()
+        return self._read_items() if self.in_array else []
+
+    def close(self) -> None:
+        """
+        数据结束时调用；未找到目标数组或数组不完整时抛出 ValueError
+        """
+        if not self.done:
+            where = "incomplete" if self.in_array else "not found"
+            raise ValueError(f"JSON array at {'.'.join(self.path)} is {where}")
+
+    def _seek_array(self) -> None:
+        """
+        扫描结构直到进入目标数组；字符串可能跨块，因此状态在两次调用之间保留
+        """
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer):
+            if self._string_start is not None:
+                char = buffer[pos]
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._end_string(json.loads(buffer[self._string_start:pos + 1]))
+                    self._string_start = None
+                pos += 1
+                continue
+
+            char = buffer[pos]
+            if char in self.WHITESPACE or char == ':':
+                pass
+            elif not self._stack and char not in '{[':
+                raise ValueError(f"Unexpected character {char!r} at the start of the JSON document")
+            elif char == '"':
+                self._string_start = pos
+            elif char in '{[':
+                parent = self._stack[-1] if self._stack else None
+                path = parent[1] + (parent[2],) if parent and parent[0] == '{' else (parent[1] if parent else ())
+                if char == '[' and path == self.path:
+                    self.in_array = True
+                    pos += 1
+                    break
+                self._stack.append([char, path, None, char == '{'])
+            elif char in '}]':
+                self._stack.pop()
+                if not self._stack:
+                    # 整个文档结束仍未找到目标数组
+                    self._pos = pos + 1
+                    self._buffer = buffer
+                    return
+            elif char == ',':
+                if self._stack[-1][0] == '{':
+                    self._stack[-1][3] = True
+            pos += 1
+
+        if self.in_array:
+            self._buffer, self._pos = buffer[pos:], 0
+        else:
+            self._pos = pos
+
+    def _end_string(self, value: str) -> None:
+        frame = self._stack[-1] if self._stack else None
+        if frame and frame[0] == '{' and frame[3]:
+            frame[2] = value
+            frame[3] = False
+
+    def _read_items(self) -> list:
+        items = []
+        buffer, pos = self._buffer, 0
+        while True:
+            while pos < len(buffer) and (buffer[pos] in self.WHITESPACE or buffer[pos] == ','):
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == ']':
+                self.done = True
+                pos += 1
+                break
+            try:
+                item, end = self._json.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # 元素尚不完整，等待更多数据
+            if end == len(buffer) and not isinstance(item, (dict, list, str)):
+                break  # 数字或字面量可能被截断
+            items.append(item)
+            pos = end
+        self._buffer = buffer[pos:]
+        return items
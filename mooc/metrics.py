@@ -0,0 +1,290 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class _Metric:
+    """
+    指标基类：按标签值分组保存数据
+    """
+    TYPE = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: tuple, extra: dict = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key: tuple, value) -> list:
+        return [f"{self.name}{self._format_labels(key)} {value}"]
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            items = list(self._values.items())
+        return {",".join(f"{n}={v}" for n, v in zip(self.labelnames, key)) or "_": self._dump_value(value)
+                for key, value in items}
+
+    def _dump_value(self, value):
+        return value
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    TYPE = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # 每个桶的计数（不累加）、总和、总数
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def totals(self) -> dict:
+        """
+        :return: 标签值元组 -> (次数, 总和)，用于计算两个时间点之间的增量
+        """
+        with self._lock:
+            return {key: (state[2], state[1]) for key, state in self._values.items()}
+
+    def _render_value(self, key: tuple, value) -> list:
+        counts, total, count = value
+        lines, cumulative = [], 0
+        for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': le})} {cumulative}")
+        lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+        lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+    def _dump_value(self, value):
+        counts, total, count = value
+        return {"count": count, "sum": total, "mean": total / count if count else 0.0,
+                "buckets": dict(zip([repr(b) for b in self.buckets] + ["+Inf"], counts))}
+
+
+class MetricsRegistry:
+    """
+    指标注册表，同名指标只创建一次
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, documentation: str, labelnames: tuple, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as {metric.TYPE}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._get(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._get(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), **kwargs) -> Histogram:
+        return self._get(Histogram, name, documentation, labelnames, **kwargs)
+
+    def render(self) -> str:
+        """
+        Prometheus 文本格式
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.to_dict() for metric in metrics}
+
+
+REGISTRY = MetricsRegistry()
+
+# 各模块共用的指标
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "Outbound HTTP requests.", ("endpoint", "status"))
+HTTP_SECONDS = REGISTRY.histogram("http_request_seconds", "Outbound HTTP request latency.", ("endpoint",))
+HTTP_RETRIES = REGISTRY.counter("http_retries_total", "Retried outbound HTTP requests.", ("endpoint", "reason"))
+GRAPH_THROTTLES = REGISTRY.counter("graph_throttled_total", "Graph responses with status 429 or 503.", ("endpoint",))
+NEW_NOTICES = REGISTRY.counter("notices_new_total", "Notices seen for the first time.")
+TASKS_ADDED = REGISTRY.counter("todo_tasks_added_total", "Tasks created in Microsoft To Do.")
+TASKS_UPDATED = REGISTRY.counter("todo_tasks_updated_total", "Tasks patched in Microsoft To Do.", ("change",))
+STAGE_SECONDS = REGISTRY.histogram("cycle_stage_seconds", "Duration of each poll cycle stage.", ("stage",))
+SEEN_NOTICES = REGISTRY.gauge("seen_notices", "Notice UUIDs in the seen-notice index.")
+LOCAL_TASKS = REGISTRY.gauge("local_tasks", "Homework tasks in local state.")
+REMINDERS = REGISTRY.counter("reminders_fired_total", "Local deadline reminders fired.", ("stage",))
+NOTIFICATIONS = REGISTRY.counter("notifications_total", "Notification deliveries per sink.", ("sink", "status"))
+
+
+class TimedIterator:
+    """
+    包装一个迭代器，累计花在取下一个元素上的时间（例如流式下载与解码）
+    """
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.elapsed = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self._iterator)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    def mark_caught_up(self) -> None:
+        if hasattr(self._iterator, 'mark_caught_up'):
+            self._iterator.mark_caught_up()
+
+    def close(self) -> None:
+        if hasattr(self._iterator, 'close'):
+            self._iterator.close()
+
+
+class MetricsServer:
+    """
+    在后台线程中提供 /metrics（Prometheus 文本格式）与 /metrics.json
+    """
+    def __init__(self, port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY):
+        from http.server import ThreadingHTTPServer
+        handler = self._handler(registry)
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+
+    @staticmethod
+    def _handler(registry: MetricsRegistry):
+        from http.server import BaseHTTPRequestHandler
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if self.path == "/metrics":
+                    body, content_type = registry.render().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(registry.to_dict()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self) -> 'MetricsServer':
+        self.thread.start()
+        logging.info(f"Serving metrics on http://{self.server.server_address[0]}:{self.server.server_address[1]}/metrics")
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsDumper:
+    """
+    定期将所有指标以 JSON 原子地写入文件
+    """
+    def __init__(self, path: str, interval: float = 300, registry: MetricsRegistry = REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="metrics-dumper", daemon=True)
+
+    def dump(self) -> None:
+        tmp_file = f"{self.path}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"timestamp": time.time(), "metrics": self.registry.to_dict()}, f)
+        os.replace(tmp_file, self.path)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.dump()
+            except OSError as e:
+                logging.error(f"Failed to dump metrics: {e}")
+
+    def start(self) -> 'MetricsDumper':
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.dump()
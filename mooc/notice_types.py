@@ -0,0 +1,145 @@
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+
+
+class NoticeType:
+    """
+    一种通知类型：标题匹配规则加上按标签（如 "课程名称："）提取的字段。
+    字段按标签查找，与行的先后顺序无关；同一标签出现多次时取第一次
+    """
+    def __init__(self, name: str, title_pattern: str, labels: dict = None, required: tuple = (), build=None):
+        """
+        :param name: 类型名
+        :param title_pattern: 匹配标题的正则表达式（search）
+        :param labels: 字段名 -> 标签或标签元组（别名）
+        :param required: 必须提取到的字段，缺少时该类型不适用
+        :param build: (原始通知, 字段字典) -> 解析结果；格式不符时抛出 ValueError 或 KeyError
+        """
+        self.name = name
+        self.title_pattern = re.compile(title_pattern)
+        self.required = tuple(required)
+        self.build = build
+        self._fields = {}
+        for field, aliases in (labels or {}).items():
+            for alias in (aliases,) if isinstance(aliases, str) else aliases:
+                self._fields[alias] = field
+        self._label_pattern = None
+        if self._fields:
+            # 较长的标签优先，避免 "考试时间" 被 "时间" 抢先匹配
+            alternatives = "|".join(re.escape(alias) for alias in sorted(self._fields, key=len, reverse=True))
+            self._label_pattern = re.compile(rf"(?:^|[\r\n])[ \t]*({alternatives})[ \t]*[：:][ \t]*([^\r\n]*)")
+
+    def __repr__(self) -> str:
+        return f"NoticeType({self.name!r})"
+
+    def matches(self, notice: dict) -> bool:
+        return self.title_pattern.search(notice.get("title", "")) is not None
+
+    def extract(self, notice: dict):
+        """
+        :return: 字段字典；缺少必需字段时为 None
+        """
+        fields = {}
+        if self._label_pattern is not None:
+            for match in self._label_pattern.finditer(notice.get("content", "")):
+                fields.setdefault(self._fields[match.group(1)], match.group(2).strip())
+        if any(not fields.get(field) for field in self.required):
+            return None
+        return fields
+
+
+class NoticeTypeRegistry:
+    """
+    按注册顺序尝试各通知类型，第一个标题匹配且字段完整的类型生效；
+    提取或构造失败时继续尝试后面的类型，最后一个类型应能匹配任意通知作为兜底
+    """
+    def __init__(self, types=()):
+        self.types = list(types)
+
+    def register(self, notice_type: NoticeType, index: int = None) -> None:
+        """
+        :param index: 插入位置，默认插在兜底类型之前
+        """
+        if index is None:
+            index = max(0, len(self.types) - 1)
+        self.types.insert(index, notice_type)
+
+    def classify(self, notice: dict, start: int = 0) -> tuple:
+        """
+        :param start: 从第几个类型开始尝试
+        :return: (类型下标, 类型, 字段字典)；没有类型适用时抛出 ValueError
+        """
+        for index in range(start, len(self.types)):
+            notice_type = self.types[index]
+            if not notice_type.matches(notice):
+                continue
+            fields = notice_type.extract(notice)
+            if fields is not None:
+                return index, notice_type, fields
+            logging.debug(f"Notice {notice.get('uuid')} looks like {notice_type.name} but lacks required fields.")
+        raise ValueError(f"No notice type matches notice {notice.get('uuid')}")
+
+    def parse(self, notice: dict):
+        """
+        解析通知；某类型构造失败（如时间格式不符）时退回后面的类型
+        """
+        index = 0
+        while True:
+            index, notice_type, fields = self.classify(notice, index)
+            try:
+                return notice_type.build(notice, fields)
+            except (KeyError, ValueError) as e:
+                if index == len(self.types) - 1:
+                    raise
+                logging.debug(f"Failed to parse notice {notice.get('uuid')} as {notice_type.name}: {e}")
+                index += 1
+
+
+class ParseCache:
+    """
+    解析结果的 LRU 缓存，键为通知 UUID 与内容哈希：同一通知再次出现时直接复用解析结果，
+    内容被修改过的通知会重新解析。解析结果视为不可变，可以安全共享
+    """
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(notice: dict):
+        """
+        :return: (UUID, 内容哈希)；通知没有 UUID 时为 None（不缓存）
+        """
+        uuid = notice.get("uuid")
+        if not uuid:
+            return None
+        digest = hashlib.blake2b(digest_size=8)
+        for field in ("title", "content", "createrName", "completeTime"):
+            digest.update(str(notice.get(field, "")).encode())
+            digest.update(b"\0")
+        return uuid, digest.digest()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from .sparser import Message
+from .metrics import NOTIFICATIONS
+
+
+class Sink:
+    """
+    推送目标的基类，send 失败时抛出异常即可由调度器重试
+    """
+    name = "sink"
+
+    def send(self, message: Message) -> None:
+        raise NotImplementedError
+
+
+class StdoutSink(Sink):
+    """
+    输出到标准输出，用于本地测试
+    """
+    name = "stdout"
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+
+    def send(self, message: Message) -> None:
+        with self.lock:
+            self.stream.write(f"[{message.title}]\n{message.content}\n\n")
+            self.stream.flush()
+
+
+class FileSink(Sink):
+    """
+    以 JSON 行追加写入本地文件，用于测试或留档
+    """
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def send(self, message: Message) -> None:
+        line = json.dumps({"time": datetime.now().isoformat(timespec="seconds"),
+                           "title": message.title, "content": message.content}, ensure_ascii=False)
+        with self.lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+
+
+class PushbulletSink(Sink):
+    """
+    通过 Pushbullet 推送
+    """
+    name = "pushbullet"
+
+    def __init__(self, api_key: str):
+        from pushbullet import Pushbullet
+        self.client = Pushbullet(api_key)
+
+    @classmethod
+    def from_key_file(cls, key_file: str):
+        """
+        从文件中读取 API key，文件不存在或为空时返回 None
+        """
+        if not os.path.exists(key_file):
+            return None
+        with open(key_file, 'r') as f:
+            api_key = f.read().strip()
+        return cls(api_key) if api_key else None
+
+    def send(self, message: Message) -> None:
+        self.client.push_note(message.title, message.content)
+
+
+class NotificationDispatcher:
+    """
+    后台推送队列：enqueue 只入队、从不阻塞；
+    收集线程把一段时间内到达的通知合并为摘要，工作线程池按推送目标分别发送并重试
+    """
+    DIGEST_LINES = 20  # 摘要中最多列出的通知标题数
+
+    def __init__(self, sinks: list, workers: int = 2, queue_size: int = 1000, coalesce_window: float = 2.0,
+                 digest_threshold: int = 3, max_retries: int = 3, backoff_base: float = 2.0,
+                 dedupe_size: int = 10000):
+        """
+        :param sinks: 推送目标列表
+        :param workers: 发送线程数
+        :param queue_size: 待处理通知队列的容量，队列满时丢弃新通知
+        :param coalesce_window: 收到第一条通知后等待更多通知的时间 (s)
+        :param digest_threshold: 一批中达到多少条时合并为一条摘要
+        :param max_retries: 每个推送目标的最大重试次数
+        :param backoff_base: 重试的指数退避基数 (s)
+        :param dedupe_size: 记住最近多少个通知 UUID 用于去重
+        """
+        self.sinks = list(sinks)
+        self.coalesce_window = coalesce_window
+        self.digest_threshold = digest_threshold
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.dedupe_size = dedupe_size
+        self.recent = OrderedDict()
+        self.lock = threading.Lock()
+        self.inbox = queue.Queue(maxsize=queue_size)
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.collector = threading.Thread(target=self._collect, name="notify-collector", daemon=True)
+        self.workers = [threading.Thread(target=self._work, name=f"notify-worker-{i}", daemon=True)
+                        for i in range(workers)]
+        self.closed = False
+        self.collector.start()
+        for worker in self.workers:
+            worker.start()
+
+    def enqueue(self, uuid: str, message: Message) -> bool:
+        """
+        将一条通知加入推送队列
+        :return: 是否入队（重复的 UUID、队列已满或已关闭时返回 False）
+        """
+        if self.closed or not self.sinks:
+            return False
+        with self.lock:
+            if uuid in self.recent:
+                return False
+            self.recent[uuid] = None
+            if len(self.recent) > self.dedupe_size:
+                self.recent.popitem(last=False)
+        try:
+            self.inbox.put_nowait(message)
+        except queue.Full:
+            logging.warning(f"Notification queue is full, dropping: {message.title}")
+            NOTIFICATIONS.inc(sink="queue", status="dropped")
+            return False
+        return True
+
+    @classmethod
+    def digest(cls, messages: list) -> Message:
+        """
+        将多条通知合并为一条摘要
+        """
+        lines = [f"• {message.title}" for message in messages[:cls.DIGEST_LINES]]
+        if len(messages) > cls.DIGEST_LINES:
+            lines.append(f"…… 另有 {len(messages) - cls.DIGEST_LINES} 条")
+        return Message(f"{len(messages)} 条新通知", "\n".join(lines))
+
+    def _collect(self) -> None:
+        stopping = False
+        while not stopping:
+            message = self.inbox.get()
+            if message is None:
+                break
+            batch, deadline = [message], time.monotonic() + self.coalesce_window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    message = self.inbox.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if message is None:
+                    stopping = True
+                    break
+                batch.append(message)
+
+            outgoing = [self.digest(batch)] if len(batch) >= self.digest_threshold else batch
+            for message in outgoing:
+                for sink in self.sinks:
+                    self.jobs.put((sink, message))
+        for _ in self.workers:
+            self.jobs.put(None)
+
+    def _work(self) -> None:
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            self._send(*job)
+
+    def _send(self, sink: Sink, message: Message) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                sink.send(message)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logging.error(f"Failed to send notification via {sink.name}: {e}")
+                    NOTIFICATIONS.inc(sink=sink.name, status="failed")
+                    return
+                NOTIFICATIONS.inc(sink=sink.name, status="retried")
+                time.sleep(self.backoff_base * 2 ** attempt)
+            else:
+                NOTIFICATIONS.inc(sink=sink.name, status="sent")
+                return
+
+    def close(self, timeout: float = None) -> None:
+        """
+        停止接收新通知，发送完队列中剩余的通知后返回（最多等待 timeout 秒）
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.inbox.put(None)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in [self.collector] + self.workers:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
@@ -0,0 +1,231 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from ms_todo.client import ThrottledError
+from .metrics import STAGE_SECONDS, TimedIterator
+from .retention import task_deadline
+from .sparser import Homework
+
+
+class Pipeline:
+    """
+    轮询流水线：爬取、解析、同步三个阶段各占一个线程，阶段之间用有界队列连接
+    解析跟不上时爬取阶段在入队处阻塞（同时暂停读取响应流）；同步请求最多积压一个，
+    Microsoft To Do 变慢或限流只会推迟同步，不会推迟下一次轮询
+    """
+    _STOP = object()
+
+    def __init__(self, crawler, sparser, task_manager, scheduler, notifier=None,
+                 queue_size: int = 256, sync_interval: float = 60, profiler=None, reminders=None):
+        """
+        :param crawler: Crawler
+        :param sparser: Sparser
+        :param task_manager: TaskManager
+        :param scheduler: PollScheduler
+        :param notifier: 可选，NotificationDispatcher
+        :param queue_size: 待解析通知队列的容量
+        :param sync_interval: 没有新作业时定期同步的间隔 (s)
+        :param profiler: 可选，CycleProfiler，统计并按需剖析每个轮询周期
+        :param reminders: 可选，ReminderEngine，新作业加入后安排截止提醒
+        """
+        self.crawler = crawler
+        self.sparser = sparser
+        self.task_manager = task_manager
+        self.scheduler = scheduler
+        self.notifier = notifier
+        self.sync_interval = sync_interval
+        self.profiler = profiler
+        self.reminders = reminders
+        self.notices = queue.Queue(maxsize=queue_size)
+        self.sync_requests = queue.Queue(maxsize=1)
+        self.stopping = threading.Event()
+        self.threads = [
+            threading.Thread(target=self._crawl_stage, name="pipeline-crawl"),
+            threading.Thread(target=self._parse_stage, name="pipeline-parse"),
+            threading.Thread(target=self._sync_stage, name="pipeline-sync"),
+        ]
+
+    def start(self) -> 'Pipeline':
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def wait(self) -> None:
+        """
+        阻塞直到流水线停止（带超时地等待，以便主线程能响应 KeyboardInterrupt）
+        """
+        for thread in self.threads:
+            while thread.is_alive():
+                thread.join(1.0)
+
+    def stop(self, timeout: float = None) -> None:
+        """
+        停止轮询：爬取阶段结束当前一轮后停止，已入队的通知解析并保存完，最后处理积压的同步请求
+        """
+        self.stopping.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        if self.profiler is not None:
+            self.profiler.close()
+
+    def _stage(self, name: str):
+        return self.profiler.stage(name) if self.profiler is not None else nullcontext()
+
+    def request_sync(self) -> None:
+        """
+        请求尽快同步；已有同步请求在排队时合并为一次
+        """
+        try:
+            self.sync_requests.put_nowait(True)
+        except queue.Full:
+            pass
+
+    # ---- 爬取 ----
+
+    def _deadlines(self) -> list:
+        """
+        本地作业的截止时间；开启保留策略时直接读取其截止时间索引，不再逐条解析任务
+        """
+        task_manager = self.task_manager
+        with task_manager.lock:
+            if task_manager.retention is not None:
+                timestamps = list(task_manager.retention.index.deadlines.values())
+                return [datetime.fromtimestamp(timestamp) for timestamp in timestamps]
+            local_tasks = list(task_manager.local_tasks.values())
+        return [deadline for deadline in map(task_deadline, local_tasks) if deadline is not None]
+
+    def _crawl_stage(self) -> None:
+        try:
+            while not self.stopping.is_set():
+                if self.scheduler.allow('mooc'):
+                    if self.profiler is not None:
+                        self.profiler.begin_cycle()
+                    with self._stage("crawl"):
+                        self._crawl_once()
+                delay = self.scheduler.next_delay(self._deadlines())
+                logging.info(f"Next check in {delay:.0f}s.")
+                self.stopping.wait(delay)
+        finally:
+            self.notices.put(self._STOP)
+
+    def _crawl_once(self) -> None:
+        new_count = 0
+        notices = TimedIterator(self.crawler.iter_notices())
+        try:
+            logging.info("Checking for new notices...")
+            for notice in self.sparser.iter_new_notices(notices):
+                self.notices.put(notice)
+                new_count += 1
+                if self.stopping.is_set():
+                    break
+        except ConnectionError as e:
+            logging.error(f"Failed to fetch notices: {e}")
+            self.scheduler.record_failure('mooc')
+        except Exception as e:
+            # 会话失效（找不到通知链接）、响应无法解析等同样计入失败，断路器据此退避
+            logging.error(f"Failed to crawl notices: {e}")
+            self.scheduler.record_failure('mooc')
+        else:
+            self.scheduler.record_success('mooc')
+            if self.crawler.unchanged:
+                logging.info("Notice list unchanged.")
+        STAGE_SECONDS.observe(notices.elapsed, stage="crawl")
+        self.scheduler.record_activity(new_count)
+
+    # ---- 解析 ----
+
+    def _parse_stage(self) -> None:
+        stopped = False
+        try:
+            while not stopped:
+                notice = self.notices.get()
+                if notice is self._STOP:
+                    break
+                # 一次取走队列中已有的全部通知，处理完后统一写盘
+                batch = [notice]
+                while True:
+                    try:
+                        notice = self.notices.get_nowait()
+                    except queue.Empty:
+                        break
+                    if notice is self._STOP:
+                        stopped = True
+                        break
+                    batch.append(notice)
+                with self._stage("parse"):
+                    self._parse_batch(batch)
+        finally:
+            self.sync_requests.put(self._STOP)
+
+    def _parse_batch(self, batch: list) -> None:
+        start = time.perf_counter()
+        homeworks = 0
+        for notice in batch:
+            try:
+                homeworks += self._handle(notice)
+            except Exception as e:
+                logging.error(f"Failed to process notice {notice.get('uuid')}: {e}")
+        try:
+            self.task_manager.save_local_tasks()
+        except OSError as e:
+            logging.error(f"Failed to save local tasks: {e}")
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage="parse")
+        if homeworks:
+            self.request_sync()
+
+    def _handle(self, notice: dict) -> bool:
+        """
+        处理一条新通知，新的作业写入本地任务
+        :return: 是否新增了作业任务
+        """
+        n = self.sparser.sparse_notice(notice)
+        added = False
+        if isinstance(n, Homework):
+            logging.info(f"New homework found: \n{n}")
+            if n.end < datetime.now():
+                logging.info(f"Homework has already expired: {n}")
+                return False
+
+            # 更新本地缓存的作业任务
+            self.task_manager.set_local_task(n.local_task_title, n.to_local_task())
+            if self.reminders is not None:
+                self.reminders.schedule(n.local_task_title, n.end)
+            added = True
+        if self.notifier is not None:
+            self.notifier.enqueue(notice['uuid'], n.message)
+        return added
+
+    # ---- 同步 ----
+
+    def _sync_stage(self) -> None:
+        next_sync = 0.0
+        while True:
+            try:
+                request = self.sync_requests.get(timeout=max(0.0, next_sync - time.monotonic()))
+            except queue.Empty:
+                request = None
+            if request is self._STOP:
+                break
+            if not self.scheduler.allow('graph'):
+                next_sync = time.monotonic() + self.scheduler.breakers['graph'].remaining()
+                continue
+            with self._stage("sync"):
+                self._sync_once()
+            next_sync = time.monotonic() + self.sync_interval
+
+    def _sync_once(self) -> None:
+        try:
+            logging.info("Synchronizing tasks with Microsoft To Do.")
+            with STAGE_SECONDS.time(stage="sync"):
+                self.task_manager.sync_tasks()
+            self.scheduler.record_success('graph')
+        except ThrottledError as e:
+            logging.warning(f"Microsoft To Do is throttling requests: {e}")
+            self.scheduler.record_failure('graph', retry_after=e.retry_after)
+        except Exception as e:
+            logging.error(f"Failed to synchronize tasks: {e}")
+            self.scheduler.record_failure('graph')
@@ -0,0 +1,228 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import shutil
+import signal
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from .metrics import HTTP_SECONDS
+
+
+class _Cycle:
+    """
+    一个轮询周期：从一次爬取开始到下一次爬取开始，期间各线程中运行的阶段都计入该周期
+    """
+    def __init__(self, number: int, profiling: bool):
+        self.number = number
+        self.profiling = profiling
+        self.started = datetime.now()
+        self.stages = {}    # 阶段名 -> 累计耗时 (s)
+        self.profiles = []  # 各阶段的 cProfile.Profile
+        self.http = HTTP_SECONDS.totals()
+        self.active = 0     # 尚未结束的阶段数
+        self.closed = False
+
+
+class CycleProfiler:
+    """
+    按需剖析轮询周期：调用 request(n) 或收到 SIGUSR1 后，接下来 n 个周期的各阶段在 cProfile 下运行，
+    同时开启 tracemalloc，每个周期结束时在输出目录中写入 pstats、内存快照和报告，只保留最近 keep 个。
+    未开启剖析时只统计各阶段耗时，周期忙碌时间超过 slow_threshold 时记录慢周期报告（阶段耗时与各端点的 HTTP 耗时）。
+    """
+    TOP_FUNCTIONS = 25
+    TOP_ALLOCATIONS = 15
+
+    def __init__(self, output_dir: str = os.path.join("data", "profiles"), keep: int = 10,
+                 slow_threshold: float = 20.0, trace_frames: int = 10):
+        """
+        :param output_dir: 剖析结果目录，每个周期一个子目录
+        :param keep: 保留的周期子目录数
+        :param slow_threshold: 周期忙碌时间超过该值 (s) 时记录慢周期报告
+        :param trace_frames: tracemalloc 记录的调用栈深度
+        """
+        self.output_dir = output_dir
+        self.keep = keep
+        self.slow_threshold = slow_threshold
+        self.trace_frames = trace_frames
+        self.lock = threading.Lock()
+        self.pending = 0
+        self._signalled = 0  # 信号处理函数只修改该计数，不获取锁
+        self.current = None
+        self.cycles = 0
+        self._tracing = False
+
+    def request(self, cycles: int = 1) -> None:
+        """
+        剖析接下来的 cycles 个周期
+        """
+        with self.lock:
+            self.pending += cycles
+        logging.info(f"Profiling the next {cycles} poll cycles.")
+
+    def install_signal(self, cycles: int = 3, signum=signal.SIGUSR1) -> None:
+        """
+        收到信号时剖析接下来的 cycles 个周期（必须在主线程中调用）
+        """
+        def handler(_signum, _frame):
+            self._signalled += cycles
+        signal.signal(signum, handler)
+
+    # ---- 周期与阶段 ----
+
+    def begin_cycle(self) -> None:
+        """
+        结束当前周期并开始下一个周期，由爬取阶段在每次爬取前调用
+        """
+        with self.lock:
+            if self._signalled:
+                self.pending += self._signalled
+                logging.info(f"Profiling the next {self._signalled} poll cycles.")
+                self._signalled = 0
+            previous = self.current
+            profiling = self.pending > 0
+            if profiling:
+                self.pending -= 1
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(self.trace_frames)
+                    self._tracing = True
+                tracemalloc.reset_peak()
+            self.cycles += 1
+            self.current = _Cycle(self.cycles, profiling)
+            finished = self._close(previous)
+        if finished:
+            self._finish(finished)
+
+    def close(self) -> None:
+        """
+        结束当前周期，停止时调用
+        """
+        with self.lock:
+            finished = self._close(self.current)
+            self.current = None
+        if finished:
+            self._finish(finished)
+
+    def _close(self, cycle: _Cycle):
+        """
+        标记周期结束；所有阶段都已结束时返回该周期以便生成报告（须持有锁）
+        """
+        if cycle is None:
+            return None
+        cycle.closed = True
+        return cycle if cycle.active == 0 else None
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        计入当前周期的一个阶段；周期开启剖析时该阶段在本线程的 cProfile 下运行
+        """
+        with self.lock:
+            cycle = self.current
+            if cycle is not None:
+                cycle.active += 1
+        if cycle is None:
+            yield
+            return
+
+        profile = cProfile.Profile() if cycle.profiling else None
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12 起同一时间只能有一个 profiler，与其他线程中的阶段重叠时本阶段只计时
+                profile = None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                cycle.stages[name] = cycle.stages.get(name, 0.0) + elapsed
+                if profile is not None:
+                    cycle.profiles.append(profile)
+                cycle.active -= 1
+                finished = cycle if cycle.closed and cycle.active == 0 else None
+            if finished:
+                self._finish(finished)
+
+    # ---- 报告 ----
+
+    @staticmethod
+    def _http_delta(cycle: _Cycle) -> list:
+        """
+        :return: [(端点, 次数, 耗时)]，按耗时降序
+        """
+        rows = []
+        for key, (count, total) in HTTP_SECONDS.totals().items():
+            old_count, old_total = cycle.http.get(key, (0, 0.0))
+            if count > old_count:
+                rows.append((",".join(key), count - old_count, total - old_total))
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def report(self, cycle: _Cycle) -> str:
+        busy = sum(cycle.stages.values())
+        lines = [f"Poll cycle {cycle.number} started at {cycle.started:%Y-%m-%d %H:%M:%S}: {busy:.2f}s busy"]
+        for name, seconds in sorted(cycle.stages.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"  stage {name:<12} {seconds:8.3f}s")
+        for endpoint, count, seconds in self._http_delta(cycle):
+            lines.append(f"  http  {endpoint:<40} {count:5d} calls {seconds:8.3f}s")
+        return "\n".join(lines)
+
+    def _finish(self, cycle: _Cycle) -> None:
+        try:
+            report = self.report(cycle)
+            if cycle.profiling:
+                directory = self._write(cycle, report)
+                logging.info(f"Profile of poll cycle {cycle.number} written to {directory}.\n{report}")
+            elif sum(cycle.stages.values()) >= self.slow_threshold:
+                logging.warning(f"Slow poll cycle.\n{report}")
+        except Exception as e:
+            logging.error(f"Failed to write the profile of poll cycle {cycle.number}: {e}")
+        finally:
+            with self.lock:
+                if self._tracing and self.pending == 0 and not (self.current and self.current.profiling):
+                    tracemalloc.stop()
+                    self._tracing = False
+
+    def _write(self, cycle: _Cycle, report: str) -> str:
+        directory = os.path.join(self.output_dir, f"{cycle.started:%Y%m%d-%H%M%S}-cycle{cycle.number:06d}")
+        os.makedirs(directory, exist_ok=True)
+
+        sections = [report]
+        if cycle.profiles:
+            text = io.StringIO()
+            stats = pstats.Stats(cycle.profiles[0], stream=text)
+            for profile in cycle.profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(os.path.join(directory, "cycle.pstats"))
+            stats.sort_stats("cumulative").print_stats(self.TOP_FUNCTIONS)
+            sections.append(text.getvalue())
+
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            snapshot.dump(os.path.join(directory, "memory.snapshot"))
+            current, peak = tracemalloc.get_traced_memory()
+            lines = [f"Traced memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB"]
+            lines.extend(str(stat) for stat in snapshot.statistics("lineno")[:self.TOP_ALLOCATIONS])
+            sections.append("\n".join(lines))
+
+        with open(os.path.join(directory, "report.txt"), 'w') as f:
+            f.write("\n\n".join(sections) + "\n")
+        self._rotate()
+        return directory
+
+    def _rotate(self) -> None:
+        """
+        只保留最近 keep 个周期目录
+        """
+        entries = sorted(entry for entry in os.listdir(self.output_dir)
+                         if os.path.isdir(os.path.join(self.output_dir, entry)))
+        for entry in entries[:-max(1, self.keep)]:
+            shutil.rmtree(os.path.join(self.output_dir, entry), ignore_errors=True)
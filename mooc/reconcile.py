@@ -0,0 +1,185 @@
+# File: mooc/reconcile.py
+
+import hashlib
+import logging
+from .metrics import TASKS_ADDED, TASKS_UPDATED
+
+
+def _due(value) -> str:
+    return value[:10] if value else ""
+
+
+def _reminder(value) -> str:
+    return value[:16].replace("T", " ") if value else ""
+
+
+def content_hash(due_date, reminder_time, completed=False) -> str:
+    """
+    截止日期、提醒时间和完成状态的内容哈希。日期先规范化，
+    使本地记录（YYYY-MM-DD / YYYY-MM-DD HH:MM）与 Graph 返回的 dateTime 得到相同的哈希。
+    """
+    data = f"{_due(due_date)}|{_reminder(reminder_time)}|{int(bool(completed))}"
+    return hashlib.blake2b(data.encode(), digest_size=8).hexdigest()
+
+
+def local_hash(task_data: dict) -> str:
+    return content_hash(task_data.get('due_date'), task_data.get('reminder_time'),
+                        task_data.get('status') == 'completed')
+
+
+def remote_hash(task: dict) -> str:
+    return content_hash((task.get('dueDateTime') or {}).get('dateTime'),
+                        (task.get('reminderDateTime') or {}).get('dateTime'),
+                        task.get('status') == 'completed')
+
+
+class SyncPlan:
+    """
+    一次同步需要的最小变更集
+    """
+    def __init__(self):
+        self.creates = []   # (标识, 本地任务)
+        self.updates = []   # (标识, 远程任务 ID, 变更字段, 本地内容哈希)
+        self.bindings = []  # (标识, 远程任务 ID, 本地内容哈希)，无需网络请求的新绑定
+        self.unbinds = []   # 本地已不存在的标识
+        self.unchanged = 0
+        self.failed = set()  # 执行后仍未生效的标识，下次同步重新计划
+
+    @property
+    def empty(self) -> bool:
+        return not (self.creates or self.updates or self.bindings or self.unbinds)
+
+    def __str__(self) -> str:
+        completions = sum(changes.get('status') == 'completed' for _, _, changes, _ in self.updates)
+        return (f"{len(self.creates)} to create, {len(self.updates) - completions} to update, "
+                f"{completions} to complete, {self.unchanged} unchanged")
+
+
+class Reconciler:
+    """
+    按本地任务标识（"课程: 作业名"）对账本地任务与远程 To Do 任务。
+
+    每个标识在镜像中绑定一个远程任务 ID 和上次同步时的本地内容哈希，
+    只有哈希变化的任务才会产生请求；在 To Do 中手动修改或完成的任务不会被覆盖或重新打开。
+    """
+    def __init__(self, client, mirror):
+        """
+        :param client: MicrosoftTodoClient 实例
+        :param mirror: 作业列表的 TaskMirror，应已刷新到最新
+        """
+        self.client = client
+        self.mirror = mirror
+
+    @staticmethod
+    def _changes(task_data: dict, remote: dict) -> dict:
+        """
+        本地任务相对远程任务需要 PATCH 的字段，不会把远程已完成的任务改回未完成
+        """
+        changes = {}
+        due = task_data.get('due_date')
+        if _due(due) != _due((remote.get('dueDateTime') or {}).get('dateTime')):
+            changes['dueDateTime'] = {"dateTime": due, "timeZone": "UTC"} if due else None
+        reminder = task_data.get('reminder_time')
+        if _reminder(reminder) != _reminder((remote.get('reminderDateTime') or {}).get('dateTime')):
+            changes['reminderDateTime'] = {"dateTime": reminder, "timeZone": "UTC"} if reminder else None
+            changes['isReminderOn'] = bool(reminder)
+        if task_data.get('status') == 'completed' and remote.get('status') != 'completed':
+            changes['status'] = 'completed'
+        return changes
+
+    def plan(self, local_tasks: dict, partial: bool = False) -> SyncPlan:
+        """
+        :param local_tasks: 标识 -> 本地任务记录
+        :param partial: local_tasks 只是部分本地任务时为 True，此时不解除其他标识的绑定
+        :return: SyncPlan
+        """
+        plan = SyncPlan()
+        for key, task_data in local_tasks.items():
+            digest = local_hash(task_data)
+            binding = self.mirror.bindings.get(key)
+            remote = self.mirror.bound_task(key)
+
+            if binding is not None and binding['hash'] == digest:
+                # 本地没有变化；远程任务被删除时视为用户有意删除，不再重建
+                plan.unchanged += 1
+                continue
+
+            if remote is None:
+                remote = self.mirror.find_by_title(task_data.get('title', key))
+            if remote is None:
+                if task_data.get('status') == 'completed':
+                    plan.unchanged += 1
+                else:
+                    plan.creates.append((key, task_data))
+                continue
+
+            changes = self._changes(task_data, remote)
+            if changes:
+                plan.updates.append((key, remote['id'], changes, digest))
+            else:
+                plan.bindings.append((key, remote['id'], digest))
+
+        if not partial:
+            plan.unbinds = [key for key in self.mirror.bindings if key not in local_tasks]
+        return plan
+
+    def apply(self, plan: SyncPlan, progress=None) -> tuple:
+        """
+        执行计划：批量创建和批量 PATCH，结果写穿到镜像，镜像只保存一次。
+        失败的条目不绑定，记入 plan.failed，会在下次同步时重新计划。
+
+        :param progress: 可选，每个 $batch 请求完成后以 (阶段 "create"/"update", 已成功数, 总数) 调用
+        :return: (创建数, 更新数)
+        """
+        list_id = self.mirror.list_id
+        created = updated = 0
+
+        def report(stage):
+            return (lambda done, total: progress(stage, done, total)) if progress else None
+
+        if plan.creates:
+            logging.info(f"Adding {len(plan.creates)} tasks to Microsoft To Do in batches.")
+            results = self.client.add_tasks(list_id, [task_data for _, task_data in plan.creates],
+                                            progress=report("create"))
+            for (key, task_data), task in zip(plan.creates, results):
+                if task is None or 'id' not in task:
+                    logging.error(f"Failed to add task '{task_data.get('title', key)}' to the homework list.")
+                    plan.failed.add(key)
+                    continue
+                self.mirror.apply_many([task])
+                self.mirror.bind(key, task['id'], local_hash(task_data))
+                created += 1
+            TASKS_ADDED.inc(created)
+
+        if plan.updates:
+            logging.info(f"Updating {len(plan.updates)} tasks in Microsoft To Do in batches.")
+            results = self.client.update_tasks(list_id, [(task_id, changes) for _, task_id, changes, _ in plan.updates],
+                                               progress=report("update"))
+            for (key, task_id, changes, digest), task in zip(plan.updates, results):
+                if task is None:
+                    logging.error(f"Failed to update task '{key}' in the homework list.")
+                    plan.failed.add(key)
+                    continue
+                self.mirror.apply_many([{**task, 'id': task_id} if task else {'id': task_id, **changes}])
+                self.mirror.bind(key, task_id, digest)
+                TASKS_UPDATED.inc(change='complete' if changes.get('status') == 'completed' else 'update')
+                updated += 1
+
+        for key, task_id, digest in plan.bindings:
+            self.mirror.bind(key, task_id, digest)
+        for key in plan.unbinds:
+            self.mirror.unbind(key)
+
+        if created or updated or plan.bindings or plan.unbinds:
+            self.mirror.save()
+        return created, updated
+
+    def sync(self, local_tasks: dict, progress=None, partial: bool = False) -> SyncPlan:
+        plan = self.plan(local_tasks, partial)
+        if plan.empty:
+            logging.info(f"Microsoft To Do is up to date ({plan.unchanged} tasks unchanged).")
+            return plan
+        logging.info(f"Sync plan: {plan}.")
+        created, updated = self.apply(plan, progress)
+        logging.info(f"Created {created}/{len(plan.creates)} and updated {updated}/{len(plan.updates)} tasks.")
+        return plan
@@ -0,0 +1,185 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from .metrics import REMINDERS
+from .retention import task_deadline
+from .sparser import Message, format_minutes
+
+DEFAULT_OFFSETS = (timedelta(days=3), timedelta(days=1), timedelta(hours=2))
+
+
+def describe_offset(seconds: float) -> str:
+    """
+    将提前量格式化为 "3 天"、"2 小时"、"1 天 6 小时" 等
+    """
+    minutes = int(seconds // 60)
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    parts = [f"{value} {unit}" for value, unit in ((days, "天"), (hours, "小时"), (minutes, "分钟")) if value]
+    return " ".join(parts) or "不到 1 分钟"
+
+
+class ReminderEngine:
+    """
+    本地截止提醒：每个作业按多个提前量（如 3 天、1 天、2 小时）各放一个条目到按触发时间排序的最小堆，
+    后台线程在 Condition 上等待到最早的触发时间，新条目更早时立即唤醒，两次触发之间不做任何轮询。
+
+    取消与重新安排只将旧版本标记为失效（O(1)），失效条目在出堆时丢弃，过多时重建堆；
+    安排提醒为 O(k log n)，k 为提前量的个数。已经过去的提醒时间不会补发，重启后不会重复提醒。
+    """
+    MAX_WAIT = 3600  # 堆非空时的最长等待 (s)，防止系统休眠或调整时钟后错过提醒
+
+    def __init__(self, sink, offsets=DEFAULT_OFFSETS):
+        """
+        :param sink: 提醒的去向：NotificationDispatcher（通过 enqueue 入队，带重试与去重）或 notify.Sink
+        :param offsets: 截止前多久提醒，timedelta 的可迭代对象
+        """
+        self.sink = sink
+        self.offsets = sorted((offset.total_seconds() for offset in offsets), reverse=True)
+        self.condition = threading.Condition()
+        self._heap = []       # (触发时间戳, 序号, 标识, 版本, 提前量秒数)
+        self._reminders = {}  # 标识 -> [版本, 截止时间, 标题, 未触发的条目数]
+        self._versions = itertools.count()
+        self._sequence = itertools.count()
+        self._stale = 0
+        self._stopping = False
+        self._thread = None
+
+    def __len__(self) -> int:
+        return len(self._reminders)
+
+    # ---- 安排与取消 ----
+
+    def schedule(self, key: str, deadline: datetime, title: str = None, now: float = None) -> int:
+        """
+        安排（或重新安排）一个作业的提醒；截止时间与标题都没有变化时不做任何事
+
+        :param key: 作业标识（本地任务标题）
+        :param deadline: 截止时间
+        :param title: 提醒中显示的标题，默认为 key
+        :return: 新安排的提醒数
+        """
+        title = title or key
+        now = time.time() if now is None else now
+        deadline_ts = deadline.timestamp()
+        with self.condition:
+            current = self._reminders.get(key)
+            if current is not None and current[1] == deadline and current[2] == title:
+                return 0
+            self._cancel(key)
+
+            version = next(self._versions)
+            entries = [(deadline_ts - offset, next(self._sequence), key, version, offset)
+                       for offset in self.offsets if deadline_ts - offset > now]
+            if not entries:
+                return 0
+            self._reminders[key] = [version, deadline, title, len(entries)]
+            earliest = self._heap[0][0] if self._heap else None
+            for entry in entries:
+                heapq.heappush(self._heap, entry)
+            if earliest is None or self._heap[0][0] < earliest:
+                self.condition.notify()
+            return len(entries)
+
+    def cancel(self, key: str) -> None:
+        with self.condition:
+            self._cancel(key)
+
+    def _cancel(self, key: str) -> None:
+        reminder = self._reminders.pop(key, None)
+        if reminder is None:
+            return
+        self._stale += reminder[3]
+        if self._stale > 64 and self._stale * 2 > len(self._heap):
+            live = {name: item[0] for name, item in self._reminders.items()}
+            self._heap = [entry for entry in self._heap if live.get(entry[2]) == entry[3]]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def sync(self, tasks: dict) -> None:
+        """
+        与本地任务对齐：为有截止时间的任务安排提醒，取消已不存在的任务的提醒
+
+        :param tasks: 标识 -> 本地任务记录（含 end 或 due_date）
+        """
+        for key, task_data in tasks.items():
+            deadline = task_deadline(task_data)
+            if deadline is not None:
+                self.schedule(key, deadline, task_data.get('title', key))
+        with self.condition:
+            for key in [key for key in self._reminders if key not in tasks]:
+                self._cancel(key)
+
+    def next_fire_time(self):
+        """
+        :return: 下一次提醒的时间（datetime），没有待触发的提醒时为 None
+        """
+        with self.condition:
+            self._drop_stale_head()
+            return datetime.fromtimestamp(self._heap[0][0]) if self._heap else None
+
+    # ---- 触发 ----
+
+    def _drop_stale_head(self) -> None:
+        while self._heap:
+            reminder = self._reminders.get(self._heap[0][2])
+            if reminder is not None and reminder[0] == self._heap[0][3]:
+                return
+            heapq.heappop(self._heap)
+            self._stale = max(0, self._stale - 1)
+
+    def _pop_due(self, now: float) -> list:
+        due = []
+        while True:
+            self._drop_stale_head()
+            if not self._heap or self._heap[0][0] > now:
+                return due
+            _, _, key, _, offset = heapq.heappop(self._heap)
+            reminder = self._reminders[key]
+            reminder[3] -= 1
+            if reminder[3] == 0:
+                del self._reminders[key]
+            due.append((key, reminder[1], reminder[2], offset))
+
+    def _fire(self, key: str, deadline: datetime, title: str, offset: float) -> None:
+        remaining = max(0.0, deadline.timestamp() - time.time())
+        message = Message(f"作业提醒：{title}",
+                          f"截止时间：{format_minutes(deadline)}（还剩 {describe_offset(remaining)}）")
+        stage = str(timedelta(seconds=int(offset)))
+        try:
+            if hasattr(self.sink, 'enqueue'):
+                self.sink.enqueue(f"reminder:{key}:{int(deadline.timestamp())}:{int(offset)}", message)
+            else:
+                self.sink.send(message)
+            REMINDERS.inc(stage=stage)
+            logging.info(f"Reminder fired for '{title}' ({stage} before the deadline).")
+        except Exception as e:
+            logging.error(f"Failed to deliver the reminder for '{title}': {e}")
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                due = self._pop_due(time.time())
+                if not due:
+                    if self._stopping:
+                        return
+                    timeout = min(self.MAX_WAIT, max(0.0, self._heap[0][0] - time.time())) if self._heap else None
+                    self.condition.wait(timeout)
+                    continue
+            for reminder in due:
+                self._fire(*reminder)
+
+    def start(self) -> 'ReminderEngine':
+        self._thread = threading.Thread(target=self._run, name="reminders", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None) -> None:
+        with self.condition:
+            self._stopping = True
+            self.condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,176 @@
+import heapq
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+
+def task_deadline(task_data: dict):
+    """
+    本地任务的截止时间：优先使用作业的结束时间，否则使用截止日期当天结束；都没有时为 None
+    """
+    try:
+        if task_data.get('end'):
+            return datetime.strptime(task_data['end'], "%Y-%m-%d %H:%M")
+        if task_data.get('due_date'):
+            return datetime.strptime(task_data['due_date'][:10], "%Y-%m-%d") + timedelta(days=1)
+    except ValueError:
+        pass
+    return None
+
+
+class DeadlineIndex:
+    """
+    按截止时间排序的最小堆。任务更新时旧条目不删除，出堆时与最新的截止时间比对后丢弃（延迟删除），
+    过期条目过多时重建堆
+    """
+    def __init__(self):
+        self._heap = []       # (截止时间戳, 标识)
+        self.deadlines = {}   # 标识 -> 最新的截止时间戳
+
+    def __len__(self) -> int:
+        return len(self.deadlines)
+
+    def push(self, key: str, deadline: datetime) -> None:
+        if deadline is None:
+            self.discard(key)
+            return
+        timestamp = deadline.timestamp()
+        if self.deadlines.get(key) == timestamp:
+            return
+        self.deadlines[key] = timestamp
+        heapq.heappush(self._heap, (timestamp, key))
+        if len(self._heap) > 2 * len(self.deadlines) + 64:
+            self._rebuild()
+
+    def discard(self, key: str) -> None:
+        self.deadlines.pop(key, None)
+
+    def _rebuild(self) -> None:
+        self._heap = [(timestamp, key) for key, timestamp in self.deadlines.items()]
+        heapq.heapify(self._heap)
+
+    def pop_before(self, cutoff: datetime) -> list:
+        """
+        取出截止时间早于 cutoff 的全部标识，按截止时间排序
+        """
+        cutoff = cutoff.timestamp()
+        keys = []
+        while self._heap and self._heap[0][0] < cutoff:
+            timestamp, key = heapq.heappop(self._heap)
+            if self.deadlines.get(key) == timestamp:
+                del self.deadlines[key]
+                keys.append(key)
+        return keys
+
+    def next_deadline(self):
+        while self._heap and self.deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return datetime.fromtimestamp(self._heap[0][0]) if self._heap else None
+
+
+class ColdArchive:
+    """
+    已淘汰任务的冷存档：每行一条 JSON 记录，只追加
+    """
+    def __init__(self, archive_file: str):
+        self.archive_file = archive_file
+
+    def append(self, tasks: dict) -> None:
+        if not tasks:
+            return
+        evicted = datetime.now().isoformat(timespec="seconds")
+        os.makedirs(os.path.dirname(self.archive_file) or ".", exist_ok=True)
+        with open(self.archive_file, 'a') as f:
+            for key, task_data in tasks.items():
+                f.write(json.dumps({'key': key, 'task': task_data, 'evicted': evicted}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def __iter__(self):
+        """
+        逐条读取存档记录，忽略残缺的行
+        """
+        try:
+            with open(self.archive_file, 'r') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            return
+
+
+class Retention:
+    """
+    本地任务的保留策略：截止时间超过 grace 的任务从工作集中淘汰并写入冷存档，
+    使每次同步只处理进行中的作业。
+
+    开启 complete_remote 时，过期任务先在任务存储中标记为已完成并带上 PENDING 标记（随存储持久化），
+    由同步将对应的远程任务标记为已完成，确认成功后才写入冷存档并删除；
+    进程重启或 Graph 持续失败时标记仍保留在存储中，之后的同步继续重试
+    """
+    PENDING = 'pending_completion'
+
+    def __init__(self, archive_file: str, grace: timedelta = timedelta(days=1), complete_remote: bool = False):
+        """
+        :param archive_file: 冷存档文件路径
+        :param grace: 截止后在工作集中保留的时长
+        :param complete_remote: 是否将淘汰任务对应的远程任务标记为已完成
+        """
+        self.archive = ColdArchive(archive_file)
+        self.grace = grace
+        self.complete_remote = complete_remote
+        self.index = DeadlineIndex()
+
+    def build(self, tasks) -> None:
+        for key, task_data in tasks.items():
+            self.track(key, task_data)
+
+    def track(self, key: str, task_data: dict) -> None:
+        self.index.push(key, task_deadline(task_data))
+
+    def evict(self, tasks, now: datetime = None) -> dict:
+        """
+        处理已过保留期的任务，调用方负责持久化任务存储：
+        开启 complete_remote 时只将其标记为等待远程完成，否则直接写入冷存档并从存储中删除
+
+        :param tasks: 本地任务存储（可变映射）
+        :return: 被淘汰（已删除）的任务
+        """
+        cutoff = (now or datetime.now()) - self.grace
+        expired = {key: tasks[key] for key in self.index.pop_before(cutoff) if key in tasks}
+        if not expired:
+            return expired
+        if self.complete_remote:
+            for key, task_data in expired.items():
+                tasks[key] = {**task_data, 'status': 'completed', self.PENDING: True}
+            logging.info(f"Marked {len(expired)} expired tasks for completion in Microsoft To Do.")
+            return {}
+        return self._archive(tasks, expired)
+
+    def pending(self, tasks) -> list:
+        """
+        :return: 等待在远程标记完成的任务标识
+        """
+        return [key for key, task_data in tasks.items() if task_data.get(self.PENDING)]
+
+    def finish(self, tasks, keys) -> dict:
+        """
+        远程已确认完成：将这些任务写入冷存档并从存储中删除，调用方负责持久化任务存储
+
+        :return: 被淘汰的任务
+        """
+        done = {key: tasks[key] for key in keys if key in tasks and tasks[key].get(self.PENDING)}
+        if not done:
+            return done
+        return self._archive(tasks, {key: {name: value for name, value in task_data.items() if name != self.PENDING}
+                                     for key, task_data in done.items()})
+
+    def _archive(self, tasks, evicted: dict) -> dict:
+        self.archive.append(evicted)
+        for key in evicted:
+            del tasks[key]
+        logging.info(f"Evicted {len(evicted)} expired tasks to '{self.archive.archive_file}'.")
+        return evicted
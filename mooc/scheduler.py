@@ -0,0 +1,128 @@
+import time
+import logging
+from datetime import datetime
+
+
+class CircuitBreaker:
+    """
+    连续失败达到阈值后断开，按指数退避等待后半开放行一次探测请求
+    """
+    def __init__(self, name: str, failure_threshold: int = 3, base_delay: float = 60, max_delay: float = 3600):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failures = 0
+        self.retry_at = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.failures >= self.failure_threshold
+
+    def allow(self, now: float = None) -> bool:
+        """
+        是否允许发出请求（断开期间直到 retry_at 才放行）
+        """
+        now = time.time() if now is None else now
+        return not self.is_open or now >= self.retry_at
+
+    def remaining(self, now: float = None) -> float:
+        now = time.time() if now is None else now
+        return max(0.0, self.retry_at - now) if self.is_open else 0.0
+
+    def record_success(self) -> None:
+        if self.is_open:
+            logging.info(f"{self.name} recovered, closing circuit breaker.")
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def record_failure(self, retry_after: float = None, now: float = None) -> None:
+        now = time.time() if now is None else now
+        self.failures += 1
+        if self.is_open:
+            delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - self.failure_threshold))
+            if retry_after:
+                delay = max(delay, retry_after)
+            self.retry_at = now + delay
+            logging.warning(f"{self.name} failed {self.failures} times in a row, backing off for {delay:.0f}s.")
+
+
+class PollScheduler:
+    """
+    根据最近的通知活动、即将到来的截止时间和错误率决定下一次轮询的时间
+    """
+    def __init__(self,
+                 base_interval: float = 60,
+                 min_interval: float = 20,
+                 idle_interval: float = 900,
+                 activity_window: float = 3600,
+                 deadline_window: float = 3600,
+                 error_decay: float = 0.7):
+        """
+        :param base_interval: 正常轮询间隔 (s)
+        :param min_interval: 刚有新通知时的最短间隔 (s)
+        :param idle_interval: 长期无活动时的最长间隔 (s)
+        :param activity_window: 新通知之后保持加速轮询的时长 (s)
+        :param deadline_window: 截止时间前多久开始收紧空闲退避 (s)，收紧后不低于 base_interval
+        :param error_decay: 错误率滑动平均的衰减系数
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.idle_interval = idle_interval
+        self.activity_window = activity_window
+        self.deadline_window = deadline_window
+        self.error_decay = error_decay
+        self.error_rate = 0.0
+        # 启动不算作新通知，直接从正常间隔开始
+        self.last_activity = time.time() - activity_window
+        self.breakers = {
+            'mooc': CircuitBreaker('MOOC site'),
+            'graph': CircuitBreaker('Microsoft Graph'),
+        }
+
+    def allow(self, source: str, now: float = None) -> bool:
+        return self.breakers[source].allow(now)
+
+    def record_success(self, source: str) -> None:
+        self.breakers[source].record_success()
+        if source == 'mooc':
+            self.error_rate *= self.error_decay
+
+    def record_failure(self, source: str, retry_after: float = None) -> None:
+        self.breakers[source].record_failure(retry_after)
+        if source == 'mooc':
+            self.error_rate = self.error_rate * self.error_decay + (1 - self.error_decay)
+
+    def record_activity(self, new_notices: int, now: float = None) -> None:
+        """
+        记录本次轮询发现的新通知数
+        """
+        if new_notices:
+            self.last_activity = time.time() if now is None else now
+
+    def next_delay(self, deadlines=(), now: float = None) -> float:
+        """
+        计算距离下一次轮询的秒数
+        :param deadlines: 进行中作业的截止时间（datetime）
+        """
+        now = time.time() if now is None else now
+        breaker = self.breakers['mooc']
+        if breaker.is_open:
+            return max(breaker.remaining(now), self.min_interval)
+
+        idle = now - self.last_activity
+        if idle < self.activity_window:
+            # 刚有新通知，从最短间隔线性恢复到正常间隔
+            interval = self.min_interval + (self.base_interval - self.min_interval) * idle / self.activity_window
+        else:
+            # 长期无活动，间隔随空闲时长逐渐增加到上限
+            interval = min(self.idle_interval, self.base_interval * idle / self.activity_window)
+
+        upcoming = [d.timestamp() - now for d in deadlines if isinstance(d, datetime) and d.timestamp() > now]
+        if upcoming and min(upcoming) < self.deadline_window and interval > self.base_interval:
+            # 截止前的最后一段时间内，空闲退避按剩余时间成比例收回到正常间隔
+            interval = self.base_interval + (interval - self.base_interval) * min(upcoming) / self.deadline_window
+
+        # 站点不稳定时放慢，最多放慢到 5 倍
+        interval *= 1 + 4 * self.error_rate
+        return max(self.min_interval, min(interval, self.idle_interval))
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+
+
+class SeenNoticeStore:
+    """
+    已读通知索引：SQLite 持久化 + 内存哈希表，O(1) 判断是否已读，按最后出现时间淘汰旧记录
+    """
+    TOUCH_INTERVAL = 24 * 3600  # 最后出现时间的刷新粒度 (s)
+    PRUNE_INTERVAL = 24 * 3600  # 清理过期记录的间隔 (s)
+
+    def __init__(self, db_file: str, retention_days: float = 365):
+        """
+        :param db_file: SQLite 数据库文件路径
+        :param retention_days: 通知在订阅源中消失多少天后被遗忘
+        """
+        self.db_file = db_file
+        self.retention = retention_days * 24 * 3600
+        self._last_prune = 0.0
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)  # 创建后可交由轮询线程使用
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_notices ("
+            "uuid TEXT PRIMARY KEY, first_seen REAL NOT NULL, last_seen REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS seen_notices_last_seen ON seen_notices (last_seen)")
+        self.conn.commit()
+        # uuid -> 最后出现时间
+        self._seen = dict(self._load_rows())
+
+    # ---- 持久化，子类可替换为其他存储 ----
+
+    def _load_rows(self):
+        return self.conn.execute("SELECT uuid, last_seen FROM seen_notices")
+
+    def _first_seen_row(self, uuid: str):
+        return self.conn.execute("SELECT first_seen FROM seen_notices WHERE uuid = ?", (uuid,)).fetchone()
+
+    def _write(self, new_uuids: list, touched: list, now: float) -> None:
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO seen_notices VALUES (?, ?, ?)",
+                                  ((uuid, now, now) for uuid in new_uuids))
+            self.conn.executemany("UPDATE seen_notices SET last_seen = ? WHERE uuid = ?",
+                                  ((now, uuid) for uuid in touched))
+
+    def _delete_before(self, cutoff: float) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM seen_notices WHERE last_seen < ?", (cutoff,))
+
+    def __contains__(self, uuid: str) -> bool:
+        return uuid in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def first_seen(self, uuid: str) -> float:
+        """
+        返回通知首次出现的时间戳，未见过时返回 None
+        """
+        row = self._first_seen_row(uuid)
+        return row[0] if row else None
+
+    def mark_seen(self, uuids, now: float = None) -> list:
+        """
+        记录本次出现的通知
+        :param uuids: 本次出现的通知 UUID
+        :return: 之前未见过的 UUID（保持原顺序）
+        """
+        now = time.time() if now is None else now
+        new_uuids, touched = [], []
+        for uuid in uuids:
+            last_seen = self._seen.get(uuid)
+            if last_seen is None:
+                new_uuids.append(uuid)
+                self._seen[uuid] = now
+            elif now - last_seen >= self.TOUCH_INTERVAL:
+                touched.append(uuid)
+                self._seen[uuid] = now
+
+        if new_uuids or touched:
+            self._write(new_uuids, touched, now)
+        if now - self._last_prune >= self.PRUNE_INTERVAL:
+            self.prune(now)
+        return new_uuids
+
+    def prune(self, now: float = None) -> int:
+        """
+        删除超过保留期未再出现的记录
+        :return: 删除的记录数
+        """
+        now = time.time() if now is None else now
+        self._last_prune = now
+        cutoff = now - self.retention
+        expired = [uuid for uuid, last_seen in self._seen.items() if last_seen < cutoff]
+        if expired:
+            self._delete_before(cutoff)
+            for uuid in expired:
+                del self._seen[uuid]
+            logging.info(f"Pruned {len(expired)} notices past the retention period.")
+        return len(expired)
+
+    def import_legacy(self, uuid_file: str) -> int:
+        """
+        从旧版 uuids.json 导入（仅当索引为空时）
+        :return: 导入的记录数
+        """
+        if self._seen or not os.path.exists(uuid_file):
+            return 0
+        try:
+            with open(uuid_file, 'r') as f:
+                uuids = json.load(f)
+        except json.JSONDecodeError:
+            logging.error(f"Failed to decode legacy uuid file '{uuid_file}'.")
+            return 0
+        imported = len(self.mark_seen(uuids))
+        logging.info(f"Imported {imported} seen notices from '{uuid_file}'.")
+        return imported
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from ms_todo.client import ThrottledError
+from .async_crawler import PollingEngine
+from .retention import Retention
+from .scheduler import PollScheduler
+from .sparser import Sparser, Homework
+from .state_db import StateDB, AccountSeenStore, AccountTaskStore, AccountTokenCache
+from .task_manager import TaskManager
+
+
+class ShardAccount:
+    """
+    分片中一个账号的状态：账号目录中的配置，加上保存在共享数据库中的已读通知、本地任务和令牌缓存
+    """
+    def __init__(self, name: str, account_dir: str, db: StateDB):
+        self.name = name
+        self.account_dir = account_dir
+        self.cookie_file = os.path.join(account_dir, "cookies.json")
+        self.config_file = os.path.join(account_dir, "ms_graph.json")
+        self.mirror_file = os.path.join(account_dir, "todo_mirror.json")
+        self.list_cache_file = os.path.join(account_dir, "todo_lists.json")
+        self.lock = threading.RLock()
+        self.sparser = Sparser(uuid_file=os.path.join(account_dir, "uuids.json"),
+                               seen_store=AccountSeenStore(db, name))
+        self.tasks = AccountTaskStore(db, name)
+        self.tasks.import_file(os.path.join(account_dir, "homeworks.json"))
+        self.retention = Retention(os.path.join(account_dir, "homeworks.archive.jsonl"))
+        self.token_cache = AccountTokenCache(db, name)
+        self.token_cache.import_file(os.path.join(account_dir, "token_cache.json"))
+        self.scheduler = PollScheduler()
+        self.task_manager = None
+        self.needs_sync = True
+        self.last_sync = 0.0
+
+
+class ShardWorker:
+    """
+    一个工作进程：用一个 PollingEngine 并发轮询分片内的所有账号，
+    在事件循环中解析新通知并写入共享数据库，To Do 同步在线程池中进行
+    """
+    def __init__(self, shard, accounts: list, accounts_dir: str, state_db_file: str,
+                 interval: float = 60, sync_interval: float = 300, sync_workers: int = 4):
+        """
+        :param shard: 分片编号
+        :param accounts: 分配到该分片的账号名
+        :param accounts_dir: 账号目录，每个账号一个子目录
+        :param state_db_file: 共享状态数据库路径
+        :param interval: 轮询间隔 (s)
+        :param sync_interval: 没有新作业时定期同步的间隔 (s)
+        :param sync_workers: 同时进行 To Do 同步的账号数
+        """
+        self.shard = shard
+        self.account_names = list(accounts)
+        self.accounts_dir = accounts_dir
+        self.state_db_file = state_db_file
+        self.interval = interval
+        self.sync_interval = sync_interval
+        self.sync_workers = sync_workers
+        self.accounts = {}
+        self.syncing = set()
+
+    def run(self) -> None:
+        asyncio.run(self._run())
+
+    async def _run(self) -> None:
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stopping.set)
+
+        db = StateDB(self.state_db_file)
+        engine = PollingEngine()
+        for name in self.account_names:
+            try:
+                account = ShardAccount(name, os.path.join(self.accounts_dir, name), db)
+                engine.add_account(name, account.cookie_file)
+            except Exception as e:
+                logging.error(f"[shard {self.shard}] Failed to load account '{name}': {e}")
+                continue
+            self.accounts[name] = account
+        logging.info(f"[shard {self.shard}] Polling {len(self.accounts)} accounts.")
+
+        executor = ThreadPoolExecutor(self.sync_workers, thread_name_prefix=f"shard{self.shard}-sync")
+        try:
+            while not stopping.is_set():
+                for name, result in (await engine.poll_once()).items():
+                    self._process(self.accounts[name], result)
+                self._schedule_syncs(loop, executor)
+                try:
+                    await asyncio.wait_for(stopping.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            logging.info(f"[shard {self.shard}] Shutting down.")
+            executor.shutdown(wait=True)
+            await engine.aclose()
+            db.close()
+
+    def _process(self, account: ShardAccount, result) -> None:
+        """
+        处理一个账号本轮的通知：过滤出新通知，新的作业写入本地任务
+        """
+        if isinstance(result, Exception):
+            logging.error(f"[{account.name}] Polling failed: {result}")
+            return
+        added = 0
+        for notice in account.sparser.iter_new_notices(result):
+            try:
+                n = account.sparser.sparse_notice(notice)
+            except Exception as e:
+                logging.error(f"[{account.name}] Failed to process notice {notice.get('uuid')}: {e}")
+                continue
+            if isinstance(n, Homework) and n.end >= datetime.now():
+                with account.lock:
+                    task_data = account.tasks[n.local_task_title] = n.to_local_task()
+                    account.retention.track(n.local_task_title, task_data)
+                added += 1
+        if added:
+            with account.lock:
+                account.tasks.flush()
+            account.needs_sync = True
+            logging.info(f"[{account.name}] {added} new homework tasks.")
+
+    def _schedule_syncs(self, loop, executor) -> None:
+        now = time.monotonic()
+        for account in self.accounts.values():
+            if account.name in self.syncing or not account.scheduler.allow('graph'):
+                continue
+            if account.needs_sync or now - account.last_sync >= self.sync_interval:
+                self.syncing.add(account.name)
+                future = loop.run_in_executor(executor, self._sync, account)
+                future.add_done_callback(lambda _, name=account.name: self.syncing.discard(name))
+
+    def _sync(self, account: ShardAccount) -> None:
+        account.needs_sync = False
+        account.last_sync = time.monotonic()
+        try:
+            if account.task_manager is None:
+                account.task_manager = TaskManager(account.config_file, account.token_cache,
+                                                   mirror_file=account.mirror_file,
+                                                   local_task_store=account.tasks, lock=account.lock,
+                                                   list_cache_file=account.list_cache_file,
+                                                   retention=account.retention)
+            account.task_manager.sync_tasks()
+            account.scheduler.record_success('graph')
+        except ThrottledError as e:
+            logging.warning(f"[{account.name}] Microsoft To Do is throttling requests: {e}")
+            account.scheduler.record_failure('graph', retry_after=e.retry_after)
+            account.needs_sync = True
+        except EOFError:
+            # 工作进程无法交互授权
+            logging.error(f"[{account.name}] No usable token; authorize this account with main.py first.")
+            account.scheduler.record_failure('graph')
+        except Exception as e:
+            logging.error(f"[{account.name}] Failed to synchronize tasks: {e}")
+            account.scheduler.record_failure('graph')
+            account.needs_sync = True
+
+
+def run_shard(shard, accounts: list, accounts_dir: str, state_db_file: str, interval: float = 60) -> None:
+    """
+    工作进程入口
+    """
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(processName)s - %(levelname)s - %(message)s')
+    ShardWorker(shard, accounts, accounts_dir, state_db_file, interval).run()
@@ -0,0 +1,62 @@
+import bisect
+import hashlib
+
+
+class HashRing:
+    """
+    一致性哈希环：每个节点在环上放置 replicas 个虚拟节点，
+    增删节点时只有落在相邻区间的键会改变归属
+    """
+    def __init__(self, nodes=(), replicas: int = 100):
+        """
+        :param nodes: 初始节点
+        :param replicas: 每个节点的虚拟节点数，越多分布越均匀
+        """
+        self.replicas = replicas
+        self._points = []  # 有序的哈希值
+        self._owners = {}  # 哈希值 -> 节点
+        self.nodes = set()
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+    def add_node(self, node) -> None:
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}#{replica}")
+            if point in self._owners:
+                continue
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove_node(self, node) -> None:
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        removed = {point for point, owner in self._owners.items() if owner == node}
+        for point in removed:
+            del self._owners[point]
+        self._points = [point for point in self._points if point not in removed]
+
+    def node_for(self, key: str):
+        """
+        返回 key 所属的节点：环上顺时针方向的第一个虚拟节点
+        """
+        if not self._points:
+            raise LookupError("The hash ring has no nodes.")
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+    def assign(self, keys) -> dict:
+        """
+        :return: 节点 -> 分配到该节点的键列表（每个节点都会出现，可能为空）
+        """
+        shards = {node: [] for node in self.nodes}
+        for key in keys:
+            shards[self.node_for(key)].append(key)
+        return shards
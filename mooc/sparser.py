@@ -1,35 +1,98 @@
 import os
 import json
+from array import array
 from datetime import datetime, timedelta
+from .notice_types import NoticeType, NoticeTypeRegistry, ParseCache
 from .task_manager import Task
+from .seen_store import SeenNoticeStore
+from .metrics import NEW_NOTICES, SEEN_NOTICES
+
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+
+def parse_timestamp(text: str) -> int:
+    """
+    将 "%Y-%m-%d %H:%M" 或 "%Y-%m-%d %H:%M:%S" 格式的时间解析为（本地）秒级时间戳
+    固定格式直接按位置切片，格式不符时退回 strptime
+    """
+    text = text.strip()
+    if len(text) in (16, 19) and text[4] == '-' and text[7] == '-' and text[10] == ' ' and text[13] == ':':
+        try:
+            days = datetime(int(text[0:4]), int(text[5:7]), int(text[8:10])).toordinal() - _EPOCH_ORDINAL
+            hour, minute = int(text[11:13]), int(text[14:16])
+            second = int(text[17:19]) if len(text) == 19 else 0
+            if hour < 24 and minute < 60 and second < 60:
+                return days * 86400 + hour * 3600 + minute * 60 + second
+        except ValueError:
+            pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
+        try:
+            return to_timestamp(datetime.strptime(text, fmt))
+        except ValueError:
+            continue
+    raise ValueError(f"time data {text!r} does not match '%Y-%m-%d %H:%M[:%S]'")
+
+
+def to_timestamp(value: datetime) -> int:
+    return (value.toordinal() - _EPOCH_ORDINAL) * 86400 + value.hour * 3600 + value.minute * 60 + value.second
+
+
+def from_timestamp(timestamp: int) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(seconds=timestamp)
+
+
+def parse_datetime(value) -> datetime:
+    """
+    接受 datetime 或固定格式的字符串
+    """
+    if isinstance(value, datetime):
+        return value
+    return from_timestamp(parse_timestamp(value))
+
+
+def format_minutes(value: datetime) -> str:
+    return f"{value.year:04d}-{value.month:02d}-{value.day:02d} {value.hour:02d}:{value.minute:02d}"
+
+
+def format_seconds(value: datetime) -> str:
+    return f"{format_minutes(value)}:{value.second:02d}"
+
 
 class Message:
+    __slots__ = ('title', 'content')
+
     def __init__(self, title, content) -> None:
         self.title = title
         self.content = content
 
+
 class Notice:
+    """
+    普通通知，创建后视为不可变
+    """
+    __slots__ = ('title', 'content', 'creater', 'time', '_message')
     ACC_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
-    def __init__(self, title: str, content: str, creater: str, time: str):
+    def __init__(self, title: str, content: str, creater: str, time):
         """
         初始化 Notice 对象
         :param title: 通知标题
         :param content: 通知内容
         :param creater: 通知创建者
-        :param time: 通知完成时间
+        :param time: 通知完成时间（字符串或 datetime）
         """
         self.title = title
         self.content = content
         self.creater = creater
-        self.time = datetime.strptime(time, self.ACC_DATE_FORMAT)
+        self.time = parse_datetime(time)
+        self._message = None
 
     def __str__(self):
         return (
             f"标题: {self.title}\n"
             f"内容: {self.content}\n"
             f"创建者: {self.creater}\n"
-            f"时间: {self.time.strftime(self.ACC_DATE_FORMAT)}\n"
+            f"时间: {format_seconds(self.time)}\n"
         )
         
     @property
@@ -37,7 +100,9 @@ class Notice:
         """
         返回通知简要描述，方便推送内容
         """
-        return Message(self.title, self.content)
+        if self._message is None:
+            self._message = Message(self.title, self.content)
+        return self._message
 
     def to_dict(self):
         """
@@ -47,7 +112,7 @@ class Notice:
             'title': self.title,
             'content': self.content,
             'creater': self.creater,
-            'time': self.time.strftime(self.ACC_DATE_FORMAT)
+            'time': format_seconds(self.time)
         }
 
     @staticmethod
@@ -62,22 +127,29 @@ class Notice:
             time=data['time']
         )
 
+
 class Homework:
+    """
+    作业通知，创建后视为不可变；task、message 等派生字段在首次访问时计算并缓存
+    """
+    __slots__ = ('course', 'name', 'start', 'end', '_task', '_message')
     DATE_FORMAT = "%Y-%m-%d %H:%M"
     DUE_FORMAT = "%Y-%m-%d"
 
-    def __init__(self, course: str, name: str, start: str, end: str):
+    def __init__(self, course: str, name: str, start, end):
         self.course = course
         self.name = name
-        self.start = datetime.strptime(start, self.DATE_FORMAT)
-        self.end = datetime.strptime(end, self.DATE_FORMAT)
+        self.start = parse_datetime(start)
+        self.end = parse_datetime(end)
+        self._task = None
+        self._message = None
 
     def __str__(self):
         return (
             f"课程: {self.course}\n"
             f"作业: {self.name}\n"
-            f"开始时间: {self.start.strftime(self.DATE_FORMAT)}\n"
-            f"结束时间: {self.end.strftime(self.DATE_FORMAT)}\n"
+            f"开始时间: {format_minutes(self.start)}\n"
+            f"结束时间: {format_minutes(self.end)}\n"
         )
 
     @property
@@ -85,16 +157,34 @@ class Homework:
         """
         返回作业简要描述，方便推送内容
         """
-        return Message(f"{self.course}：{self.name}",
-                       f"{self.start.strftime(self.DATE_FORMAT)} -> \
-                       {self.end.strftime(self.DATE_FORMAT)}")
+        if self._message is None:
+            self._message = Message(f"{self.course}：{self.name}",
+                                    f"{format_minutes(self.start)} -> {format_minutes(self.end)}")
+        return self._message
         
     @property
     def task(self) -> Task:
-        reminder_time = self.end - timedelta(days=1)
-        reminder_time = reminder_time.replace(hour=20, minute=0, second=0)
-        end = self.end.replace(hour=0, minute=0, second=0)
-        return Task(f"{self.course}：{self.name}", end.strftime(self.DUE_FORMAT), reminder_time.strftime(self.DATE_FORMAT))
+        if self._task is None:
+            reminder_time = self.end - timedelta(days=1)
+            reminder_time = reminder_time.replace(hour=20, minute=0, second=0)
+            due = format_minutes(self.end)[:10]
+            self._task = Task(f"{self.course}：{self.name}", due, format_minutes(reminder_time))
+        return self._task
+
+    @property
+    def local_task_title(self) -> str:
+        return f"{self.course}: {self.name}"
+
+    def to_local_task(self) -> dict:
+        """
+        返回写入本地任务缓存的记录
+        """
+        return {
+            "title": self.local_task_title,
+            "due_date": self.task.due_date,
+            "reminder_time": self.task.reminder_time,
+            "end": format_minutes(self.end)
+        }
 
     def to_dict(self):
         """
@@ -103,8 +193,8 @@ class Homework:
         return {
             'course': self.course,
             'name': self.name,
-            'start': self.start.strftime(self.DATE_FORMAT),
-            'end': self.end.strftime(self.DATE_FORMAT),
+            'start': format_minutes(self.start),
+            'end': format_minutes(self.end),
         }
         
     @staticmethod
@@ -125,75 +215,355 @@ class Homework:
         """
         return json.dumps(self.to_dict(), ensure_ascii=False, indent=4)
 
+
+class Exam:
+    """
+    考试通知，创建后视为不可变
+    """
+    __slots__ = ('course', 'name', 'start', 'end', 'location', '_message')
+
+    def __init__(self, course: str, name: str, start, end=None, location: str = ""):
+        self.course = course
+        self.name = name
+        self.start = parse_datetime(start)
+        self.end = parse_datetime(end) if end else None
+        self.location = location
+        self._message = None
+
+    def __str__(self):
+        return (
+            f"课程: {self.course}\n"
+            f"考试: {self.name}\n"
+            f"开始时间: {format_minutes(self.start)}\n"
+            + (f"结束时间: {format_minutes(self.end)}\n" if self.end else "")
+            + (f"地点: {self.location}\n" if self.location else "")
+        )
+
+    @property
+    def message(self) -> Message:
+        if self._message is None:
+            where = f"，地点：{self.location}" if self.location else ""
+            self._message = Message(f"考试 {self.course}：{self.name}",
+                                    f"开始时间：{format_minutes(self.start)}{where}")
+        return self._message
+
+    def to_dict(self):
+        return {
+            'course': self.course,
+            'name': self.name,
+            'start': format_minutes(self.start),
+            'end': format_minutes(self.end) if self.end else None,
+            'location': self.location,
+        }
+
+
+class Grade:
+    """
+    成绩发布通知，创建后视为不可变
+    """
+    __slots__ = ('course', 'name', 'score', 'time', '_message')
+
+    def __init__(self, course: str, name: str, score: str, time):
+        self.course = course
+        self.name = name
+        self.score = score
+        self.time = parse_datetime(time)
+        self._message = None
+
+    def __str__(self):
+        return (
+            f"课程: {self.course}\n"
+            f"名称: {self.name}\n"
+            f"成绩: {self.score}\n"
+            f"时间: {format_seconds(self.time)}\n"
+        )
+
+    @property
+    def message(self) -> Message:
+        if self._message is None:
+            self._message = Message(f"成绩 {self.course}：{self.name}", f"成绩：{self.score}")
+        return self._message
+
+    def to_dict(self):
+        return {
+            'course': self.course,
+            'name': self.name,
+            'score': self.score,
+            'time': format_seconds(self.time),
+        }
+
+
+def _title_suffix(notice: dict) -> str:
+    """
+    标题中 "作业:" 等前缀之后的部分
+    """
+    title = notice.get("title", "")
+    for separator in (":", "："):
+        if separator in title:
+            return title.split(separator, 1)[1].strip()
+    return title
+
+
+HOMEWORK_NOTICE = NoticeType(
+    "homework", r"^作业[:：]",
+    labels={'course': "课程名称", 'name': "作业名称", 'start': "开始时间", 'end': ("结束时间", "截止时间")},
+    required=('course', 'end'),
+    build=lambda notice, f: Homework(f['course'], f.get('name') or _title_suffix(notice),
+                                     f.get('start') or f['end'], f['end']))
+EXAM_NOTICE = NoticeType(
+    "exam", r"^考试[:：]",
+    labels={'course': "课程名称", 'name': "考试名称", 'start': ("开始时间", "考试时间"), 'end': "结束时间",
+            'location': ("考试地点", "地点")},
+    required=('start',),
+    build=lambda notice, f: Exam(f.get('course', ""), f.get('name') or _title_suffix(notice),
+                                 f['start'], f.get('end'), f.get('location', "")))
+GRADE_NOTICE = NoticeType(
+    "grade", r"成绩",
+    labels={'course': "课程名称", 'name': ("作业名称", "考试名称", "名称"), 'score': ("成绩", "分数", "得分")},
+    required=('score',),
+    build=lambda notice, f: Grade(f.get('course', ""), f.get('name') or notice["title"], f['score'],
+                                  notice["completeTime"]))
+GENERAL_NOTICE = NoticeType(
+    "general", "",
+    build=lambda notice, f: Notice(notice["title"], notice["content"], notice["createrName"], notice["completeTime"]))
+
+# 按顺序尝试，普通通知兜底；可通过 NOTICE_TYPES.register 增加新类型
+NOTICE_TYPES = NoticeTypeRegistry([HOMEWORK_NOTICE, EXAM_NOTICE, GRADE_NOTICE, GENERAL_NOTICE])
+
+
+class _Columns:
+    """
+    列式存储的基类：字符串列按值驻留，时间列存为 array('q') 秒级时间戳，按需构造对象
+    """
+    __slots__ = ('_strings',)
+
+    def __init__(self) -> None:
+        self._strings = {}
+
+    def _intern(self, value: str) -> str:
+        return self._strings.setdefault(value, value)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class HomeworkBatch(_Columns):
+    __slots__ = ('course', 'name', 'start', 'end')
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.course = []
+        self.name = []
+        self.start = array('q')
+        self.end = array('q')
+
+    def append(self, course: str, name: str, start: int, end: int) -> None:
+        self.course.append(self._intern(course))
+        self.name.append(name)
+        self.start.append(start)
+        self.end.append(end)
+
+    def __len__(self) -> int:
+        return len(self.end)
+
+    def __getitem__(self, index: int) -> Homework:
+        return Homework(self.course[index], self.name[index],
+                        from_timestamp(self.start[index]), from_timestamp(self.end[index]))
+
+    def active(self, now: datetime = None) -> list:
+        """
+        返回尚未截止的作业下标
+        """
+        cutoff = to_timestamp(now or datetime.now())
+        return [index for index, end in enumerate(self.end) if end >= cutoff]
+
+
+class NoticeBatch(_Columns):
+    __slots__ = ('title', 'content', 'creater', 'time')
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.title = []
+        self.content = []
+        self.creater = []
+        self.time = array('q')
+
+    def append(self, title: str, content: str, creater: str, time: int) -> None:
+        self.title.append(title)
+        self.content.append(content)
+        self.creater.append(self._intern(creater))
+        self.time.append(time)
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    def __getitem__(self, index: int) -> Notice:
+        return Notice(self.title[index], self.content[index], self.creater[index],
+                      from_timestamp(self.time[index]))
+
+
+class ParsedBatch:
+    """
+    Sparser.parse_batch 的结果：作业与普通通知分列存储，解析失败的原始通知单独保留
+    """
+    __slots__ = ('homeworks', 'notices', 'failed')
+
+    def __init__(self) -> None:
+        self.homeworks = HomeworkBatch()
+        self.notices = NoticeBatch()
+        self.failed = []
+
+    def __len__(self) -> int:
+        return len(self.homeworks) + len(self.notices)
+
+
 class Sparser:
     DATE_FORMAT = "%Y-%m-%d %H:%M"
     ACC_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+    STOP_AFTER_SEEN = 5  # 连续遇到多少条已读通知后停止扫描
 
     def __init__(self, 
-                 uuid_file: str = os.path.join("data", "uuids.json")
+                 seen_file: str = os.path.join("data", "seen_notices.db"),
+                 uuid_file: str = os.path.join("data", "uuids.json"),
+                 retention_days: float = 365,
+                 archive=None,
+                 seen_store: SeenNoticeStore = None,
+                 registry: NoticeTypeRegistry = None,
+                 parse_cache_size: int = 4096
                  ):
-        self.uuid_file = uuid_file
-        self.uuids = self._load_uuids()
-        
-    def _load_uuids(self) -> list:
-        """
-        加载UUID数据
         """
-        with open(self.uuid_file, 'r') as f:
-            return json.load(f)
-            
-    def _update_uuids(self, current_uuids: list) -> None:
+        :param seen_file: 已读通知索引（SQLite）路径
+        :param uuid_file: 旧版 UUID 列表文件，首次启动时导入
+        :param retention_days: 已读记录的保留天数
+        :param archive: 通知归档（NoticeArchive），新通知会被写入其中
+        :param seen_store: 可选，已创建的已读通知索引（如共享数据库中的 AccountSeenStore），此时忽略 seen_file
+        :param registry: 通知类型表，默认为 NOTICE_TYPES
+        :param parse_cache_size: 解析缓存的容量，为 0 时不缓存
         """
-        更新内部的UUID数据并保存到文件
-        """
-        self.uuids = current_uuids
-        with open(self.uuid_file, 'w') as f:
-            json.dump(self.uuids, f, ensure_ascii=False, indent=4)
+        self.seen = seen_store if seen_store is not None else SeenNoticeStore(seen_file, retention_days)
+        self.archive = archive
+        self.registry = registry or NOTICE_TYPES
+        self.parse_cache = ParseCache(parse_cache_size) if parse_cache_size else None
+        self.seen.import_legacy(uuid_file)
 
     def parse_homework_notice(self, notice: dict) -> Homework:
         """
         解析作业通知并返回 Homework 对象
         """
-        content = notice["content"].split('\r')
-        course = content[0].removeprefix("课程名称：")
-        name = content[1].removeprefix("作业名称：")
-        start = content[2].removeprefix("开始时间：")
-        end = content[3].removeprefix("结束时间：")
-
-        # 创建 Homework 对象
-        homework = Homework(course, name, start, end)
-
-        return homework
+        fields = HOMEWORK_NOTICE.extract(notice)
+        if fields is None:
+            raise ValueError(f"Notice {notice.get('uuid')} is not a complete homework notice")
+        return HOMEWORK_NOTICE.build(notice, fields)
 
     def parse_general_notice(self, notice: dict) -> Notice:
         """
         解析普通通知并返回 Notice 对象
         """
-        title = notice["title"]
-        content = notice["content"]
-        creater = notice["createrName"]
-        time = notice["completeTime"]
+        return GENERAL_NOTICE.build(notice, {})
 
-        return Notice(title=title, content=content, creater=creater, time=time)
+    def sparse_notice(self, notice: dict):
+        """
+        按通知类型表解析通知（Homework、Exam、Grade 或 Notice）；
+        同一通知（UUID 与内容都相同）再次出现时直接返回缓存的结果
+        """
+        if self.parse_cache is None:
+            return self.registry.parse(notice)
+        key = ParseCache.key(notice)
+        if key is not None:
+            parsed = self.parse_cache.get(key)
+            if parsed is not None:
+                return parsed
+        parsed = self.registry.parse(notice)
+        if key is not None:
+            self.parse_cache.put(key, parsed)
+        return parsed
 
-    def sparse_notice(self, notice: dict) -> dict:
+    def _batch_row(self, notice: dict) -> tuple:
         """
-        根据通知类型选择相应的解析方式
+        :return: (是否为作业, 该行各列的值)；作业为 (课程, 作业名, 开始时间, 截止时间)，
+                 其他通知为 (标题, 内容, 发布者, 发布时间)
         """
-        if notice["title"].startswith("作业:"):
-            return self.parse_homework_notice(notice)
-        else:
-            return self.parse_general_notice(notice)
+        _, notice_type, fields = self.registry.classify(notice)
+        if notice_type is HOMEWORK_NOTICE:
+            try:
+                end = parse_timestamp(fields['end'])
+                start = parse_timestamp(fields['start']) if fields.get('start') else end
+                return True, (fields['course'], fields.get('name') or _title_suffix(notice), start, end)
+            except ValueError:
+                pass  # 时间格式不符，按普通通知保存
+        return False, (notice["title"], notice["content"], notice["createrName"],
+                       parse_timestamp(notice["completeTime"]))
 
-    def filter_new_notices(self, notice_list: list) -> list:
+    def parse_batch(self, notices) -> ParsedBatch:
         """
-        过滤出新的通知（即不在当前UUID列表中的通知）
+        批量解析通知（如回填历史通知），结果按列存储，不为每条通知创建对象；
+        作业之外的类型（考试、成绩等）按普通通知保存。各行的列值与 sparse_notice 共用解析缓存
+        :param notices: 原始通知的可迭代对象
+        :return: ParsedBatch，可按下标或迭代按需构造 Homework / Notice
         """
-        current_uuids = [notice['uuid'] for notice in notice_list]
-        new_uuids = list(set(current_uuids) - set(self.uuids))
+        batch = ParsedBatch()
+        for notice in notices:
+            key = ParseCache.key(notice) if self.parse_cache is not None else None
+            if key is not None:
+                key += ("columns",)  # 与 sparse_notice 缓存的解析对象区分
+            row = self.parse_cache.get(key) if key is not None else None
+            if row is None:
+                try:
+                    row = self._batch_row(notice)
+                except (KeyError, ValueError):
+                    batch.failed.append(notice)
+                    continue
+                if key is not None:
+                    self.parse_cache.put(key, row)
+            homework, values = row
+            (batch.homeworks if homework else batch.notices).append(*values)
+        return batch
 
-        if new_uuids:
-            self._update_uuids(current_uuids)
-            return [notice for notice in notice_list if notice['uuid'] in new_uuids]
-        else:
-            return []
\ No newline at end of file
+    def iter_new_notices(self, notices, stop_after_seen: int = None):
+        """
+        逐条产出新的通知（即从未见过的通知），并记录本次出现的通知
+        通知按时间倒序排列，遇到连续 stop_after_seen 条已读通知即停止，不再读取剩余部分
+        :param notices: 通知的可迭代对象（可以是流式生成器）
+        :param stop_after_seen: 连续已读多少条后停止，为 0 时扫描全部
+        """
+        stop_after_seen = self.STOP_AFTER_SEEN if stop_after_seen is None else stop_after_seen
+        scanned, new_notices, new_uuids, seen_run = [], [], set(), 0
+        try:
+            for notice in notices:
+                uuid = notice['uuid']
+                scanned.append(uuid)
+                if uuid in self.seen or uuid in new_uuids:
+                    seen_run += 1
+                    if stop_after_seen and seen_run >= stop_after_seen:
+                        # 主动停止：告知上游本次通知列表已处理完，可以记下校验字段
+                        if hasattr(notices, 'mark_caught_up'):
+                            notices.mark_caught_up()
+                        break
+                    continue
+                seen_run = 0
+                new_uuids.add(uuid)
+                new_notices.append(notice)
+                NEW_NOTICES.inc()
+                yield notice
+        finally:
+            # 提前停止时关闭上游的流式响应
+            if hasattr(notices, 'close'):
+                notices.close()
+            self.seen.mark_seen(scanned)
+            SEEN_NOTICES.set(len(self.seen))
+            if self.archive is not None and new_notices:
+                self.archive.add_many(new_notices)
+
+    def filter_new_notices(self, notice_list, stop_after_seen: int = None) -> list:
+        """
+        过滤出新的通知（即从未见过的通知），并记录本次出现的通知
+        """
+        return list(self.iter_new_notices(notice_list, stop_after_seen))
+
+    def sparse_notices(self, notices, stop_after_seen: int = None):
+        """
+        逐条解析新的通知，遇到连续的已读通知即停止
+        """
+        for notice in self.iter_new_notices(notices, stop_after_seen):
+            yield self.sparse_notice(notice)
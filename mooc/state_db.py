@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from .seen_store import SeenNoticeStore
+from .task_store import JournaledTaskStore
+
+
+class StateDB:
+    """
+    多账号共享的状态数据库（SQLite，WAL 模式），按账号保存已读通知、本地任务和令牌缓存
+    每个进程各自打开一个连接，进程内的多个线程通过锁共用该连接
+    """
+    def __init__(self, db_file: str, busy_timeout: float = 30.0):
+        """
+        :param db_file: 数据库文件路径
+        :param busy_timeout: 等待其他进程释放写锁的最长时间 (s)
+        """
+        self.db_file = db_file
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(db_file, timeout=busy_timeout, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS seen_notices (
+                account TEXT NOT NULL, uuid TEXT NOT NULL, first_seen REAL NOT NULL, last_seen REAL NOT NULL,
+                PRIMARY KEY (account, uuid)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS seen_notices_last_seen ON seen_notices (account, last_seen);
+            CREATE TABLE IF NOT EXISTS local_tasks (
+                account TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,
+                PRIMARY KEY (account, key)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS token_caches (
+                account TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL);
+        """)
+        self.conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        with self.lock, self.conn:
+            yield self.conn
+
+    def query(self, sql: str, params=()) -> list:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def accounts(self) -> list:
+        """
+        数据库中有状态记录的账号
+        """
+        rows = self.query("SELECT account FROM seen_notices UNION SELECT account FROM local_tasks "
+                          "UNION SELECT account FROM token_caches")
+        return sorted(account for (account,) in rows)
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+class AccountSeenStore(SeenNoticeStore):
+    """
+    保存在 StateDB 中的单个账号的已读通知索引
+    """
+    def __init__(self, db: StateDB, account: str, retention_days: float = 365):
+        self.db = db
+        self.account = account
+        self.db_file = db.db_file
+        self.retention = retention_days * 24 * 3600
+        self._last_prune = 0.0
+        self._seen = dict(self._load_rows())
+
+    def _load_rows(self):
+        return self.db.query("SELECT uuid, last_seen FROM seen_notices WHERE account = ?", (self.account,))
+
+    def _first_seen_row(self, uuid: str):
+        rows = self.db.query("SELECT first_seen FROM seen_notices WHERE account = ? AND uuid = ?",
+                             (self.account, uuid))
+        return rows[0] if rows else None
+
+    def _write(self, new_uuids: list, touched: list, now: float) -> None:
+        with self.db.transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO seen_notices VALUES (?, ?, ?, ?)",
+                             ((self.account, uuid, now, now) for uuid in new_uuids))
+            conn.executemany("UPDATE seen_notices SET last_seen = ? WHERE account = ? AND uuid = ?",
+                             ((now, self.account, uuid) for uuid in touched))
+
+    def _delete_before(self, cutoff: float) -> None:
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM seen_notices WHERE account = ? AND last_seen < ?", (self.account, cutoff))
+
+    def close(self) -> None:
+        # 连接由 StateDB 统一管理
+        pass
+
+
+class AccountTaskStore(MutableMapping):
+    """
+    保存在 StateDB 中的单个账号的本地任务，接口与 JournaledTaskStore 相同：
+    修改先记在内存中，flush 时在一个事务中写入
+    """
+    def __init__(self, db: StateDB, account: str):
+        self.db = db
+        self.account = account
+        self._data = {key: json.loads(value) for key, value in
+                      db.query("SELECT key, value FROM local_tasks WHERE account = ?", (account,))}
+        self._pending = {}  # key -> 新值，删除时为 None
+
+    def import_file(self, snapshot_file: str) -> int:
+        """
+        从旧版任务文件（快照加日志）导入，仅当该账号还没有任务时
+        :return: 导入的任务数
+        """
+        if self._data or not os.path.exists(snapshot_file):
+            return 0
+        legacy = JournaledTaskStore(snapshot_file)
+        for key, value in legacy.items():
+            self[key] = value
+        self.flush()
+        logging.info(f"[{self.account}] Imported {len(legacy)} tasks from '{snapshot_file}'.")
+        return len(legacy)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        if self._data.get(key) == value:
+            return
+        self._data[key] = value
+        self._pending[key] = value
+
+    def __delitem__(self, key):
+        del self._data[key]
+        self._pending[key] = None
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def dirty(self):
+        return bool(self._pending)
+
+    def flush(self):
+        """
+        写入未保存的变更。
+
+        :return: 是否写入了变更
+        """
+        if not self._pending:
+            return False
+        pending, self._pending = self._pending, {}
+        with self.db.transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO local_tasks VALUES (?, ?, ?)",
+                             ((self.account, key, json.dumps(value, ensure_ascii=False))
+                              for key, value in pending.items() if value is not None))
+            conn.executemany("DELETE FROM local_tasks WHERE account = ? AND key = ?",
+                             ((self.account, key) for key, value in pending.items() if value is None))
+        return True
+
+
+class AccountTokenCache:
+    """
+    保存在 StateDB 中的单个账号的 MSAL 令牌缓存，可代替令牌缓存文件传给 MicrosoftTodoClient
+    """
+    def __init__(self, db: StateDB, account: str):
+        self.db = db
+        self.account = account
+
+    def load(self) -> str:
+        rows = self.db.query("SELECT data FROM token_caches WHERE account = ?", (self.account,))
+        if not rows:
+            raise FileNotFoundError(f"No token cache for account '{self.account}'.")
+        return rows[0][0]
+
+    def save(self, data: str) -> None:
+        with self.db.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO token_caches VALUES (?, ?, ?)", (self.account, data, time.time()))
+
+    def import_file(self, token_cache_file: str) -> bool:
+        """
+        从旧版令牌缓存文件导入，仅当该账号还没有令牌缓存时
+        """
+        if self.db.query("SELECT 1 FROM token_caches WHERE account = ?", (self.account,)) \
+                or not os.path.exists(token_cache_file):
+            return False
+        with open(token_cache_file, 'r') as f:
+            self.save(f.read())
+        logging.info(f"[{self.account}] Imported the token cache from '{token_cache_file}'.")
+        return True
@@ -1,11 +1,17 @@
 # File: mooc/task_manager.py
 
-import json
 import logging
-import os
+import threading
 from ms_todo.client import MicrosoftTodoClient
+from ms_todo.lists import TodoListDirectory
+from ms_todo.mirror import TaskMirror
+from .reconcile import Reconciler
+from .task_store import JournaledTaskStore
+from .metrics import LOCAL_TASKS
 
 class Task:
+    __slots__ = ('title', 'due_date', 'reminder_time')
+
     def __init__(self, title, due_date=None, reminder_time=None) -> None:
         self.title = title
         self.due_date = due_date
@@ -15,120 +21,194 @@ class Task:
         return f"标题: {self.title}\n截止时间: {self.due_date}\n提醒时间: {self.reminder_time}"
 
 class TaskManager:
-    def __init__(self, config_file, token_cache_file, local_task_file='data/tasks.json', homework_list_name="Homeworks"):
+    def __init__(self, config_file, token_cache_file, local_task_file='data/tasks.json', homework_list_name="Homeworks",
+                 mirror_file='data/todo_mirror.json', todo_client=None, local_task_store=None, lock=None,
+                 list_cache_file='data/todo_lists.json', retention=None):
         """
-        初始化 TaskManager。
+        初始化 TaskManager。不发送网络请求：令牌在首次同步时获取，作业列表 ID 优先取自列表目录缓存。
         
         :param config_file: Microsoft To Do API 的配置文件路径。
-        :param token_cache_file: Microsoft To Do 令牌缓存文件路径。
+        :param token_cache_file: Microsoft To Do 令牌缓存文件路径，或提供 load/save 方法的令牌缓存存储。
         :param local_task_file: 本地任务缓存文件，用于保存任务状态。
         :param homework_list_name: 要管理的 To Do 列表名称。
-        """
-        self.todo_client = MicrosoftTodoClient.from_config_file(config_file)
+        :param mirror_file: 远程作业列表的本地镜像文件。
+        :param todo_client: 可选，已创建的 MicrosoftTodoClient；为空时从 config_file 创建。
+        :param local_task_store: 可选，本地任务存储（如共享数据库中的 AccountTaskStore）；为空时使用 local_task_file。
+        :param lock: 可选，保护本地任务的锁，与其他线程共享 local_task_store 时传入。
+        :param list_cache_file: To Do 列表目录的缓存文件。
+        :param retention: 可选，Retention，同步前淘汰已过期的本地任务。
+        """
+        self.todo_client = todo_client or MicrosoftTodoClient.from_config_file(config_file)
+        self.todo_client.lists = TodoListDirectory(list_cache_file)
         self.token_cache_file = token_cache_file
         self.local_task_file = local_task_file
         self.homework_list_name = homework_list_name
         self.homework_list_id = None
-        self.local_tasks = {}  # 本地任务缓存
+        self.mirror_file = mirror_file
+        self.mirror = None
+        self.ready = False
+        # 本地任务缓存
+        self.local_tasks = local_task_store if local_task_store is not None else JournaledTaskStore(local_task_file)
+        self.lock = lock or threading.RLock()  # 保护 local_tasks，解析与同步可能在不同线程中进行
+        self.retention = retention
+        if retention is not None:
+            with self.lock:
+                retention.build(self.local_tasks)
 
         self._initialize_client()
-        self._load_local_tasks()
 
     def _initialize_client(self):
         """
-        初始化 Microsoft To Do 客户端，获取访问令牌并获取作业列表 ID。
+        读取令牌缓存和列表目录缓存。没有令牌缓存时立即请求用户授权；
+        列表目录命中时直接使用缓存的作业列表 ID，并在后台重新获取列表目录。
         """
         logging.info("Initializing Microsoft To Do client...")
-        token = self.todo_client.load_token_cache(self.token_cache_file)
+        try:
+            self.todo_client.load_token_cache(self.token_cache_file, acquire=False)
+        except FileNotFoundError:
+            self._authorize()
 
-        if not token:
-            logging.warning("Token cache is empty. Please authorize the application.")
-            token = self.todo_client.get_access_token()
-            if not token:
-                raise RuntimeError("Failed to get access token. Authorization required.")
-        
+        list_id = self.todo_client.lists.find(self.homework_list_name)
+        if list_id:
+            self._use_list(list_id)
+            threading.Thread(target=self._revalidate_lists, name="todo-lists", daemon=True).start()
+
+    def _authorize(self):
+        logging.warning("Token cache is empty. Please authorize the application.")
+        if not self.todo_client.get_access_token():
+            raise RuntimeError("Failed to get access token. Authorization required.")
         self.todo_client.save_token_cache(self.token_cache_file)
-        self.todo_client.get_todo_lists()
-        self.homework_list_id = self.todo_client.get_list_id(self.homework_list_name)
-        if not self.homework_list_id:
-            raise ValueError(f"Could not find or create a list named '{self.homework_list_name}'.")
 
-    def _load_local_tasks(self):
+    def _use_list(self, list_id):
+        self.homework_list_id = list_id
+        if self.mirror is None or self.mirror.list_id != list_id:
+            self.mirror = TaskMirror(self.todo_client, list_id, self.mirror_file)
+
+    def _revalidate_lists(self):
         """
-        从本地文件加载任务数据。
+        后台重新获取列表目录；作业列表被删除或改名时，下次同步重新查找。
         """
         try:
-            with open(self.local_task_file, 'r') as f:
-                self.local_tasks = json.load(f)
-                logging.info(f"Loaded {len(self.local_tasks)} tasks from local cache.")
-        except FileNotFoundError:
-            logging.warning(f"Local task file '{self.local_task_file}' not found. Starting with an empty task list.")
-            self.local_tasks = {}
-        except json.JSONDecodeError:
-            logging.error("Failed to decode local task file. Starting with an empty task list.")
-            self.local_tasks = {}
+            if self.todo_client.get_todo_lists() is None:
+                return
+        except Exception as e:
+            logging.warning(f"Failed to revalidate the To Do list directory: {e}")
+            return
+        if self.todo_client.get_list_id(self.homework_list_name) != self.homework_list_id:
+            logging.info(f"The '{self.homework_list_name}' list changed; it will be looked up again on the next sync.")
+            with self.lock:
+                self.homework_list_id = None
+                self.ready = False
+
+    def ensure_ready(self):
+        """
+        首次同步前获取访问令牌，并在列表目录缓存未命中时获取列表目录。
+        """
+        if self.ready:
+            return
+        if not self.todo_client.ensure_token():
+            self._authorize()
+        self.todo_client.save_token_cache(self.token_cache_file)
+        if not self.homework_list_id:
+            self.todo_client.get_todo_lists()
+            list_id = self.todo_client.get_list_id(self.homework_list_name)
+            if not list_id:
+                raise ValueError(f"Could not find or create a list named '{self.homework_list_name}'.")
+            self._use_list(list_id)
+        self.ready = True
 
     def save_local_tasks(self):
         """
-        将当前的任务状态保存到本地文件。
+        将本地任务的变更追加到日志文件，没有变更时不写盘。
         """
-        with open(self.local_task_file, 'w') as f:
-            json.dump(self.local_tasks, f, ensure_ascii=False, indent=4)
-            logging.info(f"Saved {len(self.local_tasks)} tasks to local cache.")
+        with self.lock:
+            LOCAL_TASKS.set(len(self.local_tasks))
+            if self.local_tasks.flush():
+                logging.info(f"Saved {len(self.local_tasks)} tasks to local cache.")
 
-    def sync_tasks(self):
+    def set_local_task(self, title, task_data):
         """
-        同步本地任务与 Microsoft To Do 中的任务列表，仅处理以下情况：
-        1. 本地有、远程没有 -> 需添加到 Microsoft To Do
+        新增或更新一个本地作业任务，变更在 save_local_tasks 时写盘。
         """
-        logging.info("Starting task synchronization...")
-        remote_tasks = self.get_homework_tasks()
-        remote_task_titles = {task['title'] for task in remote_tasks}
+        with self.lock:
+            self.local_tasks[title] = task_data
+            if self.retention is not None:
+                self.retention.track(title, task_data)
 
-        # 检查本地任务是否需要添加到 Microsoft To Do
-        for title, task_data in self.local_tasks.items():
-            if title not in remote_task_titles:
-                logging.info(f"Adding new task '{title}' to Microsoft To Do.")
-                self.add_homework_task(task_data['title'], task_data['due_date'], task_data.get('reminder_time'))
+    def evict_expired(self):
+        """
+        将已过保留期的本地任务移入冷存档（开启 complete_remote 时先标记为等待远程完成）并保存。
 
-    def add_homework_task(self, title, due_date, reminder_time=None):
+        :return: 被淘汰的任务
+        """
+        if self.retention is None:
+            return {}
+        with self.lock:
+            evicted = self.retention.evict(self.local_tasks)
+            self.save_local_tasks()
+        return evicted
+
+    def sync_tasks(self, progress=None):
         """
-        向 Microsoft To Do 中的作业列表添加新作业任务，并更新本地缓存。
-        
-        :param title: 作业标题
-        :param due_date: 任务的截止日期（格式：YYYY-MM-DDTHH:MM:SS）
-        :param reminder_time: 可选，任务的提醒时间（格式：YYYY-MM-DDTHH:MM:SS）
+        对账本地任务与 Microsoft To Do 中的作业列表：
+        1. 本地有、远程没有 -> 创建
+        2. 本地截止时间、提醒时间或完成状态变化 -> PATCH 更新或标记完成
+        内容未变化的任务不发送请求，详见 Reconciler。同步前先淘汰已过期的本地任务，
+        开启 complete_remote 时过期任务对应的远程任务被标记为已完成，确认后才从本地存储移入冷存档。
+
+        :param progress: 可选，批量请求的进度回调，见 Reconciler.apply
+        :return: 本次执行的 SyncPlan
         """
-        try:
-            self.todo_client.add_task(self.homework_list_id, title, due_date, reminder_time)
-            logging.info(f"Task '{title}' added to Microsoft To Do successfully.")
-        except Exception as e:
-            logging.error(f"Failed to add task '{title}' to the homework list: {e}")
-            logging.info(f"Reset up the Microsoft To Do client...")
-            self._initialize_client()
-            os.sleep(5)
-            self.add_homework_task(title, due_date, reminder_time)
+        logging.info("Starting task synchronization...")
+        self.evict_expired()
+        self.get_homework_tasks()
+        with self.lock:
+            local_tasks = dict(self.local_tasks.items())
+        # 等待远程完成的过期任务以“已完成”状态留在本地存储中参与对账
+        plan = Reconciler(self.todo_client, self.mirror).sync(local_tasks, progress)
+        if self.retention is not None:
+            with self.lock:
+                # 标记完成失败的任务留在存储中，下一次同步（包括重启后）继续重试
+                completed = [key for key in self.retention.pending(local_tasks) if key not in plan.failed]
+                if self.retention.finish(self.local_tasks, completed):
+                    self.save_local_tasks()
+        return plan
+
+    def add_homework_task(self, title, due_date, reminder_time=None):
+        """
+        新增（或更新）一个本地作业任务并立即与 Microsoft To Do 对账。与 sync_tasks 一样经由 Reconciler，
+        远程已有同名任务时只绑定或更新，不会重复创建；限流时抛出 ThrottledError。
+
+        :param title: 作业标题（同时作为本地任务标识）
+        :param due_date: 任务的截止日期（格式：YYYY-MM-DD）
+        :param reminder_time: 可选，任务的提醒时间（格式：YYYY-MM-DD HH:MM）
+        :return: 绑定的远程任务，失败时为 None
+        """
+        task_data = {'title': title, 'due_date': due_date, 'reminder_time': reminder_time}
+        self.set_local_task(title, task_data)
+        self.save_local_tasks()
+        self.get_homework_tasks()
+        plan = Reconciler(self.todo_client, self.mirror).sync({title: task_data}, partial=True)
+        return None if title in plan.failed else self.mirror.bound_task(title)
 
     def get_homework_tasks(self):
         """
-        获取当前 Microsoft To Do 中所有的作业任务。
+        获取当前 Microsoft To Do 中所有的作业任务，通过 delta 查询增量更新本地镜像。
         
         :return: 返回作业任务列表
         """
-        tasks = self.todo_client.get_tasks(self.homework_list_id)
-        if tasks:
-            logging.info(f"Retrieved {len(tasks)} homework tasks from Microsoft To Do.")
-        return tasks
+        self.ensure_ready()
+        changes = self.mirror.refresh()
+        if changes:
+            logging.info(f"Applied {changes} changes from Microsoft To Do to the local mirror.")
+        return self.mirror.values()
 
     def find_task_by_title(self, title):
         """
-        根据任务标题查找现有任务。
+        根据任务标题查找现有任务：优先返回已绑定的远程任务，否则按标题在镜像中查找。
 
         :param title: 要查找的任务标题
         :return: 任务对象或 None
         """
-        tasks = self.get_homework_tasks()
-        for task in tasks:
-            if task.get('title') == title:
-                return task
-        return None
\ No newline at end of file
+        self.get_homework_tasks()
+        return self.mirror.bound_task(title) or self.mirror.find_by_title(title)
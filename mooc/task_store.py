@@ -0,0 +1,122 @@
+# File: mooc/task_store.py
+
+import json
+import logging
+import os
+from collections.abc import MutableMapping
+
+
+class JournaledTaskStore(MutableMapping):
+    """
+    带变更跟踪的本地任务存储。
+    变更先追加到日志文件，日志过长时通过临时文件加重命名原子地压缩为快照；
+    启动时加载快照并重放日志。
+    """
+    COMPACT_THRESHOLD = 200  # 日志条数超过该值时压缩
+
+    def __init__(self, snapshot_file, journal_file=None):
+        """
+        :param snapshot_file: 快照文件路径（与旧版 JSON 任务文件格式相同）
+        :param journal_file: 日志文件路径，默认为快照文件名加 .journal
+        """
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file or f"{snapshot_file}.journal"
+        self._data = {}
+        self._pending = []        # 尚未写入日志的变更
+        self._journal_length = 0  # 日志中的条数
+        self._load()
+
+    def _load(self):
+        """
+        加载快照并重放日志。日志末尾有残缺条目时立即压缩，避免后续追加写在残缺行之后。
+        """
+        truncated = False
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                self._data = json.load(f)
+        except FileNotFoundError:
+            logging.warning(f"Local task file '{self.snapshot_file}' not found. Starting with an empty task list.")
+        except json.JSONDecodeError:
+            logging.error(f"Failed to decode local task file '{self.snapshot_file}'. Replaying the journal only.")
+
+        try:
+            with open(self.journal_file, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 崩溃时写了一半的最后一行，之后的内容不可信
+                        logging.warning("Ignoring a truncated entry at the end of the task journal.")
+                        truncated = True
+                        break
+                    self._replay(entry)
+                    self._journal_length += 1
+        except FileNotFoundError:
+            pass
+        if truncated:
+            self.compact()
+        logging.info(f"Loaded {len(self._data)} tasks from local cache "
+                     f"({self._journal_length} journal entries replayed).")
+
+    def _replay(self, entry):
+        if entry.get('op') == 'set':
+            self._data[entry['key']] = entry['value']
+        elif entry.get('op') == 'del':
+            self._data.pop(entry['key'], None)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        if self._data.get(key) == value:
+            return
+        self._data[key] = value
+        self._pending.append({'op': 'set', 'key': key, 'value': value})
+
+    def __delitem__(self, key):
+        del self._data[key]
+        self._pending.append({'op': 'del', 'key': key})
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def dirty(self):
+        return bool(self._pending)
+
+    def flush(self):
+        """
+        将未保存的变更追加到日志，必要时压缩。
+
+        :return: 是否写入了变更
+        """
+        if not self._pending:
+            return False
+        with open(self.journal_file, 'a') as f:
+            for entry in self._pending:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_length += len(self._pending)
+        self._pending = []
+        if self._journal_length > self.COMPACT_THRESHOLD:
+            self.compact()
+        return True
+
+    def compact(self):
+        """
+        原子地写出完整快照并清空日志。
+        """
+        tmp_file = f"{self.snapshot_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.snapshot_file)
+        # 快照已包含日志中的所有变更，日志可以安全清空
+        open(self.journal_file, 'w').close()
+        self._journal_length = 0
+        logging.info(f"Compacted {len(self._data)} tasks into '{self.snapshot_file}'.")
@@ -1,26 +1,86 @@
 # File: ms_todo/client.py
 
 import json
-import requests
-import msal
+import logging
+import threading
+import time
+from mooc.metrics import HTTP_RETRIES, GRAPH_THROTTLES
+from .lists import TodoListDirectory
+from .transport import GraphTransport, ThrottledError  # noqa: F401
+
+class DeltaExpiredError(Exception):
+    """
+    deltaLink 已失效（410 Gone），需要重新全量同步。
+    """
+
+class FileTokenCache:
+    """
+    保存在文件中的令牌缓存。其他实现（如共享数据库）提供相同的 load/save 方法即可。
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        with open(self.path, 'r') as f:
+            return f.read()
+
+    def save(self, data):
+        with open(self.path, 'w') as f:
+            f.write(data)
+
+    def __str__(self):
+        return self.path
+
+def _token_cache_store(target):
+    return target if hasattr(target, 'save') else FileTokenCache(target)
 
 class MicrosoftTodoClient:
-    def __init__(self, client_id, client_secret, authority, scopes):
+    GRAPH_URL = "https://graph.microsoft.com/v1.0"
+    BATCH_LIMIT = 20
+    REFRESH_MARGIN = 300  # 令牌到期前多久静默刷新 (s)
+
+    def __init__(self, client_id, client_secret, authority, scopes, transport=None):
         """
         初始化 Microsoft Graph API 客户端应用程序。
+        :param transport: 可选，共享的 GraphTransport；默认新建一个
         """
         self.client_id = client_id
         self.client_secret = client_secret
         self.authority = authority
         self.scopes = scopes
-        self.app = self.create_msal_app()
+        self.transport = transport or GraphTransport()
         self.access_token = None
+        self.token_expires_at = 0.0
+        self.token_cache_file = None
+        self.lists = TodoListDirectory()
+        self.todo_lists = None
+        # MSAL 导入较慢，应用与令牌缓存在首次需要令牌时才创建
+        self._app = None
+        self._token_cache = None
+        self._token_cache_data = None
+        self._token_lock = threading.RLock()
+
+    @property
+    def token_cache(self):
+        if self._token_cache is None:
+            import msal
+            self._token_cache = msal.SerializableTokenCache()
+            if self._token_cache_data is not None:
+                self._token_cache.deserialize(self._token_cache_data)
+                self._token_cache_data = None
+        return self._token_cache
+
+    @property
+    def app(self):
+        if self._app is None:
+            self._app = self.create_msal_app()
+        return self._app
 
     def create_msal_app(self):
         """
         创建 MSAL 的 ConfidentialClientApplication 实例。
         """
-        self.token_cache = msal.SerializableTokenCache()
+        import msal
         return msal.ConfidentialClientApplication(
             client_id=self.client_id,
             client_credential=self.client_secret,
@@ -29,10 +89,11 @@ class MicrosoftTodoClient:
         )
 
     @staticmethod
-    def from_config_file(config_file):
+    def from_config_file(config_file, transport=None):
         """
         从配置文件创建 MicrosoftTodoClient 实例。
         :param config_file: 配置文件路径
+        :param transport: 可选，共享的 GraphTransport
         :return: MicrosoftTodoClient 实例
         """
         with open(config_file, 'r') as f:
@@ -43,7 +104,7 @@ class MicrosoftTodoClient:
         authority = parameters['authority']
         scopes = parameters['scopes']
         
-        return MicrosoftTodoClient(client_id, client_secret, authority, scopes)
+        return MicrosoftTodoClient(client_id, client_secret, authority, scopes, transport)
 
     def get_access_token(self):
         """
@@ -58,49 +119,106 @@ class MicrosoftTodoClient:
                 code=authorization_code,
                 scopes=self.scopes
             )
-            self.access_token = token_response.get('access_token')
+            self._store_token(token_response)
         except Exception as e:
-            print(f"获取访问令牌时出错: {e}")
+            logging.error(f"获取访问令牌时出错: {e}")
             return None
 
         return self.access_token
+
+    def _store_token(self, token_response):
+        """
+        记录 MSAL 返回的访问令牌及其到期时间。
+        """
+        if not token_response or 'access_token' not in token_response:
+            return None
+        self.access_token = token_response['access_token']
+        self.token_expires_at = time.time() + int(token_response.get('expires_in', 0))
+        return self.access_token
+
+    def refresh_token(self, force=False):
+        """
+        通过 MSAL 静默获取新令牌（必要时使用刷新令牌），缓存变化时写回令牌缓存文件。
+        :param force: 是否忽略缓存中的访问令牌强制刷新
+        :return: 访问令牌，无法静默获取时返回 None
+        """
+        with self._token_lock:
+            accounts = self.app.get_accounts()
+            if not accounts:
+                return None
+            token_response = self.app.acquire_token_silent(self.scopes, account=accounts[0], force_refresh=force)
+            token = self._store_token(token_response)
+            if self.token_cache_file:
+                self.save_token_cache(self.token_cache_file)
+            return token
+
+    def ensure_token(self):
+        """
+        在令牌即将到期前静默刷新，返回可用的访问令牌。
+        """
+        with self._token_lock:
+            if not self.access_token or time.time() >= self.token_expires_at - self.REFRESH_MARGIN:
+                self.refresh_token()
+            return self.access_token
+
+    def _request(self, method, url, **kwargs):
+        """
+        携带访问令牌发送请求；收到 401 时强制刷新一次令牌并重放请求。
+        """
+        headers = dict(kwargs.pop("headers", None) or {})
+        for attempt in range(2):
+            headers["Authorization"] = f"Bearer {self.ensure_token()}"
+            response = self.transport.request(method, url, headers=headers, **kwargs)
+            if response.status_code != 401 or attempt:
+                return response
+            logging.warning("访问令牌被拒绝，正在刷新令牌后重试。")
+            self.refresh_token(force=True)
+        return response
     
-    def save_token_cache(self, file_path):
+    def save_token_cache(self, file_path, force=False):
         """
-        将令牌缓存保存到文件。
-        :param file_path: 保存令牌缓存的文件路径
+        将令牌缓存保存到文件，仅在缓存发生变化时写入。
+        :param file_path: 保存令牌缓存的文件路径，或提供 load/save 方法的令牌缓存存储
+        :param force: 是否在缓存未变化时也写入
         """
-        with open(file_path, 'w') as f:
-            f.write(self.token_cache.serialize())
+        self.token_cache_file = _token_cache_store(file_path)
+        if not (force or self.token_cache.has_state_changed):
+            return
+        self.token_cache_file.save(self.token_cache.serialize())
+        self.token_cache.has_state_changed = False
             
-    def load_token_cache(self, file_path):
+    def load_token_cache(self, file_path, acquire=True):
         """
-        从文件加载令牌缓存。
-        :param file_path: 保存令牌缓存的文件路径
+        从文件加载令牌缓存，并静默获取访问令牌。
+        :param file_path: 保存令牌缓存的文件路径，或提供 load/save 方法的令牌缓存存储
+        :param acquire: 为 False 时只读取缓存，令牌在首次请求时再获取
         """
-        with open(file_path, 'r') as f:
-            self.token_cache.deserialize(f.read())
-        accounts = self.app.get_accounts()
-        token_response = self.app.acquire_token_silent(self.scopes, account=accounts[0])
-        self.access_token = token_response.get('access_token')
-        return self.access_token
+        store = _token_cache_store(file_path)
+        data = store.load()
+        with self._token_lock:
+            if self._token_cache is None:
+                self._token_cache_data = data
+            else:
+                self._token_cache.deserialize(data)
+            self.token_cache_file = store
+        return self.refresh_token() if acquire else None
 
     def get_todo_lists(self):
         """
-        获取当前用户的 Microsoft To Do 列表。
+        获取当前用户的 Microsoft To Do 列表，并更新列表目录。
         """
-        if not self.access_token:
-            print("无效的访问令牌。")
+        if not self.ensure_token():
+            logging.error("无效的访问令牌。")
             return None
 
-        headers = {"Authorization": f"Bearer {self.access_token}"}
-        response = requests.get("https://graph.microsoft.com/v1.0/me/todo/lists", headers=headers)
+        response = self._request("GET", f"{self.GRAPH_URL}/me/todo/lists")
 
         if response.status_code == 200:
             self.todo_lists = response.json()
+            self.lists.update(self.todo_lists.get('value', []))
             return self.todo_lists
         else:
-            print(f"请求失败，状态码: {response.status_code}")
+            logging.error(f"请求失败，状态码: {response.status_code}")
             return None
 
     def get_list_id(self, search_term):
@@ -109,43 +227,22 @@ class MicrosoftTodoClient:
         :param search_term: 部分或全部列表名称
         :return: 匹配的列表的 ID 或 None
         """
-        if not hasattr(self, 'todo_lists') or not self.todo_lists:
-            print("无法获取 To Do 列表")
+        if not self.lists:
+            logging.error("无法获取 To Do 列表")
             return None
 
-        # 遍历查找列表名称包含搜索词的列表
-        for todo_list in self.todo_lists.get('value', []):
-            if search_term.lower() in todo_list.get('displayName').lower():
-                print(f"找到匹配的列表: {todo_list.get('displayName')}")
-                return todo_list.get('id')
-
-        print(f"未找到包含 '{search_term}' 的列表")
-        return None
+        list_id = self.lists.find(search_term)
+        if list_id is None:
+            logging.warning(f"未找到包含 '{search_term}' 的列表")
+            return None
+        logging.info(f"找到匹配的列表: {self.lists.name_of(list_id)}")
+        return list_id
 
-    def add_task(self, list_id, title, due_date=None, reminder_time=None):
+    @staticmethod
+    def _task_data(title, due_date=None, reminder_time=None):
         """
-        向指定的 To Do 列表添加一个新任务。
-        :param list_id: To Do 列表的 ID
-        :param title: 任务的标题
-        :param due_date: 任务的截止日期时间，格式为 'YYYY-MM-DDTHH:MM:SS', 默认为明天
-        :param reminder_time: 可选，任务的提醒时间，格式为 'YYYY-MM-DDTHH:MM:SS'
+        构造创建任务的请求体。
         """
-        if not hasattr(self, 'todo_lists') or not self.todo_lists:
-            print("无法获取 To Do 列表")
-            return None
-        
-        # 查找匹配的列表名称
-        list_name = None
-        for todo_list in self.todo_lists.get('value', []):
-            if todo_list.get('id') == list_id:
-                list_name = todo_list.get('displayName')
-                break
-
-        if not list_name:
-            print("未找到对应的列表名称")
-            return None
-
-        # 准备任务数据
         task_data = {
             "title": title
         }
@@ -161,25 +258,175 @@ class MicrosoftTodoClient:
                 "dateTime": reminder_time,
                 "timeZone": "UTC"
             }
+        return task_data
 
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        }
+    def add_task(self, list_id, title, due_date=None, reminder_time=None):
+        """
+        向指定的 To Do 列表添加一个新任务。
+        :param list_id: To Do 列表的 ID
+        :param title: 任务的标题
+        :param due_date: 任务的截止日期时间，格式为 'YYYY-MM-DDTHH:MM:SS', 默认为明天
+        :param reminder_time: 可选，任务的提醒时间，格式为 'YYYY-MM-DDTHH:MM:SS'
+        """
+        # 列表名称仅用于日志，目录中还没有该列表时使用其 ID
+        list_name = self.lists.name_of(list_id) or list_id
+
+        # 准备任务数据
+        task_data = self._task_data(title, due_date, reminder_time)
 
         # 向 Microsoft To Do API 发送 POST 请求，添加任务
-        url = f"https://graph.microsoft.com/v1.0/me/todo/lists/{list_id}/tasks"
-        response = requests.post(url, headers=headers, json=task_data)
+        url = f"{self.GRAPH_URL}/me/todo/lists/{list_id}/tasks"
+        response = self._request("POST", url, json=task_data)
 
         if response.status_code == 201:
-            print(f"Successfully added task '{title}' to list '{list_name}'.")
+            logging.debug(f"Successfully added task '{title}' to list '{list_name}'.")
             return response.json()
         else:
             raise Exception(f"Failed to add task to list '{list_name}'. Status code: {response.status_code}")
 
+    def batch(self, sub_requests):
+        """
+        通过 JSON $batch 一次发送多个请求（最多 BATCH_LIMIT 个）。
+
+        :param sub_requests: 子请求列表，每项包含 id、method、url（相对于 /v1.0）及可选的 headers、body
+        :return: 子请求 ID -> 子响应（含 status、headers、body）
+        """
+        if len(sub_requests) > self.BATCH_LIMIT:
+            raise ValueError(f"A $batch request holds at most {self.BATCH_LIMIT} sub-requests.")
+
+        # $batch 本身是 POST，只有全部子请求都幂等时才允许传输层重放整个批次
+        idempotent = all(sub["method"].upper() in self.transport.IDEMPOTENT_METHODS for sub in sub_requests)
+        response = self._request("POST", f"{self.GRAPH_URL}/$batch", json={"requests": sub_requests},
+                                 idempotent=idempotent)
+        if response.status_code != 200:
+            raise Exception(f"Batch request failed. Status code: {response.status_code}")
+        return {sub["id"]: sub for sub in response.json().get("responses", [])}
+
+    def _batch_each(self, method, items, build, success_status, label, max_retries=3, progress=None):
+        """
+        将一组同类子请求按 BATCH_LIMIT 个一组通过 $batch 发送，被限流的子请求单独重试，幂等的子请求遇到服务端错误时也重试。
+
+        :param method: 子请求的 HTTP 方法
+        :param items: 待处理的条目
+        :param build: 条目 -> (相对 URL, 请求体, 日志用描述)
+        :param success_status: 表示成功的状态码
+        :param label: 指标中使用的端点标签
+        :param max_retries: 失败子请求的最大重试次数
+        :param progress: 可选，每个 $batch 请求完成后以 (已成功数, 总数) 调用
+        :return: 与 items 一一对应的列表，成功时为响应体，失败时为 None
+        """
+        results = [None] * len(items)
+        pending = list(range(len(items)))
+        built = [build(item) for item in items]
+        endpoint = f"{method} /$batch[{label}]"
+        # 非幂等的子请求（创建任务）只在限流时重试，服务端错误或缺失的子响应可能已经生效
+        if method.upper() in self.transport.IDEMPOTENT_METHODS:
+            retryable = self.transport.RETRYABLE_STATUS + (None,)
+        else:
+            retryable = self.transport.THROTTLE_STATUS
+        done = 0
+
+        for attempt in range(max_retries + 1):
+            retry, delay = [], 0
+            for start in range(0, len(pending), self.BATCH_LIMIT):
+                chunk = pending[start:start + self.BATCH_LIMIT]
+                sub_requests = [{
+                    "id": str(index),
+                    "method": method,
+                    "url": built[index][0],
+                    "headers": {"Content-Type": "application/json"},
+                    "body": built[index][1]
+                } for index in chunk]
+                responses = self.batch(sub_requests)
+
+                for index in chunk:
+                    sub = responses.get(str(index), {})
+                    status = sub.get("status")
+                    if status == success_status:
+                        results[index] = sub.get("body") or {}
+                        done += 1
+                    elif status in retryable:
+                        retry.append(index)
+                        HTTP_RETRIES.inc(endpoint=endpoint, reason=status)
+                        if status in self.transport.THROTTLE_STATUS:
+                            GRAPH_THROTTLES.inc(endpoint=endpoint)
+                        delay = max(delay, self.transport.retry_after(sub.get("headers")) or 0)
+                    else:
+                        logging.error(f"Failed to {method} task '{built[index][2]}'. Status code: {status}")
+                if progress:
+                    progress(done, len(items))
+
+            if not retry:
+                break
+            if attempt == max_retries:
+                logging.error(f"Giving up on {len(retry)} tasks after {max_retries} retries.")
+                break
+            pending = retry
+            time.sleep(delay or self.transport.backoff_delay(attempt))
+
+        return results
+
+    def add_tasks(self, list_id, tasks, max_retries=3, progress=None):
+        """
+        批量向指定的 To Do 列表添加任务，每个 $batch 请求打包最多 BATCH_LIMIT 个任务，
+        被限流的子请求单独重试；服务端错误不重试，以免重复创建。
+
+        :param list_id: To Do 列表的 ID
+        :param tasks: 任务列表，每项为包含 title、due_date、reminder_time 的字典
+        :param max_retries: 失败子请求的最大重试次数
+        :param progress: 可选，每个 $batch 请求完成后以 (已添加数, 总数) 调用
+        :return: 与 tasks 一一对应的列表，成功时为创建的任务，失败时为 None
+        """
+        url = f"/me/todo/lists/{list_id}/tasks"
+        return self._batch_each("POST", tasks, lambda task: (
+            url, self._task_data(task['title'], task.get('due_date'), task.get('reminder_time')), task['title']
+        ), 201, "tasks", max_retries, progress)
+
+    def update_task(self, list_id, task_id, changes):
+        """
+        PATCH 更新一个任务的部分字段。
+
+        :param changes: 要修改的字段（Graph todoTask 格式）
+        :return: 更新后的任务
+        """
+        url = f"{self.GRAPH_URL}/me/todo/lists/{list_id}/tasks/{task_id}"
+        response = self._request("PATCH", url, json=changes)
+        if response.status_code != 200:
+            raise Exception(f"Failed to update task '{task_id}'. Status code: {response.status_code}")
+        return response.json()
+
+    def update_tasks(self, list_id, updates, max_retries=3, progress=None):
+        """
+        通过 $batch 批量 PATCH 更新任务。
+
+        :param updates: (任务 ID, 要修改的字段) 列表
+        :return: 与 updates 一一对应的列表，成功时为更新后的任务，失败时为 None
+        """
+        return self._batch_each("PATCH", updates, lambda update: (
+            f"/me/todo/lists/{list_id}/tasks/{update[0]}", update[1], update[0]
+        ), 200, "tasks/{id}", max_retries, progress)
+
+    def _get_pages(self, url):
+        """
+        按 @odata.nextLink 依次获取所有分页。
+        :return: (所有条目, 最后一页的 JSON)
+        """
+        items = []
+        while True:
+            response = self._request("GET", url)
+            if response.status_code == 410:
+                raise DeltaExpiredError(f"Delta token expired for '{url}'.")
+            if response.status_code != 200:
+                raise Exception(f"Failed to fetch '{url}'. Status code: {response.status_code}")
+            page = response.json()
+            items.extend(page.get("value", []))
+            url = page.get("@odata.nextLink")
+            if not url:
+                return items, page
+
     def get_tasks(self, list_id):
         """
-        获取指定 To Do 列表中的所有任务。
+        获取指定 To Do 列表中的所有任务（包括所有分页）。
         
         :param list_id: To Do 列表的 ID
         :return: 任务列表（字典形式）
@@ -187,11 +434,21 @@ class MicrosoftTodoClient:
         if not self.access_token:
             raise ValueError("Invalid access token. Please authenticate first.")
         
-        headers = {"Authorization": f"Bearer {self.access_token}"}
-        url = f"https://graph.microsoft.com/v1.0/me/todo/lists/{list_id}/tasks"
-        response = requests.get(url, headers=headers)
+        url = f"{self.GRAPH_URL}/me/todo/lists/{list_id}/tasks"
+        tasks, _ = self._get_pages(url)
+        return tasks
 
-        if response.status_code == 200:
-            return response.json().get("value", [])
-        else:
-            raise Exception(f"Failed to fetch tasks from list '{list_id}'. Status code: {response.status_code}")
+    def get_tasks_delta(self, list_id, delta_link=None):
+        """
+        通过 /tasks/delta 获取指定列表自上次同步以来的变更。
+
+        :param list_id: To Do 列表的 ID
+        :param delta_link: 上次同步保存的 deltaLink，为空时进行全量同步
+        :return: (变更的任务列表, 新的 deltaLink)；被删除的任务带有 '@removed' 字段
+        """
+        if not self.access_token:
+            raise ValueError("Invalid access token. Please authenticate first.")
+
+        url = delta_link or f"{self.GRAPH_URL}/me/todo/lists/{list_id}/tasks/delta"
+        changes, last_page = self._get_pages(url)
+        return changes, last_page.get("@odata.deltaLink")
@@ -0,0 +1,78 @@
+# File: ms_todo/lists.py
+
+import json
+import logging
+import os
+import threading
+
+
+class TodoListDirectory:
+    """
+    To Do 列表目录：名称 -> ID 与 ID -> 名称两个字典，可持久化到文件，
+    启动时直接使用缓存，由后台刷新保持最新。
+    """
+    def __init__(self, cache_file=None):
+        """
+        :param cache_file: 可选，缓存文件路径；为空时只保存在内存中
+        """
+        self.cache_file = cache_file
+        self.by_name = {}
+        self.by_id = {}
+        self.lock = threading.Lock()
+        if cache_file:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_file, 'r') as f:
+                self._set(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, TypeError, AttributeError):
+            logging.warning(f"Ignoring invalid To Do list cache '{self.cache_file}'.")
+
+    def save(self):
+        if not self.cache_file:
+            return
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.by_id, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_file, self.cache_file)
+
+    def _set(self, by_id):
+        with self.lock:
+            self.by_id = dict(by_id)
+            self.by_name = {name: list_id for list_id, name in self.by_id.items()}
+
+    def update(self, todo_lists):
+        """
+        用 /me/todo/lists 的返回结果替换目录，有变化时写回缓存文件。
+
+        :param todo_lists: 列表对象的列表（含 id、displayName）
+        :return: 目录是否发生变化
+        """
+        by_id = {todo_list['id']: todo_list.get('displayName', '') for todo_list in todo_lists}
+        if by_id == self.by_id:
+            return False
+        self._set(by_id)
+        self.save()
+        return True
+
+    def find(self, search_term):
+        """
+        按名称查找列表 ID：优先完全匹配，否则返回第一个名称包含搜索词（不区分大小写）的列表。
+        """
+        list_id = self.by_name.get(search_term)
+        if list_id is not None:
+            return list_id
+        search_term = search_term.lower()
+        for name, list_id in self.by_name.items():
+            if search_term in name.lower():
+                return list_id
+        return None
+
+    def name_of(self, list_id):
+        return self.by_id.get(list_id)
+
+    def __len__(self):
+        return len(self.by_id)
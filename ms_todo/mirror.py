@@ -0,0 +1,136 @@
+# File: ms_todo/mirror.py
+
+import json
+import logging
+import os
+from .client import DeltaExpiredError
+
+
+class TaskMirror:
+    """
+    Microsoft To Do 列表的本地镜像，通过 /tasks/delta 增量保持最新，并按标题建立索引。
+    """
+    def __init__(self, client, list_id, mirror_file):
+        """
+        :param client: MicrosoftTodoClient 实例
+        :param list_id: 要镜像的 To Do 列表 ID
+        :param mirror_file: 镜像持久化文件路径
+        """
+        self.client = client
+        self.list_id = list_id
+        self.mirror_file = mirror_file
+        self.delta_link = None
+        self.tasks = {}        # 任务 ID -> 任务
+        self.title_index = {}  # 标题 -> 任务 ID
+        self.bindings = {}     # 本地任务标识 -> {"id": 远程任务 ID, "hash": 上次同步的内容哈希}
+        self._load()
+
+    def _load(self):
+        """
+        从文件加载镜像；文件缺失、损坏或属于其他列表时从空镜像开始。
+        """
+        try:
+            with open(self.mirror_file, 'r') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError:
+            logging.error(f"Failed to decode task mirror '{self.mirror_file}'. Starting with an empty mirror.")
+            return
+
+        if state.get('list_id') != self.list_id:
+            logging.info("Task mirror belongs to another list. Starting with an empty mirror.")
+            return
+        self.delta_link = state.get('delta_link')
+        self.tasks = state.get('tasks', {})
+        self.bindings = state.get('bindings', {})
+        self._rebuild_index()
+        logging.info(f"Loaded {len(self.tasks)} tasks from the To Do mirror.")
+
+    def save(self):
+        """
+        原子地将镜像写入文件。
+        """
+        state = {'list_id': self.list_id, 'delta_link': self.delta_link, 'tasks': self.tasks,
+                 'bindings': self.bindings}
+        tmp_file = f"{self.mirror_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_file, self.mirror_file)
+
+    def _rebuild_index(self):
+        self.title_index = {task.get('title'): task_id for task_id, task in self.tasks.items()}
+
+    def _apply(self, task):
+        """
+        应用一条变更（新增、修改或删除）。
+        """
+        task_id = task.get('id')
+        old = self.tasks.get(task_id)
+        if old is not None and self.title_index.get(old.get('title')) == task_id:
+            del self.title_index[old.get('title')]
+
+        if '@removed' in task:
+            self.tasks.pop(task_id, None)
+            return
+        # delta 可能只返回变化的字段，与旧数据合并
+        merged = {**old, **task} if old else task
+        self.tasks[task_id] = merged
+        self.title_index[merged.get('title')] = task_id
+
+    def refresh(self):
+        """
+        拉取自上次同步以来的变更并应用到镜像。
+
+        :return: 本次应用的变更数
+        """
+        try:
+            changes, delta_link = self.client.get_tasks_delta(self.list_id, self.delta_link)
+        except DeltaExpiredError:
+            logging.warning("Delta link expired. Re-syncing the full To Do list.")
+            self.delta_link = None
+            self.tasks = {}
+            self.title_index = {}
+            changes, delta_link = self.client.get_tasks_delta(self.list_id)
+
+        for task in changes:
+            self._apply(task)
+        if changes or delta_link != self.delta_link:
+            self.delta_link = delta_link
+            self.save()
+        return len(changes)
+
+    def apply_many(self, tasks):
+        """
+        写穿：批量写入刚创建或更新的远程任务，不保存文件。
+        """
+        for task in tasks:
+            if task and 'id' in task:
+                self._apply(task)
+
+    def bind(self, key, task_id, content_hash):
+        """
+        记录本地任务与远程任务的对应关系及同步时的内容哈希，在 save 时写盘。
+        """
+        self.bindings[key] = {'id': task_id, 'hash': content_hash}
+
+    def unbind(self, key):
+        self.bindings.pop(key, None)
+
+    def bound_task(self, key):
+        """
+        :return: 本地任务绑定的远程任务，未绑定或远程任务已删除时为 None
+        """
+        binding = self.bindings.get(key)
+        return self.tasks.get(binding['id']) if binding else None
+
+    def find_by_title(self, title):
+        task_id = self.title_index.get(title)
+        return self.tasks.get(task_id) if task_id else None
+
+    @property
+    def titles(self):
+        return self.title_index.keys()
+
+    def values(self):
+        return list(self.tasks.values())
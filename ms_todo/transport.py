@@ -0,0 +1,195 @@
+# File: ms_todo/transport.py
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from mooc.metrics import HTTP_REQUESTS, HTTP_RETRIES, HTTP_SECONDS, GRAPH_THROTTLES
+
+
+class ThrottledError(Exception):
+    """
+    Microsoft Graph 持续限流（429/503），重试次数用尽。调用方应至少等待 retry_after 秒后再请求。
+    """
+    def __init__(self, message, retry_after=None, status_code=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class TokenBucket:
+    """
+    客户端令牌桶限速：平均每秒 rate 个请求，允许 capacity 个突发。
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        取出一个令牌，令牌不足时阻塞等待。
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class GraphTransport:
+    """
+    共享的 keep-alive HTTP 会话：带令牌桶限速，并对限流和临时错误按 Retry-After 或带抖动的指数退避重试。
+    非幂等请求（POST）只在请求未发出（连接阶段失败）或被限流时重试，避免重复创建。
+    """
+    THROTTLE_STATUS = (429, 503)
+    RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+    IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "PATCH", "DELETE")
+
+    def __init__(self, rate=4.0, burst=10, max_retries=4, backoff_base=1.0, backoff_cap=60.0,
+                 pool_size=10, timeout=30.0):
+        """
+        :param rate: 平均每秒允许的请求数
+        :param burst: 允许的突发请求数
+        :param max_retries: 每个请求的最大重试次数
+        :param backoff_base: 指数退避的基数（秒）
+        :param backoff_cap: 单次等待的上限（秒）
+        :param pool_size: 连接池大小
+        :param timeout: 请求超时（秒）
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """
+        首次请求时才导入 requests 并创建会话
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def backoff_delay(self, attempt):
+        """
+        第 attempt 次重试前的等待时间：上限为 backoff_cap 的指数退避，加全抖动。
+        """
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def retry_after(self, headers):
+        """
+        解析 Retry-After（秒数或 HTTP 日期），无法解析时返回 None。
+        服务端给出的等待时间原样遵守，不受 backoff_cap 限制。
+        """
+        value = (headers or {}).get("Retry-After")
+        if value is None:
+            return None
+        value = str(value).strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+        return max(delay, 0.0)
+
+    @staticmethod
+    def endpoint(method, url):
+        """
+        将 URL 归一化为指标用的端点标签，例如 "GET /me/todo/lists/{id}/tasks/delta"。
+        """
+        path = urlsplit(url).path
+        path = path[path.find("/v1.0") + len("/v1.0"):] if "/v1.0" in path else path
+        segments = path.strip("/").split("/")
+        normalized = [
+            "{id}" if index and segments[index - 1] in ("lists", "tasks") and segment != "delta" else segment
+            for index, segment in enumerate(segments)
+        ]
+        return f"{method} /{'/'.join(normalized)}"
+
+    @staticmethod
+    def before_send(error):
+        """
+        判断网络错误是否发生在请求发出之前（连接超时或连接被拒绝），此时服务端一定没有收到请求。
+        """
+        import requests
+        from urllib3.exceptions import NewConnectionError
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        if not isinstance(error, requests.ConnectionError) or not error.args:
+            return False
+        reason = getattr(error.args[0], "reason", error.args[0])
+        return isinstance(reason, NewConnectionError)
+
+    def request(self, method, url, idempotent=None, **kwargs):
+        """
+        发送请求。遇到网络错误或可重试的状态码时按需等待并重试；
+        限流在重试用尽后抛出 ThrottledError，其他状态码原样返回给调用方。
+
+        非幂等请求只在连接阶段失败和限流（429/503）时重试，其他网络错误直接抛出，其他状态码直接返回。
+
+        :param idempotent: 请求是否可以安全重放，默认按 IDEMPOTENT_METHODS 判断
+        """
+        import requests
+        if idempotent is None:
+            idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        retryable = self.RETRYABLE_STATUS if idempotent else self.THROTTLE_STATUS
+        kwargs.setdefault("timeout", self.timeout)
+        endpoint = self.endpoint(method, url)
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                with HTTP_SECONDS.time(endpoint=endpoint):
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                HTTP_REQUESTS.inc(endpoint=endpoint, status="error")
+                if attempt == self.max_retries or not (idempotent or self.before_send(e)):
+                    raise
+                HTTP_RETRIES.inc(endpoint=endpoint, reason="connection")
+                time.sleep(self.backoff_delay(attempt))
+                continue
+
+            HTTP_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+            if response.status_code not in retryable:
+                return response
+
+            if response.status_code in self.THROTTLE_STATUS:
+                GRAPH_THROTTLES.inc(endpoint=endpoint)
+            delay = self.retry_after(response.headers)
+            if attempt == self.max_retries:
+                if response.status_code in self.THROTTLE_STATUS:
+                    raise ThrottledError(f"Microsoft Graph throttled {method} {url} "
+                                         f"(status {response.status_code}).",
+                                         retry_after=delay, status_code=response.status_code)
+                return response
+            HTTP_RETRIES.inc(endpoint=endpoint, reason=response.status_code)
+            time.sleep(delay if delay is not None else self.backoff_delay(attempt))
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
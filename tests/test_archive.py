@@ -0,0 +1,50 @@
+import pytest
+from mooc.archive import NoticeArchive
+
+
+def notice(uuid, title, content, creator="王老师", time="2030-01-01 08:00:00"):
+    return {"uuid": uuid, "title": title, "content": content, "createrName": creator, "completeTime": time}
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = NoticeArchive(str(tmp_path / "notices.db"))
+    yield archive
+    archive.close()
+
+
+def test_identical_content_is_stored_once(archive):
+    first = notice("u1", "通知", "明天停课")
+    assert archive.add_many([first, {**first, "uuid": "u2"}, first]) == 2
+    assert archive.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 1
+    assert archive.get("u2") == {**first, "uuid": "u2"}
+
+
+def test_course_filter_matches_homework_and_titled_announcements(archive):
+    archive.add_many([
+        notice("hw", "作业:实验一", "课程名称：大学物理\r作业名称：实验一", time="2030-01-03 08:00:00"),
+        notice("general", "大学物理 期中考试安排", "请按时参加", time="2030-01-02 08:00:00"),
+        notice("other", "高等数学 调课通知", "下周调课", time="2030-01-01 08:00:00"),
+    ])
+    assert [n["uuid"] for n in archive.search(course="大学物理")] == ["hw", "general"]
+    assert archive.search(course="%") == []
+
+
+def test_limit_and_offset_page_through_results(archive):
+    archive.add_many([notice(f"u{i}", f"通知{i}", f"第{i}条", time=f"2030-01-{i + 1:02d} 08:00:00")
+                      for i in range(10)])
+    assert [n["uuid"] for n in archive.search(limit=3)] == ["u9", "u8", "u7"]
+    assert [n["uuid"] for n in archive.search(limit=3, offset=3)] == ["u6", "u5", "u4"]
+    assert [n["uuid"] for n in archive.search(limit=5, offset=8)] == ["u1", "u0"]
+
+
+def test_text_search_pages_past_false_positives(archive, monkeypatch):
+    monkeypatch.setattr(NoticeArchive, "SEARCH_PAGE", 2)
+    notices = []
+    for i in range(8):
+        # 偶数条只含双字 "期中" 与 "中考"，不含 "期中考"，属于双字索引的误命中
+        content = "期中考试" if i % 2 else "期中 中考"
+        notices.append(notice(f"u{i}", f"通知{i}", content, time=f"2030-01-{i + 1:02d} 08:00:00"))
+    archive.add_many(notices)
+    assert [n["uuid"] for n in archive.search("期中考", limit=2)] == ["u7", "u5"]
+    assert [n["uuid"] for n in archive.search("期中考", limit=2, offset=2)] == ["u3", "u1"]
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import time
+import httpx
+import pytest
+from mooc.async_crawler import AsyncCrawler
+from mooc.crawler import Crawler
+from mooc.sparser import Sparser
+
+
+def notices(count):
+    return [{"uuid": f"uuid-{i:04d}", "title": f"通知{i}", "content": "内容" * 20, "createrName": "教师",
+             "completeTime": "2030-01-01 08:00:00"} for i in range(count, 0, -1)]
+
+
+class FakeNoticeServer:
+    """
+    通知列表接口：可选返回 ETag 并响应条件请求，记录请求头
+    """
+    def __init__(self, items, etag=None):
+        self.body = json.dumps({"notices": {"list": items}}, ensure_ascii=False).encode()
+        self.etag = etag
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.etag and request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304)
+        headers = {"ETag": self.etag} if self.etag else {}
+
+        async def body():
+            for start in range(0, len(self.body), 100):
+                yield self.body[start:start + 100]
+        return httpx.Response(200, headers=headers, content=body())
+
+
+def make_crawler(server):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(server.handler))
+    crawler = AsyncCrawler(client, "cookies.json")
+    crawler.CHUNK_SIZE = 64
+    crawler.notice_link = "https://notice.mooc.ucas.edu.cn/"
+    crawler._warm_until = time.monotonic() + 3600
+    return Crawler(crawler)
+
+
+@pytest.fixture
+def sparser(tmp_path):
+    return Sparser(seen_file=str(tmp_path / "seen.db"), uuid_file=str(tmp_path / "uuids.json"))
+
+
+def test_stop_on_seen_notices_remembers_the_full_body_hash(sparser):
+    items = notices(100)
+    server = FakeNoticeServer(items)
+    sparser.seen.mark_seen([item["uuid"] for item in items[3:]])
+    crawler = make_crawler(server)
+
+    new = list(sparser.iter_new_notices(crawler.iter_notices(), stop_after_seen=5))
+    assert [item["uuid"] for item in new] == [item["uuid"] for item in items[:3]]
+    assert crawler._crawler.body_hash == hashlib.blake2b(server.body, digest_size=16).hexdigest()
+
+    # 同一响应体再次出现时标记为未变化
+    list(sparser.iter_new_notices(crawler.iter_notices(), stop_after_seen=5))
+    assert crawler.unchanged
+    crawler.close()
+
+
+def test_consumer_error_does_not_remember(sparser):
+    server = FakeNoticeServer(notices(50), etag='"v1"')
+    crawler = make_crawler(server)
+
+    def consume():
+        for notice in sparser.iter_new_notices(crawler.iter_notices()):
+            raise RuntimeError(f"queue failed at {notice['uuid']}")
+
+    with pytest.raises(RuntimeError):
+        consume()
+    assert crawler._crawler.validators == {}
+    assert crawler._crawler.body_hash is None
+
+    # 下一次轮询不发送条件请求，重新读取全部通知
+    assert len(crawler.get_notice_list(conditional=True)) == 50
+    assert "If-None-Match" not in server.requests[-1].headers
+    crawler.close()
+
+
+def test_full_read_enables_conditional_requests():
+    server = FakeNoticeServer(notices(10), etag='"v1"')
+    crawler = make_crawler(server)
+    assert len(crawler.get_notice_list(conditional=True)) == 10
+    assert not crawler.unchanged
+
+    assert crawler.get_notice_list(conditional=True) == []
+    assert crawler.unchanged
+    assert server.requests[-1].headers["If-None-Match"] == '"v1"'
+    crawler.close()
+
+
+def test_unchanged_body_without_validators_returns_nothing():
+    server = FakeNoticeServer(notices(10))
+    crawler = make_crawler(server)
+    assert len(crawler.get_notice_list(conditional=True)) == 10
+    assert crawler.get_notice_list(conditional=True) == []
+    assert crawler.unchanged
+    assert len(crawler.get_notice_list(conditional=False)) == 10
+    crawler.close()
@@ -0,0 +1,84 @@
+import time
+import pytest
+from ms_todo.client import MicrosoftTodoClient
+
+
+class FakeApp:
+    """
+    模拟 MSAL 应用：每次静默获取都发放一个新令牌
+    """
+    def __init__(self, accounts=({"username": "student"},), expires_in=3600):
+        self.accounts = list(accounts)
+        self.expires_in = expires_in
+        self.calls = []
+
+    def get_accounts(self):
+        return self.accounts
+
+    def acquire_token_silent(self, scopes, account=None, force_refresh=False):
+        self.calls.append(force_refresh)
+        return {"access_token": f"token-{len(self.calls)}", "expires_in": self.expires_in}
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeTransport:
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.authorizations = []
+
+    def request(self, method, url, headers=None, **kwargs):
+        self.authorizations.append(headers["Authorization"])
+        return FakeResponse(self.statuses.pop(0))
+
+
+def make_client(*statuses, app=None):
+    client = MicrosoftTodoClient("id", "secret", "https://login.example", ["Tasks.ReadWrite"],
+                                 transport=FakeTransport(*statuses))
+    client._app = app or FakeApp()
+    return client
+
+
+def test_token_is_acquired_once_and_reused():
+    client = make_client()
+    assert client.ensure_token() == "token-1"
+    assert client.ensure_token() == "token-1"
+    assert client.app.calls == [False]
+
+
+def test_token_is_refreshed_before_expiry():
+    client = make_client()
+    client.ensure_token()
+    client.token_expires_at = time.time() + client.REFRESH_MARGIN - 1
+    assert client.ensure_token() == "token-2"
+
+
+def test_refresh_without_accounts_returns_none():
+    client = make_client(app=FakeApp(accounts=()))
+    assert client.refresh_token() is None
+    assert client.access_token is None
+
+
+def test_401_forces_one_refresh_and_replays_once():
+    client = make_client(401, 200)
+    response = client._request("GET", f"{client.GRAPH_URL}/me/todo/lists")
+    assert response.status_code == 200
+    assert client.transport.authorizations == ["Bearer token-1", "Bearer token-2"]
+    assert client.app.calls == [False, True]
+
+
+def test_repeated_401_is_returned_after_a_single_replay():
+    client = make_client(401, 401, 200)
+    response = client._request("GET", f"{client.GRAPH_URL}/me/todo/lists")
+    assert response.status_code == 401
+    assert len(client.transport.authorizations) == 2
+
+
+@pytest.mark.parametrize("status", [200, 403, 500])
+def test_other_statuses_do_not_refresh(status):
+    client = make_client(status)
+    assert client._request("GET", f"{client.GRAPH_URL}/me").status_code == status
+    assert client.app.calls == [False]
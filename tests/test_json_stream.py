@@ -0,0 +1,76 @@
+import json
+import random
+import pytest
+from mooc.json_stream import JsonArrayStream
+
+PATH = ("notices", "list")
+
+
+def document(notices):
+    return json.dumps({
+        "code": 0,
+        "msg": "ok \"list\": [1, 2]",
+        "notices": {"total": len(notices), "meta": {"list": ["不是目标"]}, "list": notices},
+        "after": [1, 2, 3],
+    }, ensure_ascii=False).encode()
+
+
+def notices(count):
+    return [{"uuid": f"uuid-{i}", "title": f"通知{i}", "content": "行一\r行二 \\ \"引号\" ]}[{",
+             "score": i * 1.5, "flag": i % 2 == 0, "none": None} for i in range(count)]
+
+
+def parse(data: bytes, sizes) -> list:
+    stream = JsonArrayStream(PATH)
+    items, pos = [], 0
+    for size in sizes:
+        items.extend(stream.feed(data[pos:pos + size]))
+        pos += size
+    items.extend(stream.feed(data[pos:]))
+    stream.close()
+    return items
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 4096])
+def test_fixed_chunk_sizes(chunk_size):
+    expected = notices(20)
+    data = document(expected)
+    assert parse(data, [chunk_size] * (len(data) // chunk_size + 1)) == expected
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_splits(seed):
+    rng = random.Random(seed)
+    expected = notices(30)
+    data = document(expected)
+    sizes = []
+    while sum(sizes) < len(data):
+        sizes.append(rng.randint(1, 50))
+    assert parse(data, sizes) == expected
+
+
+def test_numbers_at_chunk_boundary_are_not_cut():
+    data = json.dumps({"notices": {"list": [12345, 678]}}).encode()
+    split = data.index(b"345")
+    assert parse(data, [split]) == [12345, 678]
+
+
+def test_multibyte_character_split_across_chunks():
+    data = document([{"title": "作业"}])
+    split = data.index("作".encode()) + 1
+    assert parse(data, [split]) == [{"title": "作业"}]
+
+
+def test_stream_is_done_after_array_closes():
+    stream = JsonArrayStream(PATH)
+    assert stream.feed(document([{"uuid": "a"}])) == [{"uuid": "a"}]
+    assert stream.done
+    assert stream.feed(b"garbage") == []
+
+
+@pytest.mark.parametrize("data", [b'{"notices": {"list": [1, 2', b'{"notices": {"other": []}}'])
+def test_close_rejects_missing_or_incomplete_array(data):
+    stream = JsonArrayStream(PATH)
+    stream.feed(data)
+    with pytest.raises(ValueError):
+        stream.close()
@@ -0,0 +1,185 @@
+import itertools
+import pytest
+from mooc.reconcile import Reconciler, local_hash
+from mooc.task_manager import TaskManager
+from ms_todo.mirror import TaskMirror
+
+
+class FakeTodoClient:
+    """
+    内存中的 To Do 列表，记录每次批量创建和批量更新的请求
+    """
+    def __init__(self, fail_titles=()):
+        self.tasks = {}
+        self.created = []
+        self.updated = []
+        self.fail_titles = set(fail_titles)
+        self._ids = itertools.count(1)
+
+    # ---- TaskManager 初始化所需的接口 ----
+
+    def load_token_cache(self, file_path, acquire=True):
+        pass
+
+    def save_token_cache(self, file_path, force=False):
+        pass
+
+    def ensure_token(self):
+        return "token"
+
+    def get_todo_lists(self):
+        return [{'id': "homeworks", 'displayName': "Homeworks"}]
+
+    def get_list_id(self, name):
+        return "homeworks"
+
+    def get_tasks_delta(self, list_id, delta_link=None):
+        return list(self.tasks.values()), "delta"
+
+    @staticmethod
+    def _remote(task_id, title, due_date, reminder_time):
+        task = {'id': task_id, 'title': title, 'status': 'notStarted'}
+        if due_date:
+            task['dueDateTime'] = {'dateTime': f"{due_date}T00:00:00.0000000", 'timeZone': 'UTC'}
+        if reminder_time:
+            task['reminderDateTime'] = {'dateTime': f"{reminder_time.replace(' ', 'T')}:00.0000000",
+                                        'timeZone': 'UTC'}
+        return task
+
+    def add_tasks(self, list_id, tasks, progress=None):
+        self.created.append([task['title'] for task in tasks])
+        results = []
+        for task in tasks:
+            if task['title'] in self.fail_titles:
+                results.append(None)
+                continue
+            remote = self._remote(f"id-{next(self._ids)}", task['title'], task.get('due_date'),
+                                  task.get('reminder_time'))
+            self.tasks[remote['id']] = remote
+            results.append(remote)
+        return results
+
+    def update_tasks(self, list_id, updates, progress=None):
+        self.updated.append(updates)
+        results = []
+        for task_id, changes in updates:
+            self.tasks[task_id] = {**self.tasks[task_id], **changes}
+            results.append(self.tasks[task_id])
+        return results
+
+
+def task(title, due_date="2030-01-02", reminder_time="2030-01-01 20:00", **extra):
+    return {'title': title, 'due_date': due_date, 'reminder_time': reminder_time, **extra}
+
+
+@pytest.fixture
+def client():
+    return FakeTodoClient()
+
+
+@pytest.fixture
+def mirror(client, tmp_path):
+    return TaskMirror(client, "homeworks", str(tmp_path / "mirror.json"))
+
+
+def sync(client, mirror, local_tasks):
+    mirror.refresh()
+    return Reconciler(client, mirror).sync(local_tasks)
+
+
+def test_new_tasks_are_created_and_bound(client, mirror):
+    local_tasks = {"数学: 作业1": task("数学: 作业1"), "物理: 作业2": task("物理: 作业2")}
+    plan = sync(client, mirror, local_tasks)
+
+    assert [key for key, _ in plan.creates] == list(local_tasks)
+    assert client.created == [["数学: 作业1", "物理: 作业2"]]
+    assert set(mirror.bindings) == set(local_tasks)
+    for key, task_data in local_tasks.items():
+        assert mirror.bindings[key]['hash'] == local_hash(task_data)
+
+
+def test_unchanged_tasks_send_no_requests(client, mirror):
+    local_tasks = {"数学: 作业1": task("数学: 作业1")}
+    sync(client, mirror, local_tasks)
+    client.created.clear()
+
+    plan = sync(client, mirror, local_tasks)
+    assert plan.empty
+    assert plan.unchanged == 1
+    assert client.created == [] and client.updated == []
+
+
+def test_changed_deadline_is_patched(client, mirror):
+    sync(client, mirror, {"数学: 作业1": task("数学: 作业1")})
+    task_id = mirror.bindings["数学: 作业1"]['id']
+
+    changed = task("数学: 作业1", due_date="2030-01-05", reminder_time="2030-01-04 20:00")
+    plan = sync(client, mirror, {"数学: 作业1": changed})
+    assert not plan.creates
+    assert [(key, remote_id) for key, remote_id, _, _ in plan.updates] == [("数学: 作业1", task_id)]
+    changes = client.updated[0][0][1]
+    assert changes['dueDateTime']['dateTime'] == "2030-01-05"
+    assert changes['reminderDateTime']['dateTime'] == "2030-01-04 20:00"
+    assert mirror.bindings["数学: 作业1"]['hash'] == local_hash(changed)
+
+
+def test_completed_task_is_marked_without_reopening(client, mirror):
+    sync(client, mirror, {"数学: 作业1": task("数学: 作业1")})
+    plan = sync(client, mirror, {"数学: 作业1": task("数学: 作业1", status='completed')})
+    assert client.updated[-1][0][1] == {'status': 'completed'}
+    assert not plan.failed
+
+
+def test_existing_remote_task_is_bound_by_title(client, mirror):
+    remote = client._remote("manual", "数学: 作业1", "2030-01-02", "2030-01-01 20:00")
+    client.tasks[remote['id']] = remote
+
+    plan = sync(client, mirror, {"数学: 作业1": task("数学: 作业1")})
+    assert not plan.creates and not plan.updates
+    assert plan.bindings == [("数学: 作业1", "manual", local_hash(task("数学: 作业1")))]
+    assert mirror.bindings["数学: 作业1"]['id'] == "manual"
+
+
+def test_failed_create_is_not_bound(mirror):
+    client = FakeTodoClient(fail_titles={"物理: 作业2"})
+    mirror.client = client
+    plan = sync(client, mirror, {"数学: 作业1": task("数学: 作业1"), "物理: 作业2": task("物理: 作业2")})
+
+    assert plan.failed == {"物理: 作业2"}
+    assert set(mirror.bindings) == {"数学: 作业1"}
+
+
+def test_removed_local_task_is_unbound(client, mirror):
+    sync(client, mirror, {"数学: 作业1": task("数学: 作业1")})
+    plan = sync(client, mirror, {})
+    assert plan.unbinds == ["数学: 作业1"]
+    assert mirror.bindings == {}
+
+
+def test_partial_sync_keeps_other_bindings(client, mirror):
+    sync(client, mirror, {"数学: 作业1": task("数学: 作业1")})
+    mirror.refresh()
+    plan = Reconciler(client, mirror).sync({"物理: 作业2": task("物理: 作业2")}, partial=True)
+    assert plan.unbinds == []
+    assert set(mirror.bindings) == {"数学: 作业1", "物理: 作业2"}
+
+
+@pytest.fixture
+def task_manager(client, tmp_path):
+    return TaskManager(None, str(tmp_path / "token.json"), str(tmp_path / "tasks.json"),
+                       mirror_file=str(tmp_path / "mirror.json"), todo_client=client,
+                       list_cache_file=str(tmp_path / "lists.json"))
+
+
+def test_add_homework_task_goes_through_the_bindings(client, task_manager):
+    task_manager.add_homework_task("数学: 作业1", "2030-01-02", "2030-01-01 20:00")
+    created = task_manager.add_homework_task("数学: 作业1", "2030-01-02", "2030-01-01 20:00")
+
+    assert client.created == [["数学: 作业1"]]  # 再次添加不会重复创建
+    assert created['id'] == task_manager.mirror.bindings["数学: 作业1"]['id']
+    assert task_manager.local_tasks["数学: 作业1"]['due_date'] == "2030-01-02"
+    assert task_manager.find_task_by_title("数学: 作业1") == created
+
+    # 之后的完整同步认为该任务没有变化
+    plan = task_manager.sync_tasks()
+    assert plan.empty and plan.unchanged == 1
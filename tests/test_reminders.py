@@ -0,0 +1,105 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from mooc.reminders import ReminderEngine, describe_offset
+
+NOW = datetime(2030, 3, 1, 12, 0).timestamp()
+DEADLINE = datetime(2030, 3, 5, 23, 59)
+OFFSETS = (timedelta(days=3), timedelta(days=1), timedelta(hours=2))
+
+
+class RecordingSink:
+    def __init__(self):
+        self.enqueued = []
+        self.event = threading.Event()
+
+    def enqueue(self, uuid, message):
+        self.enqueued.append((uuid, message))
+        self.event.set()
+        return True
+
+
+@pytest.fixture
+def engine():
+    return ReminderEngine(RecordingSink(), OFFSETS)
+
+
+def fire_times(engine):
+    return sorted(datetime.fromtimestamp(entry[0]) for entry in engine._heap
+                  if engine._reminders.get(entry[2], [None])[0] == entry[3])
+
+
+def test_describe_offset():
+    assert describe_offset(3 * 86400) == "3 天"
+    assert describe_offset(30 * 3600 + 60) == "1 天 6 小时 1 分钟"
+    assert describe_offset(30) == "不到 1 分钟"
+
+
+def test_schedule_one_entry_per_future_offset(engine):
+    assert engine.schedule("hw", DEADLINE, now=NOW) == 3
+    assert fire_times(engine) == [DEADLINE - offset for offset in OFFSETS]
+    # 已经过去的提醒时间不再安排
+    assert engine.schedule("late", DEADLINE, now=(DEADLINE - timedelta(hours=12)).timestamp()) == 1
+
+
+def test_unchanged_schedule_is_a_no_op(engine):
+    engine.schedule("hw", DEADLINE, now=NOW)
+    assert engine.schedule("hw", DEADLINE, now=NOW) == 0
+    assert len(engine._heap) == 3
+
+
+def test_reschedule_invalidates_old_entries(engine):
+    engine.schedule("hw", DEADLINE, now=NOW)
+    later = DEADLINE + timedelta(days=2)
+    engine.schedule("hw", later, now=NOW)
+    assert fire_times(engine) == [later - offset for offset in OFFSETS]
+    due = engine._pop_due((later - timedelta(days=3)).timestamp())
+    assert [(key, deadline) for key, deadline, _, _ in due] == [("hw", later)]
+
+
+def test_cancel_and_sync(engine):
+    engine.schedule("gone", DEADLINE, now=NOW)
+    engine.cancel("gone")
+    assert len(engine) == 0
+    assert engine._pop_due(DEADLINE.timestamp()) == []
+
+    engine.sync({"a": {'title': "A", 'end': "2099-01-01 08:00"}, "b": {'title': "B"}})
+    assert len(engine) == 1
+    engine.sync({})
+    assert len(engine) == 0 and engine.next_fire_time() is None
+
+
+def test_pop_due_returns_each_stage_once(engine):
+    engine.schedule("hw", DEADLINE, now=NOW)
+    first = engine._pop_due((DEADLINE - timedelta(days=2)).timestamp())
+    assert [offset for _, _, _, offset in first] == [timedelta(days=3).total_seconds()]
+    assert engine._pop_due((DEADLINE - timedelta(days=2)).timestamp()) == []
+    rest = engine._pop_due(DEADLINE.timestamp())
+    assert len(rest) == 2 and len(engine) == 0
+
+
+def test_background_thread_fires_and_enqueues_with_a_stable_id():
+    sink = RecordingSink()
+    engine = ReminderEngine(sink, (timedelta(seconds=1),)).start()
+    try:
+        deadline = datetime.now() + timedelta(seconds=1.2)
+        engine.schedule("数学: 作业1", deadline)
+        assert sink.event.wait(5)
+    finally:
+        engine.stop(timeout=5)
+    (uuid, message), = sink.enqueued
+    assert uuid == f"reminder:数学: 作业1:{int(deadline.timestamp())}:1"
+    assert message.title == "作业提醒：数学: 作业1"
+    assert not engine._thread.is_alive()
+
+
+def test_sink_without_queue_is_sent_directly():
+    sent = []
+
+    class Sink:
+        def send(self, message):
+            sent.append(message)
+
+    engine = ReminderEngine(Sink(), OFFSETS)
+    engine._fire("hw", DEADLINE, "作业", timedelta(hours=2).total_seconds())
+    assert sent[0].title == "作业提醒：作业"
@@ -0,0 +1,131 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+from mooc.retention import DeadlineIndex, Retention, task_deadline
+from mooc.task_manager import TaskManager
+from mooc.task_store import JournaledTaskStore
+from tests.test_reconcile import FakeTodoClient, task
+
+NOW = datetime(2030, 3, 1, 12, 0)
+
+
+def test_task_deadline_prefers_end_then_due_date():
+    assert task_deadline({'end': "2030-01-01 23:59", 'due_date': "2030-01-05"}) == datetime(2030, 1, 1, 23, 59)
+    assert task_deadline({'due_date': "2030-01-05T00:00:00"}) == datetime(2030, 1, 6)
+    assert task_deadline({'due_date': "not a date"}) is None
+    assert task_deadline({}) is None
+
+
+def test_deadline_index_pops_in_order_and_skips_stale_entries():
+    index = DeadlineIndex()
+    index.push("a", NOW + timedelta(hours=3))
+    index.push("b", NOW + timedelta(hours=1))
+    index.push("c", NOW + timedelta(hours=2))
+    index.push("b", NOW + timedelta(hours=5))  # 更新后旧条目失效
+    index.discard("c")
+    assert index.next_deadline() == NOW + timedelta(hours=3)
+    assert index.pop_before(NOW + timedelta(hours=4)) == ["a"]
+    assert index.pop_before(NOW + timedelta(hours=10)) == ["b"]
+    assert len(index) == 0 and index.next_deadline() is None
+
+
+def test_deadline_index_rebuilds_when_stale_entries_pile_up():
+    index = DeadlineIndex()
+    for i in range(500):
+        index.push("a", NOW + timedelta(minutes=i))
+    assert len(index._heap) <= 2 * len(index) + 64 + 1
+    assert index.pop_before(NOW + timedelta(days=1)) == ["a"]
+
+
+def expired_and_current():
+    return {
+        "old": task("old", due_date="2030-02-20", end="2030-02-20 23:59"),
+        "current": task("current", due_date="2030-03-10", end="2030-03-10 23:59"),
+    }
+
+
+def test_evict_archives_expired_tasks(tmp_path):
+    retention = Retention(str(tmp_path / "archive.jsonl"), grace=timedelta(days=1))
+    tasks = expired_and_current()
+    retention.build(tasks)
+
+    evicted = retention.evict(tasks, now=NOW)
+    assert list(evicted) == ["old"] and list(tasks) == ["current"]
+    assert [record['key'] for record in retention.archive] == ["old"]
+    assert retention.evict(tasks, now=NOW) == {}
+
+
+def test_pending_completion_survives_a_restart(tmp_path):
+    snapshot = str(tmp_path / "tasks.json")
+    store = JournaledTaskStore(snapshot)
+    store.update(expired_and_current())
+    retention = Retention(str(tmp_path / "archive.jsonl"), complete_remote=True)
+    retention.build(store)
+
+    assert retention.evict(store, now=NOW) == {}
+    store.flush()
+    assert list(retention.archive) == []
+
+    # 重启：标记随任务存储持久化
+    store = JournaledTaskStore(snapshot)
+    retention = Retention(str(tmp_path / "archive.jsonl"), complete_remote=True)
+    retention.build(store)
+    retention.evict(store, now=NOW)
+    assert retention.pending(store) == ["old"]
+    assert store["old"]['status'] == 'completed'
+
+    retention.finish(store, ["old", "current"])
+    assert list(store) == ["current"]
+    record, = retention.archive
+    assert record['key'] == "old" and Retention.PENDING not in record['task']
+
+
+class FlakyTodoClient(FakeTodoClient):
+    def __init__(self):
+        super().__init__()
+        self.fail_updates = True
+
+    def update_tasks(self, list_id, updates, progress=None):
+        if self.fail_updates:
+            self.updated.append(updates)
+            return [None] * len(updates)
+        return super().update_tasks(list_id, updates, progress)
+
+
+@pytest.fixture
+def client():
+    return FlakyTodoClient()
+
+
+def make_task_manager(client, tmp_path):
+    return TaskManager(None, str(tmp_path / "token.json"), str(tmp_path / "tasks.json"),
+                       mirror_file=str(tmp_path / "mirror.json"), todo_client=client,
+                       list_cache_file=str(tmp_path / "lists.json"),
+                       retention=Retention(str(tmp_path / "archive.jsonl"), grace=timedelta(0), complete_remote=True))
+
+
+def test_remote_completion_is_retried_until_applied(client, tmp_path):
+    client.fail_updates = False
+    task_manager = make_task_manager(client, tmp_path)
+    task_manager.set_local_task("old", task("old", due_date="2020-01-01", end="2020-01-01 23:59"))
+    task_manager.save_local_tasks()
+    # 任务尚未过期时的第一次同步创建远程任务
+    task_manager.retention.index.discard("old")
+    task_manager.sync_tasks()
+    task_id = task_manager.mirror.bindings["old"]['id']
+
+    client.fail_updates = True
+    task_manager.retention.track("old", task_manager.local_tasks["old"])
+    plan = task_manager.sync_tasks()
+    assert plan.failed == {"old"}
+    assert task_manager.local_tasks["old"][Retention.PENDING]
+
+    # Graph 失败后重启，标记仍在存储中
+    client.fail_updates = False
+    task_manager = make_task_manager(client, tmp_path)
+    assert task_manager.retention.pending(task_manager.local_tasks) == ["old"]
+    task_manager.sync_tasks()
+    assert client.tasks[task_id]['status'] == 'completed'
+    assert "old" not in task_manager.local_tasks
+    with open(tmp_path / "archive.jsonl") as f:
+        assert [json.loads(line)['key'] for line in f] == ["old"]
@@ -0,0 +1,101 @@
+import time
+from datetime import datetime
+import pytest
+from mooc.scheduler import CircuitBreaker, PollScheduler
+
+NOW = 1_900_000_000.0
+
+
+def at(offset: float) -> datetime:
+    return datetime.fromtimestamp(NOW + offset)
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = PollScheduler(base_interval=60, min_interval=20, idle_interval=900,
+                              activity_window=3600, deadline_window=3600)
+    scheduler.last_activity = NOW - 3600
+    return scheduler
+
+
+def test_startup_is_not_treated_as_activity():
+    scheduler = PollScheduler(base_interval=60)
+    assert scheduler.next_delay(now=time.time()) >= 60
+
+
+def test_new_notices_speed_up_polling(scheduler):
+    scheduler.record_activity(3, now=NOW)
+    assert scheduler.next_delay(now=NOW) == 20
+    assert 20 < scheduler.next_delay(now=NOW + 1800) < 60
+
+
+def test_no_new_notices_does_not_count_as_activity(scheduler):
+    scheduler.record_activity(0, now=NOW)
+    assert scheduler.next_delay(now=NOW) == 60
+
+
+def test_idle_backoff_grows_to_the_cap(scheduler):
+    scheduler.last_activity = NOW - 5 * 3600
+    assert scheduler.next_delay(now=NOW) == 300
+    scheduler.last_activity = NOW - 100 * 3600
+    assert scheduler.next_delay(now=NOW) == 900
+
+
+def test_distant_deadlines_do_not_cancel_idle_backoff(scheduler):
+    scheduler.last_activity = NOW - 100 * 3600
+    assert scheduler.next_delay([at(2 * 3600), at(86400)], now=NOW) == 900
+
+
+def test_close_deadline_tightens_proportionally_but_not_below_base(scheduler):
+    scheduler.last_activity = NOW - 100 * 3600
+    assert scheduler.next_delay([at(1800)], now=NOW) == pytest.approx(60 + 840 * 0.5)
+    assert scheduler.next_delay([at(1)], now=NOW) == pytest.approx(60, abs=1)
+    # 已经过去的截止时间不影响间隔
+    assert scheduler.next_delay([at(-60)], now=NOW) == 900
+
+
+def test_deadline_does_not_slow_down_active_polling(scheduler):
+    scheduler.record_activity(1, now=NOW)
+    assert scheduler.next_delay([at(600)], now=NOW) == 20
+
+
+def test_errors_slow_polling_down(scheduler):
+    scheduler.record_failure('mooc')
+    scheduler.record_failure('mooc')
+    assert scheduler.next_delay(now=NOW) == pytest.approx(60 * (1 + 4 * 0.51))
+    scheduler.record_success('mooc')
+    assert scheduler.error_rate == pytest.approx(0.51 * 0.7)
+
+
+def test_open_breaker_sets_the_delay(scheduler):
+    for _ in range(3):
+        scheduler.breakers['mooc'].record_failure(now=NOW)
+    assert not scheduler.allow('mooc', now=NOW + 1)
+    assert scheduler.next_delay(now=NOW) == 60
+
+
+def test_breaker_opens_at_threshold_and_backs_off_exponentially():
+    breaker = CircuitBreaker("test", failure_threshold=3, base_delay=60, max_delay=200)
+    breaker.record_failure(now=NOW)
+    breaker.record_failure(now=NOW)
+    assert not breaker.is_open and breaker.allow(now=NOW)
+
+    breaker.record_failure(now=NOW)
+    assert breaker.is_open
+    assert breaker.remaining(now=NOW) == 60
+    assert not breaker.allow(now=NOW + 59)
+    assert breaker.allow(now=NOW + 60)  # 半开：放行一次探测
+
+    breaker.record_failure(now=NOW)
+    assert breaker.remaining(now=NOW) == 120
+    breaker.record_failure(now=NOW)
+    assert breaker.remaining(now=NOW) == 200  # 不超过 max_delay
+
+
+def test_breaker_honours_retry_after_and_recovers():
+    breaker = CircuitBreaker("test", failure_threshold=1, base_delay=60)
+    breaker.record_failure(retry_after=600, now=NOW)
+    assert breaker.remaining(now=NOW) == 600
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow(now=NOW) and breaker.remaining(now=NOW) == 0
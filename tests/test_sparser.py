@@ -0,0 +1,93 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from mooc.sparser import Homework, Notice, Sparser
+
+
+def make_notices(count: int, homework_ratio: float, seed: int) -> list:
+    """
+    按旧版作业模板（课程、作业名、开始、结束各占一行）生成作业通知，其余为普通通知
+    """
+    rng = random.Random(seed)
+    notices = []
+    for i in range(count):
+        day = 1 + i % 28
+        if rng.random() < homework_ratio:
+            title = f"作业:作业{i}"
+            content = (f"课程名称：课程{i % 7}\r作业名称：作业{i}\r"
+                       f"开始时间：2030-01-{day:02d} 08:{i % 60:02d}\r结束时间：2030-02-{day:02d} 23:59")
+        else:
+            title = rng.choice((f"通知{i}", f"课程{i % 7} 调课", "作业提交说明"))
+            content = f"第{i}条通知：请同学们注意。" + "。" * rng.randint(0, 50)
+        notices.append({"uuid": f"uuid-{i:06d}", "title": title, "content": content,
+                        "createrName": f"教师{i % 5}", "completeTime": f"2030-01-{day:02d} 08:{i % 60:02d}:00"})
+    return notices
+
+
+def baseline_parse(notice: dict) -> tuple:
+    """
+    改为按类型表解析之前的逻辑：作业通知按行的位置切分，其余按普通通知处理
+    """
+    if notice["title"].startswith("作业:"):
+        content = notice["content"].split('\r')
+        end = datetime.strptime(content[3].removeprefix("结束时间："), "%Y-%m-%d %H:%M")
+        reminder = (end - timedelta(days=1)).replace(hour=20, minute=0, second=0)
+        return ("homework", content[0].removeprefix("课程名称："), content[1].removeprefix("作业名称："),
+                datetime.strptime(content[2].removeprefix("开始时间："), "%Y-%m-%d %H:%M"), end,
+                (f"{content[0].removeprefix('课程名称：')}：{content[1].removeprefix('作业名称：')}",
+                 end.strftime("%Y-%m-%d"), reminder.strftime("%Y-%m-%d %H:%M")))
+    return ("notice", notice["title"], notice["content"], notice["createrName"],
+            datetime.strptime(notice["completeTime"], "%Y-%m-%d %H:%M:%S"))
+
+
+def as_tuple(parsed) -> tuple:
+    if isinstance(parsed, Homework):
+        task = parsed.task
+        return ("homework", parsed.course, parsed.name, parsed.start, parsed.end,
+                (task.title, task.due_date, task.reminder_time))
+    assert isinstance(parsed, Notice)
+    return ("notice", parsed.title, parsed.content, parsed.creater, parsed.time)
+
+
+@pytest.fixture
+def sparser(tmp_path):
+    return Sparser(seen_file=str(tmp_path / "seen.db"), uuid_file=str(tmp_path / "uuids.json"))
+
+
+@pytest.fixture(scope="module")
+def notices():
+    return make_notices(400, homework_ratio=0.4, seed=7)
+
+
+def test_sparse_notice_matches_baseline(sparser, notices):
+    for notice in notices:
+        assert as_tuple(sparser.sparse_notice(notice)) == baseline_parse(notice)
+
+
+def test_parse_batch_matches_baseline(sparser, notices):
+    expected = [baseline_parse(notice) for notice in notices]
+    for _ in range(2):  # 第二次全部命中解析缓存
+        batch = sparser.parse_batch(notices)
+        assert not batch.failed
+        assert [as_tuple(homework) for homework in batch.homeworks] == [row for row in expected
+                                                                        if row[0] == "homework"]
+        assert [as_tuple(notice) for notice in batch.notices] == [row for row in expected if row[0] == "notice"]
+    assert sparser.parse_cache.hits >= len(notices)
+
+
+def test_cached_result_is_reused_until_content_changes(sparser, notices):
+    notice = next(notice for notice in notices if notice["title"].startswith("作业:"))
+    first = sparser.sparse_notice(notice)
+    assert sparser.sparse_notice(dict(notice)) is first
+
+    edited = {**notice, "content": notice["content"].replace("23:59", "22:00")}
+    reparsed = sparser.sparse_notice(edited)
+    assert reparsed is not first
+    assert reparsed.end.hour == 22
+
+
+def test_homework_fields_do_not_depend_on_line_order(sparser):
+    notice = {"uuid": "u", "title": "作业:实验报告", "createrName": "教师", "completeTime": "2030-01-01 08:00:00",
+              "content": "结束时间：2030-02-01 23:59\r课程名称：物理\r开始时间：2030-01-01 08:00\r作业名称：实验报告"}
+    homework = sparser.sparse_notice(notice)
+    assert (homework.course, homework.name, homework.end) == ("物理", "实验报告", datetime(2030, 2, 1, 23, 59))
@@ -0,0 +1,60 @@
+import json
+from mooc.task_store import JournaledTaskStore
+
+
+def test_journal_is_replayed_on_load(tmp_path):
+    snapshot = tmp_path / "tasks.json"
+    store = JournaledTaskStore(str(snapshot))
+    store["a"] = {"title": "a", "due_date": "2030-01-01"}
+    store["b"] = {"title": "b", "due_date": "2030-01-02"}
+    del store["a"]
+    assert store.flush()
+
+    reloaded = JournaledTaskStore(str(snapshot))
+    assert dict(reloaded) == {"b": {"title": "b", "due_date": "2030-01-02"}}
+    assert not snapshot.exists()  # 尚未压缩，数据全部来自日志
+
+
+def test_unchanged_value_is_not_journaled(tmp_path):
+    store = JournaledTaskStore(str(tmp_path / "tasks.json"))
+    store["a"] = {"title": "a"}
+    store.flush()
+    store["a"] = {"title": "a"}
+    assert not store.dirty
+    assert not store.flush()
+
+
+def test_truncated_journal_line_is_dropped_and_compacted(tmp_path):
+    snapshot = tmp_path / "tasks.json"
+    store = JournaledTaskStore(str(snapshot))
+    store["a"] = {"title": "a"}
+    store["b"] = {"title": "b"}
+    store.flush()
+    with open(store.journal_file, 'a') as f:
+        f.write('{"op": "set", "key": "c", "val')  # 崩溃时写了一半
+
+    reloaded = JournaledTaskStore(str(snapshot))
+    assert dict(reloaded) == {"a": {"title": "a"}, "b": {"title": "b"}}
+    with open(snapshot) as f:
+        assert json.load(f) == {"a": {"title": "a"}, "b": {"title": "b"}}
+    with open(reloaded.journal_file) as f:
+        assert f.read() == ""
+
+    # 压缩后继续追加的变更不会写在残缺行之后
+    reloaded["c"] = {"title": "c"}
+    reloaded.flush()
+    assert set(JournaledTaskStore(str(snapshot))) == {"a", "b", "c"}
+
+
+def test_journal_is_compacted_past_threshold(tmp_path, monkeypatch):
+    monkeypatch.setattr(JournaledTaskStore, "COMPACT_THRESHOLD", 3)
+    snapshot = tmp_path / "tasks.json"
+    store = JournaledTaskStore(str(snapshot))
+    for i in range(5):
+        store[str(i)] = {"title": str(i)}
+    store.flush()
+
+    with open(snapshot) as f:
+        assert len(json.load(f)) == 5
+    with open(store.journal_file) as f:
+        assert f.read() == ""
@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+from ms_todo import transport as transport_module
+from ms_todo.transport import GraphTransport, ThrottledError
+
+URL = "https://graph.microsoft.com/v1.0/me/todo/lists/abc/tasks"
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """
+    按顺序返回预设的响应或抛出预设的异常
+    """
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append(method)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def refused():
+    return requests.ConnectionError(MaxRetryError(None, URL, NewConnectionError(None, "Connection refused")))
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(transport_module.time, "sleep", slept.append)
+    return slept
+
+
+def make_transport(*outcomes, max_retries=3):
+    transport = GraphTransport(rate=1000, burst=1000, max_retries=max_retries, backoff_base=0.01, backoff_cap=60)
+    transport._session = FakeSession(outcomes)
+    return transport
+
+
+def test_retry_after_seconds_is_not_capped():
+    transport = GraphTransport(backoff_cap=60)
+    assert transport.retry_after({"Retry-After": "120"}) == 120.0
+    assert transport.retry_after({"Retry-After": " 5 "}) == 5.0
+
+
+def test_retry_after_http_date_is_not_capped():
+    transport = GraphTransport(backoff_cap=60)
+    when = datetime.now(timezone.utc) + timedelta(seconds=300)
+    delay = transport.retry_after({"Retry-After": format_datetime(when, usegmt=True)})
+    assert 295 <= delay <= 300
+    past = datetime.now(timezone.utc) - timedelta(minutes=5)
+    assert transport.retry_after({"Retry-After": format_datetime(past, usegmt=True)}) == 0.0
+
+
+def test_retry_after_missing_or_invalid():
+    transport = GraphTransport()
+    assert transport.retry_after({}) is None
+    assert transport.retry_after(None) is None
+    assert transport.retry_after({"Retry-After": "soon"}) is None
+
+
+def test_backoff_delay_is_capped():
+    transport = GraphTransport(backoff_base=1.0, backoff_cap=5.0)
+    assert all(0 <= transport.backoff_delay(attempt) <= 5.0 for attempt in range(20))
+
+
+def test_get_is_retried_on_server_error(sleeps):
+    transport = make_transport(FakeResponse(500), FakeResponse(502), FakeResponse(200))
+    assert transport.get(URL).status_code == 200
+    assert transport.session.calls == ["GET"] * 3
+
+
+def test_get_is_retried_on_read_timeout(sleeps):
+    transport = make_transport(requests.ReadTimeout(), FakeResponse(200))
+    assert transport.get(URL).status_code == 200
+
+
+def test_throttle_waits_for_retry_after(sleeps):
+    transport = make_transport(FakeResponse(429, {"Retry-After": "120"}), FakeResponse(200))
+    assert transport.get(URL).status_code == 200
+    assert sleeps == [120.0]
+
+
+def test_persistent_throttle_raises_with_server_delay(sleeps):
+    transport = make_transport(*[FakeResponse(503, {"Retry-After": "90"})] * 3, max_retries=2)
+    with pytest.raises(ThrottledError) as error:
+        transport.get(URL)
+    assert error.value.retry_after == 90.0
+    assert error.value.status_code == 503
+    assert len(transport.session.calls) == 3
+
+
+def test_server_error_is_returned_after_retries(sleeps):
+    transport = make_transport(*[FakeResponse(500)] * 3, max_retries=2)
+    assert transport.get(URL).status_code == 500
+
+
+def test_post_is_not_replayed_on_server_error(sleeps):
+    transport = make_transport(FakeResponse(500), FakeResponse(201))
+    assert transport.post(URL).status_code == 500
+    assert transport.session.calls == ["POST"]
+    assert sleeps == []
+
+
+def test_post_is_not_replayed_after_read_timeout(sleeps):
+    transport = make_transport(requests.ReadTimeout(), FakeResponse(201))
+    with pytest.raises(requests.ReadTimeout):
+        transport.post(URL)
+    assert transport.session.calls == ["POST"]
+
+
+@pytest.mark.parametrize("error", [requests.ConnectTimeout(), refused()])
+def test_post_is_retried_when_never_sent(sleeps, error):
+    transport = make_transport(error, FakeResponse(201))
+    assert transport.post(URL).status_code == 201
+    assert transport.session.calls == ["POST", "POST"]
+
+
+def test_post_is_retried_when_throttled(sleeps):
+    transport = make_transport(FakeResponse(429, {"Retry-After": "3"}), FakeResponse(201))
+    assert transport.post(URL).status_code == 201
+    assert sleeps == [3.0]
+
+
+def test_idempotent_override(sleeps):
+    transport = make_transport(FakeResponse(500), FakeResponse(200))
+    assert transport.request("POST", URL, idempotent=True).status_code == 200
+    transport = make_transport(FakeResponse(500), FakeResponse(200))
+    assert transport.request("PATCH", URL, idempotent=False).status_code == 500
+
+
+def test_before_send_classification():
+    assert GraphTransport.before_send(requests.ConnectTimeout())
+    assert GraphTransport.before_send(refused())
+    assert not GraphTransport.before_send(requests.ReadTimeout())
+    assert not GraphTransport.before_send(requests.ConnectionError("Connection reset by peer"))
+
+
+def test_endpoint_normalizes_ids():
+    assert GraphTransport.endpoint("GET", URL + "/xyz") == "GET /me/todo/lists/{id}/tasks/{id}"
+    assert GraphTransport.endpoint("GET", URL + "/delta") == "GET /me/todo/lists/{id}/tasks/delta"